@@ -1,6 +1,5 @@
 import streamlit as st
 import pandas as pd
-import json
 import smtplib
 from email.mime.multipart import MIMEMultipart
 from email.mime.base import MIMEBase
@@ -12,7 +11,13 @@ import plotly.graph_objects as go
 from datetime import datetime
 import io
 import os
-from web_scraping import scrape_led_data
+from web_scraping import get_retry_stats, get_wait_stats, search_filters
+from asset_filters import OWNER_COLUMNS, SORT_OPTIONS, land_area_wa, query_results
+from search_cache import get_search_cache
+from asset_store import get_asset_store
+from scrape_jobs import get_job_manager
+from driver_pool import current_pool
+from locations import get_location_index
 from fpdf import FPDF
 
 # ตรวจสอบว่าฟอนต์มีอยู่จริงหรือไม่
@@ -40,6 +45,18 @@ else:
     with open(output_path, "rb") as f:
         st.download_button("📄 ดาวน์โหลด PDF", f, file_name=output_path)
         
+# ✅ แสดงเหตุการณ์จากตัวดึงข้อมูล (web_scraping ไม่ได้ผูกกับ Streamlit แล้ว)
+def show_scrape_event(event):
+    if event["type"] == "search":
+        st.info(event["message"])
+    elif event["type"] == "warning":
+        st.warning(event["message"])
+    elif event["type"] == "error":
+        st.error(event["message"])
+        if event.get("screenshot") and os.path.exists(event["screenshot"]):
+            st.image(event["screenshot"], caption="ภาพหน้าจอขณะเกิดข้อผิดพลาด")
+
+
 # Main application
 def main():
     # Page configuration
@@ -266,47 +283,8 @@ def main():
     </div>
     """, unsafe_allow_html=True)
 
-    # Load location data
-    @st.cache_data
-    def load_location_data():
-        try:
-            with open("thai_provinces.json", "r", encoding="utf-8") as f:
-                return json.load(f)
-        except FileNotFoundError:
-            # Fallback to sample data if file not found
-            return [
-                {
-                    "name_th": "กรุงเทพมหานคร",
-                    "name_en": "Bangkok",
-                    "amphure": [
-                        {
-                            "name_th": "พระนคร",
-                            "name_en": "Phra Nakhon",
-                            "tambon": [
-                                {"name_th": "พระบรมมหาราชวัง", "name_en": "Phra Borom Maha Ratchawang"},
-                                {"name_th": "วังบูรพาภิรมย์", "name_en": "Wang Burapha Phirom"}
-                            ]
-                        }
-                    ]
-                },
-                {
-                    "name_th": "เชียงใหม่",
-                    "name_en": "Chiang Mai",
-                    "amphure": [
-                        {
-                            "name_th": "เมืองเชียงใหม่",
-                            "name_en": "Mueang Chiang Mai",
-                            "tambon": [
-                                {"name_th": "ศรีภูมิ", "name_en": "Si Phum"},
-                                {"name_th": "พระสิงห์", "name_en": "Phra Sing"}
-                            ]
-                        }
-                    ]
-                }
-            ]
-
-    location_data = load_location_data()
-    province_names = sorted([p['name_th'] for p in location_data])
+    # ดัชนีพื้นที่สร้างครั้งเดียวต่อโปรเซส ตัวเลือกของแต่ละระดับเรียงไว้แล้ว
+    locations = get_location_index()
 
     # Initialize session state for storing results
     if 'search_results' not in st.session_state:
@@ -331,53 +309,21 @@ def main():
                 
                 selected_province = st.selectbox(
                     "จังหวัด",
-                    [""] + province_names,
+                    locations.province_options,
                     help="เลือกจังหวัดที่ต้องการค้นหาทรัพย์"
                 )
                 
-                # Prepare district and subdistrict lists
-                district_display_names = []
-                subdistrict_display_names = []
-                district_mapping = {}
-                subdistrict_mapping = {}
-                amphoes = []
-                
-                if selected_province:
-                    amphoes = next((p.get("amphure", []) for p in location_data if p.get("name_th") == selected_province), [])
-                    district_mapping = {
-                        a["name_th"]: a["name_th"]
-                        for a in amphoes
-                    }
-                    district_display_names = sorted(district_mapping.keys())
-                
-                selected_district_display = st.selectbox(
+                selected_district = st.selectbox(
                     "อำเภอ",
-                    [""] + district_display_names,
+                    locations.amphure_options(selected_province),
                     help="เลือกอำเภอที่ต้องการค้นหาทรัพย์"
                 )
-                selected_district = district_mapping.get(selected_district_display, "")
                 
-                tambons = []
-                if selected_district:
-                    tambons = next(
-                        (a.get("tambon", []) for a in amphoes if a["name_th"] == selected_district),
-                        []
-                    )
-                    subdistrict_mapping = {
-                        t["name_th"]: t["name_th"]
-                        for t in tambons
-                    }
-                    subdistrict_display_names = sorted(subdistrict_mapping.keys())
-                else:
-                    subdistrict_mapping = {}
-                    subdistrict_display_names = []
-                
-                selected_subdistrict_display = st.selectbox(
+                selected_subdistrict = st.selectbox(
                     "ตำบล",
-                    [""] + subdistrict_display_names,
+                    locations.tambon_options(selected_province, selected_district),
                     help="เลือกตำบลที่ต้องการค้นหาทรัพย์"
                 )
-                selected_subdistrict = subdistrict_mapping.get(selected_subdistrict_display, "")
             
             with col2:
                 st.markdown('<div class="filter-header">ข้อมูลทรัพย์</div>', unsafe_allow_html=True)
@@ -446,6 +392,11 @@ def main():
                     value=5,
                     help="กำหนดจำนวนหน้าที่ต้องการดึงข้อมูล (0 = ดึงทุกหน้า)"
                 )
+                
+                force_refresh = st.checkbox(
+                    "ดึงข้อมูลใหม่จากเว็บไซต์ (ไม่ใช้ผลที่แคชไว้)",
+                    help="ผลการค้นหาเดียวกันจะถูกเก็บไว้ชั่วคราว เลือกเพื่อดึงข้อมูลล่าสุดจากกรมบังคับคดีทันที"
+                )
         
         with tab2:
             col1, col2 = st.columns(2)
@@ -468,13 +419,19 @@ def main():
             with col2:
                 st.markdown('<div class="filter-header">ตัวเลือกเพิ่มเติม</div>', unsafe_allow_html=True)
                 
-                st.selectbox(
+                sort_by = st.selectbox(
                     "เรียงลำดับตาม",
-                    ["ราคาประเมิน (สูง-ต่ำ)", "ราคาประเมิน (ต่ำ-สูง)", "วันที่ประมูล (ล่าสุด)", "วันที่ประมูล (เก่าสุด)"],
+                    list(SORT_OPTIONS),
                     help="เลือกวิธีการเรียงลำดับผลลัพธ์"
                 )
                 
-                st.checkbox("แสดงเฉพาะทรัพย์ที่มีรูปภาพ", help="เลือกเพื่อแสดงเฉพาะทรัพย์ที่มีรูปภาพประกอบ")
+                with_images = st.checkbox("แสดงเฉพาะทรัพย์ที่มีรูปภาพ", help="เลือกเพื่อแสดงเฉพาะทรัพย์ที่มีรูปภาพประกอบ")
+                
+                with_details = st.checkbox(
+                    "ดึงรายละเอียดทรัพย์ (วันขายนัด หน่วยงานที่ขาย ผู้ถือกรรมสิทธิ์ รูปภาพ)",
+                    help="ดึงหน้ารายละเอียดของทุกรายการเพิ่มเติม (ใช้เวลานานขึ้น) "
+                         "จำเป็นสำหรับการกรองตามวันประมูล ชื่อเจ้าของ และรูปภาพ"
+                )
         
         # Search button
         search_col1, search_col2, search_col3 = st.columns([1, 1, 1])
@@ -495,7 +452,9 @@ def main():
             "max_price": max_price,
             "auction_date": auction_date.strftime("%d/%m/%Y") if auction_date else None,
             "department": department,
+            "case_number": case_number,
             "owner": owner,
+            "with_images": with_images,
             "land_size": {
                 "rai": land_rai,
                 "ngan": land_ngan,
@@ -513,35 +472,110 @@ def main():
         cleaned_district = clean_district_name(selected_district)
         cleaned_subdistrict = clean_subdistrict_name(selected_subdistrict)
         
-        with st.spinner("กำลังดึงข้อมูลจากกรมบังคับคดี..."):
-            # Call the scraping function with max_pages parameter and cleaned district/subdistrict
-            max_pages_value = None if max_pages == 0 else max_pages
-            
-            # แสดงค่าที่จะส่งไปยังฟังก์ชัน scrape_led_data เพื่อการ debug
+        # ส่งงานค้นหาไปทำงานเบื้องหลัง และเก็บ job id ไว้ใน URL เพื่อติดตามต่อได้แม้โหลดหน้าใหม่
+        max_pages_value = None if max_pages == 0 else max_pages
+        # ส่งเงื่อนไขที่ฟอร์มของเว็บไซต์รองรับไปกรองฝั่งเซิร์ฟเวอร์ ไม่ต้องดึงทุกหน้าของทุกประเภท
+        filters = search_filters(asset_type, min_price, max_price, department, case_number)
+        # วันประมูล ชื่อเจ้าของ และรูปภาพมีเฉพาะในหน้ารายละเอียด
+        job = get_job_manager().submit(
+            selected_province, cleaned_district, cleaned_subdistrict, max_pages_value, force_refresh,
+            with_details or with_images or auction_date is not None or bool((owner or "").strip()), filters
+        )
+        st.query_params["job"] = job.id
+        st.session_state.search_results = None
+    
+    # ติดตามงานค้นหาเบื้องหลัง
+    job_id = st.query_params.get("job")
+    if job_id:
+        job = get_job_manager().get(job_id)
+        if job is None:
+            st.warning("ไม่พบงานค้นหานี้ (อาจหมดอายุหรือระบบเริ่มทำงานใหม่) กรุณาค้นหาอีกครั้ง")
+            del st.query_params["job"]
+        elif job.active:
             st.markdown(f"""
             <div class="info-box">
-                <strong>กำลังค้นหา:</strong> จังหวัด={selected_province}, อำเภอ={cleaned_district}, ตำบล={cleaned_subdistrict}
+                <strong>กำลังค้นหา:</strong> จังหวัด={job.params['province']}, อำเภอ={job.params['district']}, ตำบล={job.params['subdistrict']}
             </div>
             """, unsafe_allow_html=True)
             
-            df, error = scrape_led_data(selected_province, cleaned_district, cleaned_subdistrict, max_pages_value)
-            
-            if error:
-                st.markdown(f"""
-                <div class="warning-box">
-                    <strong>เกิดข้อผิดพลาด:</strong> {error}
-                </div>
-                """, unsafe_allow_html=True)
+            for event in list(job.events):
+                show_scrape_event(event)
+            if job.details_total is not None:
+                st.progress(
+                    job.details_done / job.details_total if job.details_total else 1.0,
+                    text=f"กำลังดึงรายละเอียดทรัพย์ {job.details_done}/{job.details_total}"
+                )
+            elif job.pages_total:
+                st.progress(job.progress(), text=f"กำลังดึงข้อมูลหน้า {job.pages_done}/{job.pages_total}")
             else:
-                st.session_state.search_results = df
+                st.progress(0.0, text="กำลังค้นหาจากกรมบังคับคดี...")
+            
+            # แสดงผลที่ดึงได้แล้วระหว่างรอหน้าที่เหลือ
+            partial_df = job.partial_frame()
+            if not partial_df.empty:
+                type_counts = partial_df["ประเภททรัพย์"].value_counts()
+                avg_price = partial_df["ราคาประเมิน"].mean()
+                live_col1, live_col2, live_col3 = st.columns(3)
+                for column, value, label in (
+                    (live_col1, f"{len(partial_df):,}", "จำนวนรายการที่ดึงได้แล้ว"),
+                    (live_col2, f"{int(avg_price):,}" if pd.notnull(avg_price) else "N/A", "ราคาประเมินเฉลี่ย (บาท)"),
+                    (live_col3, type_counts.index[0], f"ประเภททรัพย์ที่พบมากที่สุด ({type_counts.iloc[0]:,} รายการ)"),
+                ):
+                    column.markdown(f"""
+                    <div class="metric-card">
+                        <div class="metric-value">{value}</div>
+                        <div class="metric-label">{label}</div>
+                    </div>
+                    """, unsafe_allow_html=True)
+                st.dataframe(partial_df, use_container_width=True, height=400)
+            
+            if st.button("ยกเลิกการค้นหา"):
+                job.cancel()
+            
+            # รอสักครู่แล้วโหลดสถานะใหม่
+            time.sleep(1)
+            st.rerun()
+        elif job.status == "done":
+            for event in list(job.events):
+                show_scrape_event(event)
+            if job.source != "live":
+                st.info("แสดงผลจากข้อมูลที่ดึงไว้ก่อนหน้า (เลือก \"ดึงข้อมูลใหม่จากเว็บไซต์\" เพื่ออัปเดต)")
+            st.session_state.search_results = job.result
+        elif job.status == "cancelled":
+            st.info("ยกเลิกการค้นหาแล้ว แสดงเฉพาะข้อมูลที่ดึงได้ก่อนยกเลิก")
+            st.session_state.search_results = job.partial_frame()
+        else:
+            st.markdown(f"""
+            <div class="warning-box">
+                <strong>เกิดข้อผิดพลาด:</strong> {job.error}
+            </div>
+            """, unsafe_allow_html=True)
+            for event in list(job.events):
+                if event["type"] == "error" and event.get("screenshot") and os.path.exists(event["screenshot"]):
+                    st.image(event["screenshot"], caption="ภาพหน้าจอขณะเกิดข้อผิดพลาด")
             
     # Display results if available
     if st.session_state.search_results is not None:
-        df = st.session_state.search_results
+        # กรองและเรียงผลที่ดึงไว้แล้วตามเงื่อนไขปัจจุบัน เปลี่ยนเงื่อนไขได้ทันทีโดยไม่ต้องค้นหาใหม่
+        criteria = dict(
+            search_filters(asset_type, min_price, max_price, department, case_number),
+            min_area_wa=land_area_wa(land_rai, land_ngan, land_wa),
+            owner=(owner or "").strip(),
+            auction_date=auction_date,
+            with_images=with_images,
+        )
+        all_results = st.session_state.search_results
+        df = query_results(all_results, criteria, sort_by)
+        if criteria["owner"] and not any(column in all_results.columns for column in OWNER_COLUMNS):
+            st.info("ผลการค้นหานี้ไม่มีข้อมูลเจ้าของ ยังไม่ได้กรองตามชื่อเจ้าของ "
+                    "(กด \"ค้นหาทรัพย์\" เพื่อดึงรายละเอียดพร้อมชื่อเจ้าของ)")
         
         if df.empty:
             st.warning("ไม่พบข้อมูลทรัพย์ตามเงื่อนไขที่ระบุ")
         else:
+            if len(df) < len(all_results):
+                st.caption(f"กรองจากผลการค้นหาล่าสุด {len(all_results):,} รายการ "
+                           "(กด \"ค้นหาทรัพย์\" เพื่อดึงข้อมูลตามเงื่อนไขใหม่จากเว็บไซต์)")
             st.markdown('<div class="section-header">ผลการค้นหา</div>', unsafe_allow_html=True)
             st.markdown('<div class="results-section">', unsafe_allow_html=True)
             
@@ -693,7 +727,7 @@ def main():
                 
                 price_distribution = []
                 for min_price, max_price, label in price_ranges:
-                    count = len(df[(df['ราคาประเมิน'] >= min_price) & (df['ราคาประเมิน'] < max_price)])
+                    count = int(((df['ราคาประเมิน'] >= min_price) & (df['ราคาประเมิน'] < max_price)).sum())
                     price_distribution.append({"ช่วงราคา": label, "จำนวน": count})
                 
                 price_df = pd.DataFrame(price_distribution)
@@ -728,23 +762,22 @@ def main():
             # Data table with improved formatting
             st.markdown('<div class="section-header">รายการทรัพย์ทั้งหมด</div>', unsafe_allow_html=True)
             
-            # Format the dataframe for display
-            display_df = df.copy()
-            
-            # Format price column
-            if "ราคาประเมิน" in display_df.columns:
-                display_df["ราคาประเมิน"] = display_df["ราคาประเมิน"].apply(lambda x: f"{int(x):,} บาท" if pd.notnull(x) else "")
-            
-            # Display the table with custom styling
+            # Display the table with custom styling (ใช้ df โดยตรง การจัดรูปแบบอยู่ใน column_config จึงไม่ต้องคัดลอก)
             st.dataframe(
-                display_df,
+                df,
                 use_container_width=True,
                 column_config={
-                    "ราคาประเมิน": st.column_config.TextColumn(
+                    # ราคาเป็นตัวเลขอยู่แล้ว ให้ตารางจัดรูปแบบเอง (เรียงลำดับตามตัวเลขได้ถูกต้อง)
+                    "ราคาประเมิน": st.column_config.NumberColumn(
                         "ราคาประเมิน",
                         help="ราคาประเมินของทรัพย์",
+                        format="%d บาท",
                         width="medium",
                     ),
+                    "ราคาต่อตร.วา": st.column_config.NumberColumn(
+                        "ราคาต่อตร.วา",
+                        format="%d บาท",
+                    ),
                     "ประเภททรัพย์": st.column_config.TextColumn(
                         "ประเภททรัพย์",
                         width="medium",
@@ -753,6 +786,10 @@ def main():
                         "หมายเลขคดี",
                         width="medium",
                     ),
+                    "ลิงก์รายละเอียด": st.column_config.LinkColumn(
+                        "ลิงก์รายละเอียด",
+                        display_text="เปิดดู",
+                    ),
                 },
                 height=400
             )
@@ -762,8 +799,8 @@ def main():
             
             export_col1, export_col2, export_col3 = st.columns(3)
             
-            # ปรับปรุงชื่อคอลัมน์ในไฟล์ที่ส่งออก
-            export_df = df.copy()
+            # ส่งออกจาก df โดยตรง (การส่งออกไม่แก้ไขข้อมูล จึงไม่ต้องคัดลอก)
+            export_df = df
             
             with export_col1:
                 csv = export_df.to_csv(index=False, encoding='utf-8-sig')
@@ -799,8 +836,8 @@ def main():
                     for col_num, value in enumerate(export_df.columns.values):
                         worksheet.write(0, col_num, value, header_format)
                         
-                    # Set column widths
-                    worksheet.set_column('A:K', 15)
+                    # Set column widths for every exported column
+                    worksheet.set_column(0, len(export_df.columns) - 1, 15)
                     
                     # Add a number format for the price column
                     money_format = workbook.add_format({'num_format': '#,##0 "บาท"'})
@@ -996,8 +1033,8 @@ def main():
                                 for col_num, value in enumerate(export_df.columns.values):
                                     worksheet.write(0, col_num, value, header_format)
                                     
-                                # Set column widths
-                                worksheet.set_column('A:K', 15)
+                                # Set column widths for every exported column
+                                worksheet.set_column(0, len(export_df.columns) - 1, 15)
                                 
                                 # Add a number format for the price column
                                 money_format = workbook.add_format({'num_format': '#,##0 "บาท"'})
@@ -1051,6 +1088,37 @@ def main():
             
             st.markdown('</div>', unsafe_allow_html=True)
 
+    # สถิติระบบดึงข้อมูล (pool ของเบราว์เซอร์ และเวลารอแต่ละขั้นตอน)
+    with st.sidebar.expander("สถานะระบบดึงข้อมูล"):
+        pool = current_pool()
+        if pool is not None:
+            pool_stats = pool.stats()
+            st.markdown(f"""
+            **WebDriver pool:** ใช้งาน {pool_stats['in_use']}/{pool_stats['size']} | รอใช้งาน {pool_stats['idle']}  
+            เปิดใหม่ {pool_stats['launched']} | รีไซเคิล {pool_stats['recycled']}  
+            เวลารอเฉลี่ย {pool_stats['wait_seconds_avg']} วินาที (สูงสุด {pool_stats['wait_seconds_max']} วินาที)
+            """)
+        else:
+            st.caption("ยังไม่ได้เปิดใช้งาน WebDriver pool")
+        st.dataframe(pd.DataFrame(get_wait_stats()).T, use_container_width=True)
+        retry_stats = get_retry_stats()
+        st.markdown(f"""
+        **การลองใหม่:** ลองใหม่ {retry_stats['retries']} ครั้ง | สำเร็จหลังลองใหม่ {retry_stats['recovered']} | ล้มเหลว {retry_stats['gave_up']}  
+        **Circuit breaker:** {retry_stats['breaker_state']} | หยุดพักแล้ว {retry_stats['breaker_opened']} ครั้ง ({retry_stats['breaker_paused_seconds']} วินาที)
+        """)
+        cache_stats = get_search_cache().stats()
+        st.markdown(f"""
+        **แคชผลการค้นหา:** {cache_stats['entries']} รายการ ({cache_stats['size_mb']} MB)  
+        hit {cache_stats['hits']} | miss {cache_stats['misses']} | อัตรา hit {cache_stats['hit_rate']:.0%} | ลบออก {cache_stats['evictions']}
+        """)
+        store_stats = get_asset_store().stats()
+        job_stats = get_job_manager().stats()
+        st.markdown(f"**งานค้นหาเบื้องหลัง:** กำลังทำงาน {job_stats['running']} | รอคิว {job_stats['queued']} | เสร็จแล้ว {job_stats['done']}")
+        st.markdown(f"""
+        **คลังข้อมูลทรัพย์:** {store_stats['assets']:,} รายการ จาก {store_stats['partitions']} พื้นที่  
+        ข้อมูลเก่าที่สุด {store_stats['oldest_partition_hours'] if store_stats['oldest_partition_hours'] is not None else '-'} ชั่วโมง
+        """)
+
     # Footer
     st.markdown("""
     <footer>
@@ -0,0 +1,97 @@
+import numpy as np
+import pandas as pd
+
+AREA_WA_COLUMN = 'เนื้อที่ (ตร.วา)'  # คอลัมน์จาก web_scraping.normalize_frame
+
+# ✅ กรองและเรียงผลการค้นหาฝั่งเรา: รวมทุกเงื่อนไขเป็น boolean mask เดียว แล้วเรียงครั้งเดียว
+# ใช้กับผลที่ดึงไว้แล้ว (แคช / คลังข้อมูล) ปรับเงื่อนไขได้ทันทีโดยไม่ต้องดึงข้อมูลจากเว็บไซต์ใหม่
+# เงื่อนไข (dict): asset_type, min_price, max_price, department, case_number (ชุดเดียวกับ search_filters)
+#   และ min_area_wa (เนื้อที่ขั้นต่ำ ตร.วา), owner, auction_date (date), with_images (bool)
+SORT_OPTIONS = {
+    "ราคาประเมิน (สูง-ต่ำ)": ("ราคาประเมิน", False),
+    "ราคาประเมิน (ต่ำ-สูง)": ("ราคาประเมิน", True),
+    "วันที่ประมูล (ล่าสุด)": ("วันขายนัดถัดไป", False),
+    "วันที่ประมูล (เก่าสุด)": ("วันขายนัดถัดไป", True),
+}
+OWNER_COLUMNS = ['ผู้ถือกรรมสิทธิ์', 'เจ้าของ', 'ชื่อเจ้าของ']
+
+
+def _number(value):
+    try:
+        return float(str(value).replace(",", "")) if str(value or "").strip() else 0.0
+    except ValueError:
+        return 0.0
+
+
+def land_area_wa(rai=None, ngan=None, wa=None):
+    # เนื้อที่เป็นตารางวา (1 ไร่ = 4 งาน = 400 ตร.วา)
+    return _number(rai) * 400 + _number(ngan) * 100 + _number(wa)
+
+
+def _contains(df, column, text):
+    # ตรวจข้อความเฉพาะค่าที่ไม่ซ้ำกัน แล้วกระจายผลกลับด้วยรหัส (คอลัมน์อย่างประเภททรัพย์มีไม่กี่ค่า)
+    codes, uniques = pd.factorize(df[column])
+    hits = np.asarray(pd.Index(uniques).astype(str).str.contains(text, regex=False), dtype=bool)
+    return np.append(hits, False)[codes]  # รหัส -1 (ค่าว่าง) ชี้ไปที่ False ตัวท้าย
+
+
+def filter_mask(df, criteria):
+    # คืน numpy boolean array ความยาวเท่า df
+    mask = np.ones(len(df), dtype=bool)
+    if not criteria or df.empty:
+        return mask
+    if criteria.get("asset_type"):
+        mask &= _contains(df, 'ประเภททรัพย์', criteria["asset_type"])
+    if criteria.get("min_price") or criteria.get("max_price"):
+        prices = pd.to_numeric(df['ราคาประเมิน'], errors='coerce').to_numpy(dtype=float, na_value=np.nan)
+        if criteria.get("min_price"):
+            mask &= prices >= criteria["min_price"]
+        if criteria.get("max_price"):
+            mask &= prices <= criteria["max_price"]
+    if criteria.get("case_number"):
+        mask &= _contains(df, 'หมายเลขคดี', criteria["case_number"])
+    if criteria.get("min_area_wa"):
+        if AREA_WA_COLUMN in df.columns:
+            area = df[AREA_WA_COLUMN].to_numpy(dtype=float)
+        else:
+            area = (df['ไร่'].to_numpy(dtype=float) * 400 + df['งาน'].to_numpy(dtype=float) * 100
+                    + df['ตร.วา'].to_numpy(dtype=float))
+        mask &= area >= criteria["min_area_wa"]
+    # เงื่อนไขด้านล่างใช้คอลัมน์จากหน้ารายละเอียด กรองเฉพาะเมื่อมีคอลัมน์นั้น
+    if criteria.get("department") and 'หน่วยงานที่ขาย' in df.columns:
+        mask &= _contains(df, 'หน่วยงานที่ขาย', criteria["department"])
+    if criteria.get("owner"):
+        columns = [column for column in OWNER_COLUMNS if column in df.columns]
+        if columns:
+            mask &= np.logical_or.reduce([_contains(df, column, criteria["owner"]) for column in columns])
+    if criteria.get("auction_date") and 'วันขายนัดทั้งหมด' in df.columns:
+        # ล็อตที่มีนัดขายตรงกับวันที่เลือก (นัดใดก็ได้)
+        dates = df['วันขายนัดทั้งหมด'].explode()
+        hits = (dates == pd.Timestamp(criteria["auction_date"]).date().isoformat()).groupby(level=0).any()
+        mask &= hits.reindex(df.index, fill_value=False).to_numpy()
+    if criteria.get("with_images") and 'จำนวนรูปภาพ' in df.columns:
+        mask &= df['จำนวนรูปภาพ'].fillna(0).to_numpy(dtype=int) > 0
+    return mask
+
+
+def sort_results(df, sort_by):
+    column, ascending = SORT_OPTIONS.get(sort_by, (None, True))
+    if column is None or column not in df.columns:
+        return df
+    return df.sort_values(column, ascending=ascending, na_position="last", kind="stable")
+
+
+def subset(df, mask):
+    # เลือกแถวตาม mask และตัดหมวดของ categorical ที่ไม่เหลือแถวแล้ว (value_counts จะไม่แสดงหมวดที่เป็น 0)
+    df = df[mask]
+    categories = {column: df[column].cat.remove_unused_categories() for column in df.columns
+                  if isinstance(df[column].dtype, pd.CategoricalDtype)}
+    return df.assign(**categories) if categories else df
+
+
+def query_results(df, criteria=None, sort_by=None):
+    # กรองด้วย mask เดียวแล้วเรียง (ไม่คัดลอกข้อมูลเมื่อไม่มีเงื่อนไขใดตัดแถวออก)
+    mask = filter_mask(df, criteria)
+    if not mask.all():
+        df = subset(df, mask)
+    return sort_results(df, sort_by)
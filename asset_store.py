@@ -0,0 +1,197 @@
+import os
+import sqlite3
+import time
+
+import pandas as pd
+
+from search_cache import cached_scrape_led_data
+from web_scraping import COLUMNS, LotRecord, apply_search_filters, clean_district_name, clean_subdistrict_name, \
+    compact_frame, frame_lot_keys, normalize_frame
+
+# ✅ คลังข้อมูลทรัพย์ในเครื่อง (SQLite) แอปอ่านจากที่นี่ และดึงจากเว็บไซต์เฉพาะพื้นที่ที่ข้อมูลเก่าแล้ว
+ASSET_DB_PATH = os.environ.get("LED_ASSET_DB", "led_assets.sqlite3")
+MAX_AGE_SECONDS = int(os.environ.get("LED_ASSET_MAX_AGE", str(6 * 3600)))
+
+# ชื่อคอลัมน์ในตาราง assets ตามลำดับ COLUMNS (ชุดเดียวกับฟิลด์ของ LotRecord)
+DB_COLUMNS = list(LotRecord.__slots__)
+
+SCHEMA = """
+CREATE TABLE IF NOT EXISTS assets (
+    lot_key TEXT PRIMARY KEY,
+    seq TEXT, lot TEXT, case_number TEXT, property_type TEXT,
+    rai REAL, ngan REAL, wa REAL, price REAL,
+    tambon TEXT, amphoe TEXT, province TEXT, detail_url TEXT,
+    position INTEGER,
+    first_seen REAL NOT NULL,
+    last_seen REAL NOT NULL
+);
+CREATE INDEX IF NOT EXISTS assets_location ON assets (province, amphoe, tambon);
+CREATE INDEX IF NOT EXISTS assets_property_type ON assets (property_type);
+CREATE INDEX IF NOT EXISTS assets_price ON assets (price);
+CREATE INDEX IF NOT EXISTS assets_case_number ON assets (case_number);
+CREATE TABLE IF NOT EXISTS partitions (
+    province TEXT NOT NULL, amphoe TEXT NOT NULL, tambon TEXT NOT NULL,
+    refreshed_at REAL NOT NULL,
+    pages INTEGER,
+    rows INTEGER NOT NULL,
+    PRIMARY KEY (province, amphoe, tambon)
+);
+"""
+
+
+def partition_args(province, district, subdistrict):
+    return (province or "").strip(), clean_district_name(district), clean_subdistrict_name(subdistrict)
+
+
+class AssetStore:
+    """ตารางทรัพย์พร้อมดัชนี และเวลาที่ดึงข้อมูลแต่ละพื้นที่ (จังหวัด/อำเภอ/ตำบล) ล่าสุด"""
+
+    def __init__(self, path=ASSET_DB_PATH, max_age=MAX_AGE_SECONDS):
+        self.path = path
+        self.max_age = max_age
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.executescript(SCHEMA)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def upsert(self, df, seen_at=None):
+        # เพิ่มหรืออัปเดตทรัพย์ตามกุญแจล็อต (หมายเลขคดี + ล็อตที่-ชุดที่)
+        seen_at = seen_at or time.time()
+        frame = df[COLUMNS].astype(object).where(df[COLUMNS].notna(), None)
+        # เก็บชื่ออำเภอ/ตำบลแบบไม่มีคำนำหน้า ให้ตรงกับเงื่อนไขค้นหา
+        frame["ตำบล"] = frame["ตำบล"].map(clean_subdistrict_name)
+        frame["อำเภอ"] = frame["อำเภอ"].map(clean_district_name)
+        rows = [
+            (key, *row, position, seen_at, seen_at)
+            for position, (key, row) in enumerate(zip(frame_lot_keys(df), frame.itertuples(index=False, name=None)))
+        ]
+        with self._connect() as conn:
+            conn.executemany(f"""
+                INSERT INTO assets (lot_key, {", ".join(DB_COLUMNS)}, position, first_seen, last_seen)
+                VALUES ({", ".join("?" * (len(DB_COLUMNS) + 4))})
+                ON CONFLICT(lot_key) DO UPDATE SET
+                    {", ".join(f"{column} = excluded.{column}" for column in DB_COLUMNS)},
+                    position = excluded.position,
+                    last_seen = excluded.last_seen
+            """, rows)
+        return len(rows)
+
+    def delete(self, lot_keys):
+        with self._connect() as conn:
+            conn.executemany("DELETE FROM assets WHERE lot_key = ?", [(key,) for key in lot_keys])
+
+    def _where(self, province, district, subdistrict):
+        clauses, params = [], []
+        for column, value in zip(("province", "amphoe", "tambon"), partition_args(province, district, subdistrict)):
+            if value:
+                clauses.append(f"{column} = ?")
+                params.append(value)
+        return clauses, params
+
+    def mark_refreshed(self, province, district, subdistrict, rows, pages=None, refreshed_at=None, complete=False):
+        # complete=True: ดึงครบทุกหน้าแล้ว ทรัพย์ในพื้นที่นี้ที่ไม่พบในรอบนี้ถือว่าถูกถอดออกจากประกาศ
+        refreshed_at = refreshed_at or time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO partitions (province, amphoe, tambon, refreshed_at, pages, rows) "
+                "VALUES (?, ?, ?, ?, ?, ?)",
+                (*partition_args(province, district, subdistrict), refreshed_at, pages, rows),
+            )
+            if complete:
+                clauses, params = self._where(province, district, subdistrict)
+                conn.execute(
+                    f"DELETE FROM assets WHERE {' AND '.join(clauses + ['last_seen < ?'])}",
+                    params + [refreshed_at],
+                )
+
+    def is_stale(self, province, district, subdistrict, pages=None):
+        # pages=None หมายถึงต้องการทุกหน้า
+        # พื้นที่ที่กว้างกว่า (จังหวัด/อำเภอ) ที่ดึงครบทุกหน้าเมื่อไม่นานนี้ ครอบคลุมพื้นที่ย่อยด้วย
+        province, district, subdistrict = partition_args(province, district, subdistrict)
+        candidates = {(province, district, subdistrict), (province, district, ""), (province, "", "")}
+        with self._connect() as conn:
+            rows = conn.execute(
+                "SELECT amphoe, tambon, pages FROM partitions WHERE province = ? AND refreshed_at >= ?",
+                (province, time.time() - self.max_age),
+            ).fetchall()
+        for amphoe, tambon, refreshed_pages in rows:
+            if (province, amphoe, tambon) not in candidates:
+                continue
+            if refreshed_pages is None:
+                return False
+            if (amphoe, tambon) == (district, subdistrict) and pages is not None and pages <= refreshed_pages:
+                return False
+        return True
+
+    def query(self, province="", district="", subdistrict="", property_type=None, min_price=None, max_price=None,
+              case_number=None, limit=None):
+        clauses, params = self._where(province, district, subdistrict)
+        if property_type:
+            clauses.append("property_type = ?")
+            params.append(property_type)
+        if min_price is not None:
+            clauses.append("price >= ?")
+            params.append(min_price)
+        if max_price is not None:
+            clauses.append("price <= ?")
+            params.append(max_price)
+        if case_number:
+            clauses.append("case_number = ?")
+            params.append(case_number)
+        sql = f"SELECT {', '.join(DB_COLUMNS)} FROM assets"
+        if clauses:
+            sql += f" WHERE {' AND '.join(clauses)}"
+        sql += " ORDER BY province, amphoe, tambon, position"
+        if limit:
+            sql += f" LIMIT {int(limit)}"
+        with self._connect() as conn:
+            rows = conn.execute(sql, params).fetchall()
+        return compact_frame(normalize_frame(pd.DataFrame(rows, columns=COLUMNS)))
+
+    def stats(self):
+        with self._connect() as conn:
+            assets = conn.execute("SELECT COUNT(*) FROM assets").fetchone()[0]
+            partitions, oldest = conn.execute("SELECT COUNT(*), MIN(refreshed_at) FROM partitions").fetchone()
+        return {
+            "assets": assets,
+            "partitions": partitions,
+            "oldest_partition_hours": round((time.time() - oldest) / 3600, 1) if oldest else None,
+        }
+
+
+_store = None
+
+
+def get_asset_store():
+    global _store
+    if _store is None:
+        _store = AssetStore()
+    return _store
+
+
+def search_assets(province='', district='', subdistrict='', max_pages=None, force_refresh=False, on_event=None,
+                  run_id=None, filters=None):
+    # คืน (df, error, แหล่งข้อมูล: "store" / "cache" / "live") on_event ได้รับความคืบหน้าเมื่อดึงจากเว็บไซต์
+    # filters: เงื่อนไขจาก search_filters() ใช้ข้อมูลในคลังได้เฉพาะเมื่อพื้นที่นั้นดึงครบทุกหน้าแล้ว
+    store = get_asset_store()
+    if not force_refresh and not store.is_stale(province, district, subdistrict, None if filters else max_pages):
+        filters = filters or {}
+        df = store.query(province, district, subdistrict, min_price=filters.get("min_price"),
+                         max_price=filters.get("max_price"))
+        return apply_search_filters(df, filters), None, "store"
+
+    df, error, from_cache, failed_pages = cached_scrape_led_data(
+        province, district, subdistrict, max_pages, force_refresh, on_event, run_id, filters
+    )
+    if error is not None:
+        return df, error, "live"
+    refreshed_at = time.time()
+    store.upsert(df, refreshed_at)
+    if not filters and not failed_pages:
+        # ผลที่กรองแล้วเป็นเพียงบางส่วนของพื้นที่ จึงไม่นับว่าพื้นที่นั้นอัปเดตแล้ว
+        # ผลที่ขาดบางหน้าก็เช่นกัน (เหมือน bulk_crawl.store_partition) ล็อตในหน้าที่ดึงไม่ได้ต้องไม่ถูกลบ
+        store.mark_refreshed(province, district, subdistrict, len(df), max_pages, refreshed_at,
+                             complete=max_pages is None)
+    return df, None, "cache" if from_cache else "live"
@@ -0,0 +1,144 @@
+import argparse
+import os
+import time
+from urllib.parse import urljoin
+
+from led_stub_server import start_stub_server
+
+# ✅ วัดความเร็วการดึงข้อมูลของแต่ละ backend กับเซิร์ฟเวอร์จำลอง (ไม่ต้องต่ออินเทอร์เน็ต)
+
+
+def bench_backend(name, pages):
+    from web_scraping import create_backend
+
+    started = time.perf_counter()
+    backend = create_backend(name)
+    try:
+        total_pages = backend.search("กรุงเทพมหานคร", "", "")
+        searched = time.perf_counter()
+        rows = 0
+        for page in range(1, min(pages, total_pages) + 1):
+            rows += len(backend.fetch_page(page))
+        finished = time.perf_counter()
+    finally:
+        backend.close()
+    return {
+        "backend": name,
+        "search_seconds": round(searched - started, 3),
+        "pages": min(pages, total_pages),
+        "rows": rows,
+        "seconds_per_page": round((finished - searched) / max(min(pages, total_pages), 1), 4),
+        "total_seconds": round(finished - started, 3),
+    }
+
+
+def bench_browser_profile(lean, pages):
+    # เทียบโปรไฟล์ Chrome แบบประหยัดกับแบบเดิม: เวลาโหลดต่อหน้าและหน่วยความจำของเบราว์เซอร์
+    from driver_pool import DriverPool, driver_memory_mb
+    from web_scraping import SeleniumBackend
+
+    pool = DriverPool(size=1, min_idle=0, lean=lean)
+    backend = SeleniumBackend(pool)
+    started = time.perf_counter()
+    try:
+        total_pages = min(backend.search("กรุงเทพมหานคร", "", ""), pages)
+        searched = time.perf_counter()
+        rows = 0
+        for page in range(1, total_pages + 1):
+            rows += len(backend.fetch_page(page))
+        finished = time.perf_counter()
+        memory_mb = driver_memory_mb(backend.driver)
+    finally:
+        backend.close()
+        pool.shutdown()
+    return {
+        "profile": "lean" if lean else "full",
+        "search_seconds": round(searched - started, 3),
+        "pages": total_pages,
+        "rows": rows,
+        "seconds_per_page": round((finished - searched) / max(total_pages, 1), 4),
+        "memory_mb": round(memory_mb, 1),
+        "memory_mb_per_page": round(memory_mb / max(total_pages, 1), 2),
+    }
+
+
+def bench_flaky(pages, concurrency):
+    # ดึงข้อมูลผ่านเส้นทางปกติ (ลองใหม่ + circuit breaker) กับเซิร์ฟเวอร์ที่ตอบ 503 บางคำขอ
+    from web_scraping import get_retry_stats, iter_led_data
+
+    started = time.perf_counter()
+    done, failed, rows = 0, 0, 0
+    for batch in iter_led_data("กรุงเทพมหานคร", max_pages=pages, backend="http", concurrency=concurrency,
+                               checkpoint_dir=None):
+        if batch["error"] is None:
+            done += 1
+            rows += len(batch["rows"])
+        else:
+            failed += 1
+    elapsed = time.perf_counter() - started
+    return dict({
+        "pages": done,
+        "failed_pages": failed,
+        "rows": rows,
+        "pages_per_second": round(done / elapsed, 2),
+        "total_seconds": round(elapsed, 3),
+    }, **get_retry_stats())
+
+
+def bench_memory(rows):
+    # หน่วยความจำของผลลัพธ์ rows แถว (memory_usage(deep=True)): สตริงทุกคอลัมน์ เทียบกับรูปแบบประหยัด
+    import pandas as pd
+    from led_stub_server import detail_query, generate_rows
+    from web_scraping import COLUMNS, LED_SEARCH_URL, compact_frame, frame_memory_mb, records_to_frame
+
+    records = [row + [urljoin(LED_SEARCH_URL, f"asset_open.asp?{detail_query(row)}")]
+               for row in generate_rows("", "", "", rows)]
+    raw = pd.DataFrame(records, columns=COLUMNS)
+    started = time.perf_counter()
+    compact = compact_frame(records_to_frame(records))
+    return {
+        "rows": rows,
+        "object_mb": frame_memory_mb(raw),
+        "compact_mb": frame_memory_mb(compact),
+        "ratio": round(frame_memory_mb(raw) / max(frame_memory_mb(compact), 0.01), 1),
+        "convert_seconds": round(time.perf_counter() - started, 3),
+    }
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="วัดความเร็ว backend การดึงข้อมูลทรัพย์")
+    parser.add_argument("--pages", type=int, default=20)
+    parser.add_argument("--delay", type=float, default=0.0, help="หน่วงเวลาตอบกลับของเซิร์ฟเวอร์จำลอง (วินาที)")
+    parser.add_argument("--selenium", action="store_true", help="วัด SeleniumBackend ด้วย (ต้องมี Chrome)")
+    parser.add_argument("--fail-rate", type=float, default=0.0,
+                        help="สัดส่วนคำขอที่เซิร์ฟเวอร์จำลองตอบ 503 (วัดการลองใหม่และ circuit breaker)")
+    parser.add_argument("--concurrency", type=int, default=4)
+    parser.add_argument("--browser-profiles", action="store_true",
+                        help="เทียบโปรไฟล์ Chrome แบบประหยัดกับแบบเดิม (ต้องมี Chrome)")
+    parser.add_argument("--url", help="วัดกับเว็บไซต์จริงที่ URL นี้แทนเซิร์ฟเวอร์จำลอง")
+    parser.add_argument("--memory", type=int, metavar="ROWS",
+                        help="วัดหน่วยความจำของผลลัพธ์ ROWS แถว ก่อนและหลังแปลงเป็นรูปแบบประหยัด")
+    args = parser.parse_args()
+
+    if args.memory:
+        print(bench_memory(args.memory))
+        raise SystemExit
+
+    server = None
+    if args.url:
+        os.environ["LED_SEARCH_URL"] = args.url
+    else:
+        server, url = start_stub_server(total_rows=args.pages * 50, delay=args.delay, fail_rate=args.fail_rate)
+        os.environ["LED_SEARCH_URL"] = url
+
+    if args.browser_profiles:
+        for lean in (False, True):
+            print(bench_browser_profile(lean, args.pages))
+    elif args.fail_rate:
+        print(bench_flaky(args.pages, args.concurrency))
+    else:
+        backends = ["http", "selenium"] if args.selenium else ["http"]
+        for name in backends:
+            print(bench_backend(name, args.pages))
+    if server:
+        server.shutdown()
@@ -0,0 +1,228 @@
+import argparse
+import json
+import os
+import time
+from concurrent.futures import FIRST_COMPLETED, ProcessPoolExecutor, wait
+from datetime import datetime
+
+from asset_store import ASSET_DB_PATH, AssetStore
+from web_scraping import COLUMNS, CrawlCheckpoint, SearchError, checkpoint_dir_for, clean_district_name, \
+    fetch_pages, open_search, records_to_frame
+
+# ✅ ดึงข้อมูลทรัพย์ทั้งประเทศ: กระจายงานรายจังหวัด (หรือรายอำเภอสำหรับจังหวัดที่มีข้อมูลมาก) ให้หลายโปรเซส
+SPLIT_PAGES = 40  # จังหวัดที่มีผลลัพธ์เกินจำนวนหน้านี้ แยกดึงรายอำเภอแทน
+
+
+def load_provinces(path="thai_provinces.json"):
+    # คืน [(จังหวัด, [อำเภอ, ...]), ...] ตาม thai_provinces.json
+    with open(path, "r", encoding="utf-8") as f:
+        data = json.load(f)
+    return [
+        (province["name_th"], [amphure["name_th"] for amphure in province.get("amphure", [])])
+        for province in data
+    ]
+
+
+def crawl_partition(province, district, backend="auto", max_pages=None, split_pages=SPLIT_PAGES, concurrency=2,
+                    checkpoint_dir=checkpoint_dir_for("bulk")):
+    # ทำงานในโปรเซสลูก: ดึงข้อมูลหนึ่งจังหวัด (หรือหนึ่งอำเภอ) คืนผลเป็น dict
+    # หน้าที่ดึงสำเร็จถูกบันทึกเป็นจุดดึงต่อ หากรอบก่อนหยุดกลางคันจะดึงเฉพาะหน้าที่เหลือ
+    started = time.monotonic()
+    result = {
+        "province": province, "district": district, "rows": [], "pages": 0, "resumed_pages": 0,
+        "failed_pages": [], "split": False, "error": None,
+    }
+    active = None
+    checkpoint = None
+    try:
+        search_args = (province, clean_district_name(district), "")
+        active, found_pages = open_search(search_args, backend)
+        if not district and split_pages and found_pages > split_pages:
+            result["split"] = True
+            return result
+        total_pages = found_pages if max_pages is None else min(found_pages, max_pages)
+
+        checkpoint = CrawlCheckpoint(checkpoint_dir, search_args, found_pages)
+        pages = {page: rows for page, rows in checkpoint.pages.items() if page <= total_pages}
+        result["resumed_pages"] = len(pages)
+        for page, rows, page_error in fetch_pages(active, search_args, total_pages, concurrency,
+                                                  checkpoint.pending(total_pages)):
+            if page_error is None:
+                pages[page] = rows
+                checkpoint.record(page, rows)
+            else:
+                result["failed_pages"].append(page)
+        if not result["failed_pages"]:
+            checkpoint.finish()
+        result["rows"] = [row for page in sorted(pages) for row in pages[page]]
+        result["pages"] = len(pages)
+    except SearchError as search_error:
+        active = search_error.backend
+        result["error"] = str(search_error.__cause__)
+    except Exception as e:
+        result["error"] = str(e)
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        if active:
+            active.close()
+        result["seconds"] = round(time.monotonic() - started, 2)
+    return result
+
+
+def partition_path(output_dir, province):
+    # หนึ่งไฟล์ JSON Lines ต่อจังหวัด ระหว่างดึงเขียนลงไฟล์ชั่วคราวของรอบนี้ก่อน
+    path = os.path.join(output_dir, f"{province}.jsonl")
+    return path, f"{path}.{os.getpid()}.tmp"
+
+
+def write_partition(output_dir, result, crawled_at, fresh=False):
+    # เขียนผลทันทีที่ได้รับลงไฟล์ชั่วคราวของจังหวัด ส่วนแรกของรอบเริ่มไฟล์ใหม่ ส่วนถัดไป (รายอำเภอ) เขียนต่อท้าย
+    _, temp_path = partition_path(output_dir, result["province"])
+    with open(temp_path, "w" if fresh else "a", encoding="utf-8") as f:
+        for row in result["rows"]:
+            record = dict(zip(COLUMNS, row))
+            record["crawled_at"] = crawled_at
+            f.write(json.dumps(record, ensure_ascii=False) + "\n")
+
+
+def finish_partition_file(output_dir, province, complete):
+    # ทุกส่วนของจังหวัดเสร็จแล้ว: ดึงได้ครบแทนที่ไฟล์ของรอบก่อนแบบ atomic (ดึงซ้ำจึงไม่มีแถวซ้ำ)
+    # ดึงได้ไม่ครบทิ้งไฟล์ชั่วคราว คงไฟล์ของรอบก่อนไว้
+    path, temp_path = partition_path(output_dir, province)
+    if complete:
+        os.replace(temp_path, path)
+    elif os.path.exists(temp_path):
+        os.remove(temp_path)
+
+
+def store_partition(store, result, refreshed_at, max_pages):
+    # บันทึกลงคลังข้อมูลทรัพย์ พื้นที่ที่ดึงครบทุกหน้าโดยไม่มีข้อผิดพลาดถือว่าเป็นข้อมูลล่าสุดทั้งหมด
+    if result["error"]:
+        return
+    if result["rows"]:
+        store.upsert(records_to_frame(result["rows"]), refreshed_at)
+    complete = max_pages is None and not result["failed_pages"]
+    store.mark_refreshed(result["province"], result["district"], "", len(result["rows"]), max_pages, refreshed_at,
+                         complete=complete)
+
+
+def crawl_nationwide(provinces, output_dir, workers=4, backend="auto", max_pages=None, split_pages=SPLIT_PAGES,
+                     store=None):
+    os.makedirs(output_dir, exist_ok=True)
+    crawled_at = datetime.now().isoformat(timespec="seconds")
+    refreshed_at = time.time()
+    amphures = dict(provinces)
+    started = time.monotonic()
+    totals = {"rows": 0, "pages": 0, "partitions": 0}
+    by_province = {
+        name: {"rows": 0, "pages": 0, "pending": 0, "errors": [], "complete": False} for name, _ in provinces
+    }
+    written = set()  # จังหวัดที่เริ่มเขียนไฟล์ของรอบนี้แล้ว
+
+    with ProcessPoolExecutor(max_workers=workers) as executor:
+        pending = {}
+
+        def submit(province, district="", split=split_pages):
+            future = executor.submit(crawl_partition, province, district, backend, max_pages, split)
+            pending[future] = (province, district)
+            by_province[province]["pending"] += 1
+
+        for province, _ in provinces:
+            submit(province)
+
+        while pending:
+            done, _ = wait(pending, return_when=FIRST_COMPLETED)
+            for future in done:
+                province, district = pending.pop(future)
+                stats = by_province[province]
+                stats["pending"] -= 1
+                result = future.result()
+
+                if result["split"]:
+                    if not amphures[province]:
+                        # ไม่มีรายชื่ออำเภอให้แยก ดึงทั้งจังหวัดโดยไม่แยก
+                        print(f"↪ {province}: ผลลัพธ์เกิน {split_pages} หน้า แต่ไม่มีรายชื่ออำเภอ ดึงทั้งจังหวัด")
+                        submit(province, split=0)
+                        continue
+                    # จังหวัดนี้มีข้อมูลมาก แยกงานเป็นรายอำเภอ
+                    print(f"↪ {province}: ผลลัพธ์เกิน {split_pages} หน้า แยกดึงราย {len(amphures[province])} อำเภอ")
+                    for amphure in amphures[province]:
+                        submit(province, amphure)
+                    continue
+
+                write_partition(output_dir, result, crawled_at, fresh=province not in written)
+                written.add(province)
+                if store is not None:
+                    store_partition(store, result, refreshed_at, max_pages)
+                totals["rows"] += len(result["rows"])
+                totals["pages"] += result["pages"]
+                totals["partitions"] += 1
+                stats["rows"] += len(result["rows"])
+                stats["pages"] += result["pages"]
+                if result["error"] or result["failed_pages"]:
+                    stats["errors"].append({
+                        "district": district, "error": result["error"], "failed_pages": result["failed_pages"],
+                    })
+
+                elapsed = max(time.monotonic() - started, 1e-6)
+                label = f"{province}/{district}" if district else province
+                status = f"ผิดพลาด: {result['error']}" if result["error"] else \
+                    f"{len(result['rows']):,} แถว {result['pages']} หน้า ใน {result['seconds']} วินาที"
+                print(f"[{totals['partitions']}] {label}: {status} | "
+                      f"รวม {totals['rows']:,} แถว ({totals['rows'] / elapsed:.1f} แถว/วินาที, "
+                      f"{totals['pages'] / elapsed:.2f} หน้า/วินาที)")
+                if stats["pending"] == 0:
+                    stats["complete"] = not stats["errors"]
+                    finish_partition_file(output_dir, province, stats["complete"])
+                    if stats["complete"]:
+                        print(f"✅ {province} เสร็จสิ้น: {stats['rows']:,} แถว {stats['pages']} หน้า")
+                    else:
+                        print(f"⚠️ {province} ดึงข้อมูลได้ไม่ครบ ({len(stats['errors'])} ส่วนผิดพลาด) "
+                              f"คงไฟล์ของรอบก่อนไว้")
+
+    elapsed = time.monotonic() - started
+    summary = {
+        "crawled_at": crawled_at,
+        "seconds": round(elapsed, 1),
+        "provinces": len(provinces),
+        "partitions": totals["partitions"],
+        "rows": totals["rows"],
+        "pages": totals["pages"],
+        "rows_per_second": round(totals["rows"] / max(elapsed, 1e-6), 2),
+        "pages_per_second": round(totals["pages"] / max(elapsed, 1e-6), 3),
+        "by_province": {
+            name: {key: value for key, value in stats.items() if key != "pending"}
+            for name, stats in by_province.items()
+        },
+    }
+    with open(os.path.join(output_dir, "summary.json"), "w", encoding="utf-8") as f:
+        json.dump(summary, f, ensure_ascii=False, indent=2)
+    return summary
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ดึงข้อมูลทรัพย์กรมบังคับคดีทุกจังหวัด")
+    parser.add_argument("--output", default="led_snapshot", help="โฟลเดอร์สำหรับเก็บผลลัพธ์")
+    parser.add_argument("--workers", type=int, default=4, help="จำนวนโปรเซสที่ทำงานพร้อมกัน")
+    parser.add_argument("--backend", default="auto", choices=["auto", "http", "selenium"])
+    parser.add_argument("--max-pages", type=int, default=None, help="จำนวนหน้าสูงสุดต่อจังหวัด/อำเภอ")
+    parser.add_argument("--split-pages", type=int, default=SPLIT_PAGES,
+                        help="แยกดึงรายอำเภอเมื่อจังหวัดมีผลลัพธ์เกินจำนวนหน้านี้ (0 = ไม่แยก)")
+    parser.add_argument("--provinces", nargs="*", help="ดึงเฉพาะจังหวัดที่ระบุ")
+    parser.add_argument("--store", nargs="?", const=ASSET_DB_PATH, help="บันทึกลงคลังข้อมูลทรัพย์ (SQLite) ด้วย")
+    args = parser.parse_args()
+
+    provinces = load_provinces()
+    if args.provinces:
+        provinces = [item for item in provinces if item[0] in args.provinces]
+
+    store = AssetStore(args.store) if args.store else None
+    summary = crawl_nationwide(provinces, args.output, args.workers, args.backend, args.max_pages, args.split_pages,
+                               store)
+    print(f"\nสรุป: {summary['rows']:,} แถว {summary['pages']:,} หน้า จาก {summary['provinces']} จังหวัด "
+          f"({summary['partitions']} ส่วน) ใน {summary['seconds']} วินาที "
+          f"({summary['rows_per_second']} แถว/วินาที, {summary['pages_per_second']} หน้า/วินาที)")
+    failed = {name: stats["errors"] for name, stats in summary["by_province"].items() if stats["errors"]}
+    if failed:
+        print(f"⚠️ มี {len(failed)} จังหวัดที่ดึงข้อมูลได้ไม่ครบ ดูรายละเอียดใน summary.json")
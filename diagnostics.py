@@ -0,0 +1,73 @@
+import os
+import random
+import shutil
+import threading
+import uuid
+from datetime import datetime
+
+# ✅ เก็บข้อมูลวินิจฉัย (ภาพหน้าจอ + HTML) แยกโฟลเดอร์ตามงานค้นหา ปิดไว้เป็นค่าเริ่มต้น
+# การค้นหาที่สำเร็จเก็บเพียงบางส่วนตามอัตราสุ่ม ส่วนที่ล้มเหลวเก็บทุกครั้ง
+# เก็บไว้ไม่เกิน DIAGNOSTICS_MAX_RUNS งานล่าสุด งานที่เก่ากว่าถูกลบออก (ring buffer)
+DIAGNOSTICS_ENABLED = os.environ.get("LED_DIAGNOSTICS", "0") == "1"
+DIAGNOSTICS_DIR = os.environ.get("LED_DIAGNOSTICS_DIR", "led_diagnostics")
+DIAGNOSTICS_SAMPLE_RATE = float(os.environ.get("LED_DIAGNOSTICS_SAMPLE_RATE", "0.05"))
+DIAGNOSTICS_MAX_RUNS = int(os.environ.get("LED_DIAGNOSTICS_MAX_RUNS", "50"))
+
+
+class Diagnostics:
+    """ข้อมูลวินิจฉัยของการค้นหาหนึ่งครั้ง เก็บใน <DIAGNOSTICS_DIR>/<run id>/"""
+
+    def __init__(self, run_id=None, directory=DIAGNOSTICS_DIR, sample_rate=DIAGNOSTICS_SAMPLE_RATE,
+                 max_runs=DIAGNOSTICS_MAX_RUNS):
+        self.run_id = run_id or f"{datetime.now():%Y%m%d-%H%M%S}-{uuid.uuid4().hex[:6]}"
+        self.root = directory
+        self.directory = os.path.join(directory, self.run_id)
+        self.max_runs = max_runs
+        self.sampled = random.random() < sample_rate
+        self._count = 0
+        self._created = False
+        self._lock = threading.Lock()
+
+    def capture(self, label, snapshot, failure=False):
+        # snapshot() คืน (ภาพ PNG, HTML) เรียกเฉพาะเมื่อจะบันทึกจริง เพื่อไม่เสียเวลา render โดยไม่จำเป็น
+        # คืน path ของภาพหน้าจอ (ถ้ามี)
+        if not (failure or self.sampled):
+            return None
+        try:
+            screenshot, html = snapshot()
+        except Exception as snapshot_error:
+            print(f"DEBUG: บันทึกข้อมูลวินิจฉัย {label} ไม่สำเร็จ: {snapshot_error}")
+            return None
+
+        with self._lock:
+            if not self._created:
+                os.makedirs(self.directory, exist_ok=True)
+                self._created = True
+                self._evict()
+            self._count += 1
+            prefix = os.path.join(self.directory, f"{self._count:02d}_{label}")
+
+        screenshot_path = None
+        if screenshot:
+            screenshot_path = f"{prefix}.png"
+            with open(screenshot_path, "wb") as f:
+                f.write(screenshot)
+        if html:
+            with open(f"{prefix}.html", "w", encoding="utf-8") as f:
+                f.write(html)
+        return screenshot_path
+
+    def _evict(self):
+        # ลบโฟลเดอร์ของงานที่เก่าที่สุด จนเหลือไม่เกิน max_runs งาน (รวมงานนี้)
+        runs = []
+        for entry in os.scandir(self.root):
+            if entry.is_dir() and entry.path != self.directory:
+                runs.append((entry.stat().st_mtime, entry.path))
+        runs.sort()
+        for _, path in runs[:max(len(runs) - self.max_runs + 1, 0)]:
+            shutil.rmtree(path, ignore_errors=True)
+
+
+def create_diagnostics(run_id=None):
+    # คืน None เมื่อปิดโหมดวินิจฉัย
+    return Diagnostics(run_id) if DIAGNOSTICS_ENABLED else None
@@ -1,6 +1,8 @@
 import requests
 import json
 
+from locations import LOCATION_COMPACT_PATH, compact_locations, save_compact_locations
+
 # ✅ ฟังก์ชันดึงข้อมูลจังหวัด-อำเภอ-ตำบล โดยตัดคำว่า "เขต" หรือ "อำเภอ" ออก
 
 def download_province_data():
@@ -18,17 +20,20 @@ def download_province_data():
                 amphure_name = amphure["name_th"].replace("เขต", "").replace("อำเภอ", "").strip()
                 tambons = [
                     {
+                        "id": tambon.get("id"),
                         "name_th": tambon["name_th"].replace("ตำบล", "").replace("แขวง", "").strip(),
                         "name_en": tambon["name_en"]
                     }
                     for tambon in amphure.get("tambon", [])
                 ]
                 amphures.append({
+                    "id": amphure.get("id"),
                     "name_th": amphure_name,
                     "name_en": amphure["name_en"],
                     "tambon": tambons
                 })
             clean_data.append({
+                "id": province.get("id"),
                 "name_th": province_name,
                 "name_en": province["name_en"],
                 "amphure": amphures
@@ -39,6 +44,10 @@ def download_province_data():
 
         print("✅ ดาวน์โหลดและบันทึกไฟล์ thai_provinces.json สำเร็จแล้ว (ตัดเขต/อำเภอ/ตำบล ออก)")
 
+        # ไฟล์แบบย่อสำหรับแอป (เฉพาะชื่อ id และลำดับชั้น พร้อม checksum) โหลดเร็วกว่า JSON
+        header = save_compact_locations(compact_locations(clean_data))
+        print(f"✅ บันทึกไฟล์ {LOCATION_COMPACT_PATH} สำเร็จแล้ว (checksum {header['checksum']})")
+
     except requests.exceptions.RequestException as e:
         print("❌ ไม่สามารถดาวน์โหลดข้อมูลได้:", e)
 
@@ -0,0 +1,257 @@
+import os
+import queue
+import threading
+import time
+from urllib.parse import urlparse
+
+import psutil
+from selenium import webdriver
+from selenium.webdriver.chrome.service import Service
+from webdriver_manager.chrome import ChromeDriverManager
+
+from web_scraping import LED_SEARCH_URL, USER_AGENT
+
+# ✅ pool ของ Chrome WebDriver ที่เปิดรอไว้ล่วงหน้า ใช้ร่วมกันทุกการค้นหาใน process
+POOL_SIZE = int(os.environ.get("LED_DRIVER_POOL_SIZE", "2"))           # จำนวนเบราว์เซอร์สูงสุด
+POOL_MIN_IDLE = int(os.environ.get("LED_DRIVER_POOL_MIN_IDLE", "1"))   # จำนวนที่เปิดรอไว้
+RECYCLE_AFTER_PAGES = int(os.environ.get("LED_DRIVER_RECYCLE_PAGES", "200"))
+RECYCLE_AFTER_MB = int(os.environ.get("LED_DRIVER_RECYCLE_MB", "1024"))
+FRESH_SECONDS = 60  # หน้าค้นหาที่รีเซ็ตไว้ไม่เกินเวลานี้ ใช้ต่อได้โดยไม่ต้องโหลดใหม่
+
+# ✅ โปรไฟล์เบราว์เซอร์แบบประหยัด: เราอ่านแค่ตาราง จึงไม่ต้องโหลดรูป CSS ฟอนต์ และสคริปต์จากโดเมนอื่น
+LEAN_BROWSER = os.environ.get("LED_LEAN_BROWSER", "1") != "0"
+BLOCKED_URL_PATTERNS = [
+    "*.css", "*.woff", "*.woff2", "*.ttf", "*.otf", "*.eot",
+    "*.png", "*.jpg", "*.jpeg", "*.gif", "*.svg", "*.ico", "*.webp", "*.bmp",
+]
+
+
+def chrome_options(lean=LEAN_BROWSER):
+    options = webdriver.ChromeOptions()
+    options.add_argument('--headless=new' if lean else '--headless')
+    options.add_argument('--no-sandbox')
+    options.add_argument('--disable-dev-shm-usage')
+    options.add_argument('--disable-gpu')
+    options.add_argument('--window-size=1920,1080')
+    options.add_argument(f'--user-agent={USER_AGENT}')
+    if lean:
+        # ไม่รอรูปและ stylesheet โหลดเสร็จ (PageWaiter รอ element ที่ต้องใช้อยู่แล้ว)
+        options.page_load_strategy = 'eager'
+        options.add_experimental_option("prefs", {"profile.managed_default_content_settings.images": 2})
+        # โดเมนอื่นนอกจากเว็บไซต์กรมบังคับคดี (สถิติ โฆษณา ฟอนต์ภายนอก) resolve ไม่ได้
+        site_host = urlparse(LED_SEARCH_URL).hostname
+        options.add_argument(f'--host-resolver-rules=MAP * ~NOTFOUND , EXCLUDE {site_host}')
+        options.add_argument('--disable-extensions')
+        options.add_argument('--mute-audio')
+    return options
+
+
+_driver_path = None
+_driver_path_lock = threading.Lock()
+
+
+def launch_driver(lean=LEAN_BROWSER):
+    # ChromeDriverManager().install() ตรวจสอบเวอร์ชันผ่านเครือข่าย จึงเรียกเพียงครั้งเดียวต่อ process
+    global _driver_path
+    with _driver_path_lock:
+        if _driver_path is None:
+            _driver_path = ChromeDriverManager().install()
+    driver = webdriver.Chrome(service=Service(_driver_path), options=chrome_options(lean))
+    if lean:
+        # บล็อก CSS ฟอนต์ และรูปภาพที่ระดับเครือข่ายผ่าน DevTools (prefs ของ Chrome ไม่ครอบคลุม CSS)
+        try:
+            driver.execute_cdp_cmd("Network.enable", {})
+            driver.execute_cdp_cmd("Network.setBlockedURLs", {"urls": BLOCKED_URL_PATTERNS})
+        except Exception as cdp_error:
+            print(f"DEBUG: ตั้งค่าบล็อกทรัพยากรไม่สำเร็จ: {cdp_error}")
+    return driver
+
+
+def driver_memory_mb(driver):
+    # หน่วยความจำรวมของ chromedriver และโปรเซส Chrome ทั้งหมดที่อยู่ใต้มัน
+    try:
+        root = psutil.Process(driver.service.process.pid)
+        processes = [root] + root.children(recursive=True)
+        return sum(p.memory_info().rss for p in processes) / (1024 * 1024)
+    except (psutil.Error, AttributeError):
+        return 0.0
+
+
+class DriverPool:
+    def __init__(self, size=POOL_SIZE, min_idle=POOL_MIN_IDLE, recycle_pages=RECYCLE_AFTER_PAGES,
+                 recycle_mb=RECYCLE_AFTER_MB, search_url=None, lean=LEAN_BROWSER):
+        self.size = size
+        self.lean = lean
+        self.min_idle = min(min_idle, size)
+        self.recycle_pages = recycle_pages
+        self.recycle_mb = recycle_mb
+        self.search_url = search_url or LED_SEARCH_URL
+        self._idle = queue.LifoQueue()         # ใช้ตัวที่เพิ่งคืนก่อน (cache ของเบราว์เซอร์ยังอุ่นอยู่)
+        self._slots = threading.Semaphore(size)
+        self._lock = threading.Lock()
+        self._pages = {}                       # id(driver) → จำนวนหน้าที่ใช้ไปแล้ว
+        self._reset_at = {}                    # id(driver) → เวลาที่รีเซ็ตกลับหน้าค้นหาล่าสุด
+        self._live = 0
+        self._closed = False
+        self._counters = {
+            "checkouts": 0, "launched": 0, "recycled": 0,
+            "wait_seconds_total": 0.0, "wait_seconds_max": 0.0,
+        }
+
+    def warm(self):
+        # เปิดเบราว์เซอร์รอไว้ใน thread เบื้องหลัง ไม่ให้การค้นหาแรกต้องรอ Chrome เริ่มทำงาน
+        threading.Thread(target=self._replenish, daemon=True).start()
+
+    def checkout(self, timeout=300):
+        started = time.monotonic()
+        if not self._slots.acquire(timeout=timeout):
+            raise TimeoutError("รอ WebDriver ว่างนานเกินกำหนด")
+        try:
+            driver = self._take(timeout)
+        except Exception:
+            self._slots.release()
+            raise
+        if self._idle.qsize() < self.min_idle:
+            self.warm()
+        waited = time.monotonic() - started
+        with self._lock:
+            self._counters["checkouts"] += 1
+            self._counters["wait_seconds_total"] += waited
+            self._counters["wait_seconds_max"] = max(self._counters["wait_seconds_max"], waited)
+        return driver
+
+    def is_fresh(self, driver):
+        reset_at = self._reset_at.get(id(driver))
+        return reset_at is not None and time.monotonic() - reset_at < FRESH_SECONDS
+
+    def checkin(self, driver, pages=0, broken=False):
+        # รีเซ็ตกลับหน้าค้นหาใน thread เบื้องหลัง ผู้เรียกไม่ต้องรอ
+        threading.Thread(target=self._return, args=(driver, pages, broken), daemon=True).start()
+
+    def _return(self, driver, pages, broken):
+        try:
+            with self._lock:
+                used = self._pages.get(id(driver), 0) + pages
+                self._pages[id(driver)] = used
+            self._reset_at.pop(id(driver), None)
+            if self._closed or broken or used >= self.recycle_pages or \
+                    driver_memory_mb(driver) >= self.recycle_mb:
+                self._discard(driver, recycled=not self._closed)
+                return
+            try:
+                driver.delete_all_cookies()
+                driver.get(self.search_url)
+                self._reset_at[id(driver)] = time.monotonic()
+            except Exception:
+                self._discard(driver, recycled=True)
+                return
+            self._idle.put(driver)
+        finally:
+            self._slots.release()
+            self._replenish()
+
+    def _take(self, timeout):
+        try:
+            return self._idle.get_nowait()
+        except queue.Empty:
+            pass
+        with self._lock:
+            launch = self._live < self.size
+            if launch:
+                self._live += 1  # จองที่ไว้ก่อนเปิดเบราว์เซอร์
+        if not launch:
+            # เบราว์เซอร์ครบจำนวนแล้ว รอตัวที่กำลังรีเซ็ตหรือกำลังเปิดอยู่
+            try:
+                return self._idle.get(timeout=timeout)
+            except queue.Empty:
+                raise TimeoutError("รอ WebDriver ว่างนานเกินกำหนด")
+        try:
+            driver = launch_driver(self.lean)
+        except Exception:
+            with self._lock:
+                self._live -= 1
+            raise
+        with self._lock:
+            self._counters["launched"] += 1
+            self._pages[id(driver)] = 0
+        return driver
+
+    def _discard(self, driver, recycled):
+        with self._lock:
+            self._live -= 1
+            self._pages.pop(id(driver), None)
+            if recycled:
+                self._counters["recycled"] += 1
+        self._reset_at.pop(id(driver), None)
+        try:
+            driver.quit()
+        except Exception:
+            pass
+
+    def _replenish(self):
+        while not self._closed:
+            with self._lock:
+                if self._idle.qsize() >= self.min_idle or self._live >= self.size:
+                    return
+                self._live += 1  # จองที่ไว้ก่อนเปิดเบราว์เซอร์
+            try:
+                driver = launch_driver(self.lean)
+            except Exception as launch_error:
+                print(f"DEBUG: เปิด WebDriver ล่วงหน้าไม่สำเร็จ: {launch_error}")
+                with self._lock:
+                    self._live -= 1
+                return
+            with self._lock:
+                self._counters["launched"] += 1
+                self._pages[id(driver)] = 0
+            try:
+                driver.get(self.search_url)
+                self._reset_at[id(driver)] = time.monotonic()
+            except Exception:
+                pass
+            self._idle.put(driver)
+
+    def stats(self):
+        with self._lock:
+            counters = dict(self._counters)
+            live = self._live
+        checkouts = counters["checkouts"]
+        return {
+            "size": self.size,
+            "live": live,
+            "idle": self._idle.qsize(),
+            "in_use": max(live - self._idle.qsize(), 0),
+            "checkouts": checkouts,
+            "launched": counters["launched"],
+            "recycled": counters["recycled"],
+            "wait_seconds_avg": round(counters["wait_seconds_total"] / checkouts, 3) if checkouts else 0.0,
+            "wait_seconds_max": round(counters["wait_seconds_max"], 3),
+        }
+
+    def shutdown(self):
+        self._closed = True
+        while True:
+            try:
+                driver = self._idle.get_nowait()
+            except queue.Empty:
+                break
+            self._discard(driver, recycled=False)
+
+
+_pool = None
+_pool_lock = threading.Lock()
+
+
+def get_driver_pool():
+    # singleton ระดับ process (ใน Streamlit ทุก session ใช้ pool เดียวกัน)
+    global _pool
+    with _pool_lock:
+        if _pool is None:
+            _pool = DriverPool()
+            _pool.warm()
+        return _pool
+
+
+def current_pool():
+    # คืน pool ที่สร้างแล้ว โดยไม่สร้างใหม่ (ใช้สำหรับแสดงสถิติ)
+    return _pool
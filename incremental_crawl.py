@@ -0,0 +1,144 @@
+import argparse
+import hashlib
+import json
+import os
+import time
+from datetime import datetime
+
+from asset_store import ASSET_DB_PATH, AssetStore
+from web_scraping import COLUMNS, SearchError, clean_district_name, clean_subdistrict_name, lot_fingerprint, \
+    lot_key, open_search, records_to_frame
+
+# ✅ ดึงข้อมูลแบบเพิ่มเติม: เทียบกับ snapshot ครั้งก่อน และหยุดเปลี่ยนหน้าเมื่อเจอหน้าที่ไม่มีอะไรใหม่
+SNAPSHOT_DIR = "led_snapshots"
+
+
+def snapshot_path(snapshot_dir, search_args):
+    digest = hashlib.sha1("|".join(search_args).encode("utf-8")).hexdigest()[:12]
+    label = "_".join(part for part in search_args if part) or "ทั้งหมด"
+    return os.path.join(snapshot_dir, f"{label}_{digest}.json")
+
+
+def load_snapshot(path):
+    # คืน {กุญแจล็อต: {"fingerprint": ..., "row": [...]}}
+    try:
+        with open(path, "r", encoding="utf-8") as f:
+            return json.load(f)["lots"]
+    except FileNotFoundError:
+        return {}
+
+
+def save_snapshot(path, lots):
+    os.makedirs(os.path.dirname(path) or ".", exist_ok=True)
+    temp_path = f"{path}.tmp"
+    with open(temp_path, "w", encoding="utf-8") as f:
+        json.dump({"saved_at": datetime.now().isoformat(timespec="seconds"), "lots": lots}, f, ensure_ascii=False)
+    os.replace(temp_path, path)  # เขียนทับแบบ atomic
+
+
+def diff_page(rows, previous, seen):
+    # แยกแถวของหน้าเป็น เพิ่มใหม่ / เปลี่ยนแปลง / เหมือนเดิม
+    inserts, updates, unchanged = [], [], 0
+    for row in rows:
+        key = lot_key(row)
+        seen[key] = {"fingerprint": lot_fingerprint(row), "row": list(row)}
+        known = previous.get(key)
+        if known is None:
+            inserts.append(row)
+        elif known["fingerprint"] != seen[key]["fingerprint"]:
+            updates.append({"before": known["row"], "after": row})
+        else:
+            unchanged += 1
+    return inserts, updates, unchanged
+
+
+def apply_to_store(store, search_args, delta):
+    # เขียนเฉพาะส่วนที่เปลี่ยนแปลงลงคลังข้อมูลทรัพย์
+    changed = delta["inserts"] + [item["after"] for item in delta["updates"]]
+    if changed:
+        store.upsert(records_to_frame(changed))
+    if delta["removals"]:
+        store.delete([lot_key(row) for row in delta["removals"]])
+    # บันทึกว่าดึงครบทั้งพื้นที่ (pages=None) เฉพาะเมื่อดึงครบทุกหน้าจริง
+    # หยุดก่อนหรือจำกัดจำนวนหน้า บันทึกจำนวนหน้าที่อ่านจริง เพื่อให้ is_stale() ยังถือว่าข้อมูลทั้งพื้นที่เก่า
+    complete = not delta["stopped_early"] and delta["pages"] == delta["total_pages"]
+    store.mark_refreshed(*search_args, delta["known_lots"], None if complete else delta["pages"])
+
+
+def crawl_incremental(province, district="", subdistrict="", snapshot_dir=SNAPSHOT_DIR, backend="auto",
+                      max_pages=None, store=None):
+    started = time.monotonic()
+    search_args = (province, clean_district_name(district), clean_subdistrict_name(subdistrict))
+    path = snapshot_path(snapshot_dir, search_args)
+    previous = load_snapshot(path)
+
+    delta = {"inserts": [], "updates": [], "removals": [], "pages": 0, "total_pages": 0, "stopped_early": False}
+    seen = {}
+    active = None
+    try:
+        active, total_pages = open_search(search_args, backend)
+        delta["total_pages"] = total_pages
+        if max_pages is not None:
+            total_pages = min(total_pages, max_pages)
+
+        # ต้องเปลี่ยนหน้าตามลำดับ เพื่อหยุดได้ทันทีที่เจอหน้าที่ไม่มีอะไรใหม่
+        for page in range(1, total_pages + 1):
+            rows = active.fetch_page(page)
+            delta["pages"] += 1
+            inserts, updates, unchanged = diff_page(rows, previous, seen)
+            delta["inserts"] += inserts
+            delta["updates"] += updates
+            if previous and rows and unchanged == len(rows) and page < total_pages:
+                delta["stopped_early"] = True
+                break
+    except SearchError as search_error:
+        active = search_error.backend
+        raise search_error.__cause__
+    finally:
+        if active:
+            active.close()
+
+    lots = dict(previous)
+    lots.update(seen)
+    if delta["total_pages"] and not delta["stopped_early"] and delta["pages"] == delta["total_pages"]:
+        # ดึงครบทุกหน้าแล้ว ล็อตที่ไม่พบอีกคือถูกถอดออกจากประกาศ
+        removed = [key for key in previous if key not in seen]
+        delta["removals"] = [previous[key]["row"] for key in removed]
+        for key in removed:
+            del lots[key]
+    save_snapshot(path, lots)
+
+    delta["seconds"] = round(time.monotonic() - started, 2)
+    delta["known_lots"] = len(lots)
+    if store is not None:
+        apply_to_store(store, search_args, delta)
+    return delta
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ดึงเฉพาะล็อตใหม่หรือที่เปลี่ยนแปลงเทียบกับครั้งก่อน")
+    parser.add_argument("province")
+    parser.add_argument("--district", default="")
+    parser.add_argument("--subdistrict", default="")
+    parser.add_argument("--snapshots", default=SNAPSHOT_DIR, help="โฟลเดอร์เก็บ snapshot")
+    parser.add_argument("--backend", default="auto", choices=["auto", "http", "selenium"])
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--delta-output", help="บันทึกรายการที่เปลี่ยนแปลงเป็นไฟล์ JSON")
+    parser.add_argument("--store", nargs="?", const=ASSET_DB_PATH, help="บันทึกการเปลี่ยนแปลงลงคลังข้อมูลทรัพย์ด้วย")
+    args = parser.parse_args()
+
+    delta = crawl_incremental(args.province, args.district, args.subdistrict, args.snapshots, args.backend,
+                              args.max_pages, AssetStore(args.store) if args.store else None)
+    print(f"เพิ่มใหม่ {len(delta['inserts'])} | เปลี่ยนแปลง {len(delta['updates'])} | "
+          f"ถูกถอดออก {len(delta['removals'])} | ดึง {delta['pages']}/{delta['total_pages']} หน้า "
+          f"{'(หยุดก่อนเพราะไม่มีข้อมูลใหม่) ' if delta['stopped_early'] else ''}ใน {delta['seconds']} วินาที")
+    if args.delta_output:
+        with open(args.delta_output, "w", encoding="utf-8") as f:
+            json.dump({
+                "inserts": [dict(zip(COLUMNS, row)) for row in delta["inserts"]],
+                "updates": [
+                    {"before": dict(zip(COLUMNS, item["before"])), "after": dict(zip(COLUMNS, item["after"]))}
+                    for item in delta["updates"]
+                ],
+                "removals": [dict(zip(COLUMNS, row)) for row in delta["removals"]],
+            }, f, ensure_ascii=False, indent=2)
@@ -0,0 +1,166 @@
+import asyncio
+from urllib.parse import urlencode
+
+import aiohttp
+import pandas as pd
+
+from led_http import current_page, detect_encoding, page_request, pagination_targets, parse_detail_page, \
+    parse_page, search_request
+from lot_details import detail_fields, merge_detail_fields
+from web_scraping import DETAIL_LINK_COLUMN, LED_SEARCH_URL, MAX_CONCURRENCY, USER_AGENT, apply_search_filters, \
+    call_with_retry_async, clean_district_name, clean_subdistrict_name, compact_frame, frame_lot_keys, \
+    is_upstream_failure, records_to_frame, table_rows_to_records
+
+# ✅ เวอร์ชัน asyncio: ดึงหน้าผลลัพธ์และหน้ารายละเอียดพร้อมกันหลายคำขอใน event loop เดียว
+# ลองใหม่และหยุดพักเมื่อเว็บไซต์ไม่ตอบสนองด้วยนโยบายเดียวกับเวอร์ชัน thread (call_with_retry / CircuitBreaker)
+ASYNC_TIMEOUT = aiohttp.ClientTimeout(total=60, connect=10)
+
+
+def is_async_upstream_failure(error):
+    # ข้อผิดพลาดของ aiohttp ที่แสดงว่าเว็บไซต์ไม่ตอบสนอง นอกเหนือจากที่ is_upstream_failure รู้จัก
+    if isinstance(error, (asyncio.TimeoutError, aiohttp.ClientConnectionError)):
+        return True
+    if isinstance(error, aiohttp.ClientResponseError):
+        return error.status >= 500
+    return is_upstream_failure(error)
+
+
+class AsyncLedClient:
+    """session เดียวของเว็บไซต์ LED (cookie เดียวกัน) สำหรับใช้กับ asyncio"""
+
+    def __init__(self, session, search_url=None):
+        self.session = session
+        self.search_url = search_url or LED_SEARCH_URL
+        self.encoding = "utf-8"
+        self.targets = None
+
+    async def _request(self, method, url, fields=None):
+        if method == "post":
+            body = urlencode(fields or {}, encoding=self.encoding, errors="replace")
+            request = self.session.post(
+                url, data=body, headers={"Content-Type": "application/x-www-form-urlencoded"}
+            )
+        else:
+            query = urlencode(fields, encoding=self.encoding, errors="replace") if fields else ""
+            request = self.session.get(f"{url}?{query}" if query else url)
+        async with request as response:
+            response.raise_for_status()
+            content = await response.read()
+            self.encoding = detect_encoding(response.headers.get("Content-Type"), content)
+        return content.decode(self.encoding, errors="replace")
+
+    async def search(self, province, district, subdistrict, filters=None):
+        # คืน (จำนวนหน้าทั้งหมด, แถวของหน้าแรก)
+        form_page = parse_page(await self._request("get", self.search_url))
+        method, action, fields = search_request(form_page, self.search_url, province, district, subdistrict,
+                                                filters)
+        results = parse_page(await self._request(method, action, fields))
+        total_pages = results.total_pages()
+        if not total_pages:
+            return 0, []
+        self.targets = pagination_targets(results, action)
+        return total_pages, table_rows_to_records(results.table_rows, action)
+
+    async def fetch_page(self, page):
+        # หน้าที่ยังไม่รู้วิธีไป (ลิงก์อยู่ในหน้าผลลัพธ์ถัด ๆ ไป) ผิดพลาด แล้วลองใหม่ได้ตามนโยบายร่วม
+        request = page_request(self.targets, page)
+        if request is None:
+            raise RuntimeError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+        method, url, fields = request
+        parsed = parse_page(await self._request(method, url, fields))
+        if current_page(parsed) != page or not parsed.table_rows:
+            raise RuntimeError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+        # รวมลิงก์เลขหน้าที่เพิ่งเห็น (เหมือน HttpBackend._remember) หน้าที่ยังไปไม่ถึงจะไปได้เมื่อลองใหม่
+        self.targets = pagination_targets(parsed, url, self.targets)
+        return table_rows_to_records(parsed.table_rows, url)
+
+    async def fetch_detail(self, url):
+        return parse_detail_page(await self._request("get", url), url)
+
+
+async def _bounded(semaphore, key, action, retry_if=None):
+    # จำกัดจำนวนคำขอที่ค้างอยู่พร้อมกัน ลองใหม่ตามนโยบายร่วม คืน (key, ผลลัพธ์, ข้อผิดพลาด)
+    async with semaphore:
+        try:
+            result = await call_with_retry_async(action, retry_if=retry_if, upstream=is_async_upstream_failure)
+        except Exception as error:
+            return key, None, error
+        return key, result, None
+
+
+def merge_details(df, details):
+    # เพิ่มข้อมูลจากหน้ารายละเอียดเป็นคอลัมน์ที่มีชนิดข้อมูล (ชุดเดียวกับ lot_details.enrich_lots)
+    keys = dict(zip(df[DETAIL_LINK_COLUMN], frame_lot_keys(df)))
+    return merge_detail_fields(df, {keys[link]: detail_fields(detail) for link, detail in details.items()})
+
+
+# on_event(event): "search", "warning", "error" และ "done" (rows, failed_pages) แบบเดียวกับ scrape_led_data
+async def scrape_led_data_async(province='', district='', subdistrict='', max_pages=None,
+                                concurrency=MAX_CONCURRENCY, with_details=False, filters=None, on_event=None):
+    emit = on_event or (lambda event: None)
+    # ตัดคำนำหน้าออกก่อนส่งไปยังเว็บไซต์
+    cleaned_district = clean_district_name(district)
+    cleaned_subdistrict = clean_subdistrict_name(subdistrict)
+
+    semaphore = asyncio.Semaphore(concurrency)
+    connector = aiohttp.TCPConnector(limit=concurrency)
+    headers = {"User-Agent": USER_AGENT, "Accept-Encoding": "gzip, deflate"}
+    try:
+        async with aiohttp.ClientSession(connector=connector, headers=headers, timeout=ASYNC_TIMEOUT,
+                                         cookie_jar=aiohttp.CookieJar(unsafe=True)) as session:
+            client = AsyncLedClient(session)
+            total_pages, first_rows = await call_with_retry_async(
+                lambda: client.search(province, cleaned_district, cleaned_subdistrict, filters),
+                retry_if=is_async_upstream_failure, upstream=is_async_upstream_failure,
+            )
+            if total_pages == 0:
+                return pd.DataFrame(), "ไม่พบข้อมูลทรัพย์ตามเงื่อนไขที่ระบุ หรือเว็บไซต์ไม่ตอบสนอง"
+            found_pages = total_pages
+            if max_pages is not None and max_pages < total_pages:
+                total_pages = max_pages
+            emit({"type": "search", "found_pages": found_pages, "pages": total_pages,
+                  "message": f"พบข้อมูลทั้งหมด {found_pages} หน้า"})
+
+            pages = {1: first_rows}
+            failed_pages = []
+            tasks = [
+                asyncio.ensure_future(_bounded(semaphore, page, lambda page=page: client.fetch_page(page)))
+                for page in range(2, total_pages + 1)
+            ]
+            for task in asyncio.as_completed(tasks):
+                page, rows, error = await task
+                if error is None:
+                    pages[page] = rows
+                else:
+                    failed_pages.append(page)
+                    print(f"DEBUG: ดึงข้อมูลหน้า {page} ไม่สำเร็จ: {error}")
+            if failed_pages:
+                emit({
+                    "type": "warning",
+                    "message": f"ไม่สามารถดึงข้อมูลได้ {len(failed_pages)} หน้า: "
+                               f"{', '.join(map(str, sorted(failed_pages)))}",
+                })
+
+            # รวมผลตามลำดับหน้า
+            df = records_to_frame([row for page in sorted(pages) for row in pages[page]])
+            df = apply_search_filters(compact_frame(df), filters)
+
+            if with_details:
+                links = [link for link in df[DETAIL_LINK_COLUMN].unique() if link]
+                details = {}
+                tasks = [
+                    asyncio.ensure_future(_bounded(semaphore, link, lambda link=link: client.fetch_detail(link),
+                                                   retry_if=is_async_upstream_failure))
+                    for link in links
+                ]
+                for task in asyncio.as_completed(tasks):
+                    link, detail, error = await task
+                    if error is None:
+                        details[link] = detail
+                df = merge_details(df, details)
+
+            emit({"type": "done", "rows": len(df), "failed_pages": sorted(failed_pages), "resumed_pages": 0})
+            return df, None
+    except Exception as e:
+        emit({"type": "error", "message": f"เกิดข้อผิดพลาด: {e}", "screenshot": None})
+        return pd.DataFrame(), f"เกิดข้อผิดพลาด: {str(e)}"
@@ -0,0 +1,72 @@
+import argparse
+import sys
+
+from web_scraping import MAX_CONCURRENCY, ScrapeError, checkpoint_dir_for, iter_led_data, search_filters
+
+# ✅ ดึงข้อมูลทรัพย์จาก command line โดยไม่ต้องเปิด Streamlit
+# ผลลัพธ์ออกทาง stdout ทีละหน้าตามลำดับ (ส่งต่อให้ jq / ไฟล์ได้ทันที) ส่วนความคืบหน้าออกทาง stderr
+
+
+def write_rows(rows, output_format, write_header, out):
+    if output_format == "csv":
+        rows.to_csv(out, header=write_header, index=False)
+    else:
+        lines = rows.to_json(orient="records", lines=True, force_ascii=False)
+        out.write(lines if not lines or lines.endswith("\n") else lines + "\n")
+    out.flush()
+
+
+def run(province, district="", subdistrict="", max_pages=None, backend="auto", concurrency=MAX_CONCURRENCY,
+        output_format="jsonl", checkpoint_dir=checkpoint_dir_for("cli"), out=sys.stdout, log=sys.stderr, filters=None):
+    # หน้าที่ดึงเสร็จก่อนลำดับจะถูกพักไว้ จนกว่าหน้าก่อนหน้าจะมาครบ
+    pending = {}
+    next_page = 1
+    rows_written = 0
+    header_written = False  # หน้าที่ถูกกรองจนไม่เหลือแถวก็ไม่ควรเขียนหัวตารางซ้ำ
+    failed_pages = []
+    for batch in iter_led_data(province, district, subdistrict, max_pages, backend, concurrency, checkpoint_dir,
+                               filters=filters):
+        if batch["error"] is not None:
+            failed_pages.append(batch["page"])
+            print(f"ดึงข้อมูลหน้า {batch['page']} ไม่สำเร็จ: {batch['error']}", file=log)
+        pending[batch["page"]] = batch["rows"]
+        while next_page in pending:
+            rows = pending.pop(next_page)
+            if rows is not None:
+                write_rows(rows, output_format, not header_written, out)
+                header_written = True
+                rows_written += len(rows)
+            next_page += 1
+        print(f"หน้า {batch['page']}/{batch['pages']}{' (ดึงไว้แล้ว)' if batch['resumed'] else ''}", file=log)
+    return rows_written, sorted(failed_pages)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ดึงข้อมูลทรัพย์ขายทอดตลาดจากกรมบังคับคดี")
+    parser.add_argument("province")
+    parser.add_argument("--district", default="")
+    parser.add_argument("--subdistrict", default="")
+    parser.add_argument("--max-pages", type=int, default=None)
+    parser.add_argument("--backend", default="auto", choices=["auto", "http", "selenium"])
+    parser.add_argument("--concurrency", type=int, default=MAX_CONCURRENCY)
+    parser.add_argument("--format", default="jsonl", choices=["jsonl", "csv"])
+    parser.add_argument("--no-checkpoint", action="store_true", help="ไม่บันทึกจุดดึงต่อ (เริ่มใหม่ทุกครั้ง)")
+    parser.add_argument("--asset-type", help="ประเภททรัพย์ เช่น ห้องชุด")
+    parser.add_argument("--min-price", help="ราคาประเมินต่ำสุด (บาท)")
+    parser.add_argument("--max-price", help="ราคาประเมินสูงสุด (บาท)")
+    parser.add_argument("--department", help="หน่วยงานที่ขาย")
+    parser.add_argument("--case-number", help="หมายเลขคดี")
+    args = parser.parse_args()
+
+    try:
+        rows_written, failed_pages = run(
+            args.province, args.district, args.subdistrict, args.max_pages, args.backend, args.concurrency,
+            args.format, None if args.no_checkpoint else checkpoint_dir_for("cli"),
+            filters=search_filters(args.asset_type, args.min_price, args.max_price, args.department, args.case_number),
+        )
+    except ScrapeError as e:
+        print(f"เกิดข้อผิดพลาด: {e}", file=sys.stderr)
+        sys.exit(1)
+    print(f"ดึงข้อมูลได้ {rows_written:,} รายการ"
+          f"{f' (ไม่สำเร็จ {len(failed_pages)} หน้า: ' + ', '.join(map(str, failed_pages)) + ')' if failed_pages else ''}",
+          file=sys.stderr)
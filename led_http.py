@@ -0,0 +1,381 @@
+import codecs
+import re
+from html.parser import HTMLParser
+from urllib.parse import urljoin
+
+import requests
+from requests.adapters import HTTPAdapter
+
+from web_scraping import LED_SEARCH_URL, USER_AGENT, LedBackend, PageNavigationError, form_filter_values, \
+    match_select_option, table_rows_to_records
+
+# ✅ backend แบบ HTTP ล้วน: ส่งฟอร์มค้นหาและอ่านผลลัพธ์จาก HTML โดยไม่ต้องเปิดเบราว์เซอร์
+
+# connection pool ใช้ร่วมกันทุก session ใน process (keep-alive) ส่วน cookie แยกตาม session
+_shared_adapter = HTTPAdapter(pool_connections=4, pool_maxsize=32)
+
+HTTP_TIMEOUT = (10, 30)  # (เชื่อมต่อ, อ่านข้อมูล) วินาที
+NO_RESULTS_MARKER = "ไม่พบข้อมูล"  # ข้อความในหน้าผลลัพธ์เมื่อค้นหาแล้วไม่พบทรัพย์
+
+
+def create_session():
+    session = requests.Session()
+    session.mount("http://", _shared_adapter)
+    session.mount("https://", _shared_adapter)
+    session.headers.update({
+        "User-Agent": USER_AGENT,
+        "Accept-Encoding": "gzip, deflate",
+        "Connection": "keep-alive",
+    })
+    return session
+
+
+class LedPageParser(HTMLParser):
+    """อ่านฟอร์ม, captcha, ตาราง table linkevent และตัวบอกหน้า จาก HTML ของเว็บไซต์ LED"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.forms = []            # [{"action", "method", "fields": {ชื่อ: ค่า}, "options": {select: [(ค่า, ข้อความ)]}}]
+        self.captcha = None
+        self.table_rows = []       # โครงสร้างเดียวกับ EXTRACT_TABLE_JS
+        self.pagination = None
+        self.links = []            # [(ข้อความ, href)]
+        self._form = None
+        self._select = None
+        self._option = None
+        self._in_captcha = False
+        self._captcha_text = []
+        self._table_depth = 0      # ความลึกของตารางซ้อน นับจาก table linkevent
+        self._in_thead = False
+        self._row = None
+        self._cell = None
+        self._div_text = None
+        self._link = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "form":
+            self._form = {
+                "action": attrs.get("action") or "",
+                "method": (attrs.get("method") or "get").lower(),
+                "fields": {},
+                "options": {},
+            }
+            self.forms.append(self._form)
+        elif tag == "input" and self._form is not None and attrs.get("name"):
+            input_type = (attrs.get("type") or "text").lower()
+            if input_type in ("checkbox", "radio") and "checked" not in attrs:
+                return
+            if input_type in ("submit", "button", "image", "reset"):
+                return
+            self._form["fields"][attrs["name"]] = attrs.get("value") or ""
+        elif tag == "select" and self._form is not None and attrs.get("name"):
+            self._select = attrs["name"]
+            self._form["fields"].setdefault(self._select, None)  # None = ยังไม่พบตัวเลือกแรก
+            self._form["options"][self._select] = []
+        elif tag == "option" and self._select is not None:
+            self._end_option()
+            if "selected" in attrs or self._form["fields"][self._select] is None:
+                self._form["fields"][self._select] = attrs.get("value") or ""
+            self._option = [attrs.get("value") or "", []]
+        elif tag == "font" and (attrs.get("color") or "").lower() == "blue" and self.captcha is None:
+            self._in_captcha = True
+        elif tag == "table":
+            if self._table_depth:
+                self._table_depth += 1
+            elif "linkevent" in (attrs.get("class") or "").split() and not self.table_rows:
+                self._table_depth = 1
+        elif self._table_depth == 1 and tag == "thead":
+            self._in_thead = True
+        elif self._table_depth == 1 and tag == "tr":
+            self._row = {"header": self._in_thead, "cells": [], "all_th": True, "link": row_link(attrs)}
+        elif self._table_depth == 1 and tag in ("td", "th") and self._row is not None:
+            self._cell = [[], _int(attrs.get("colspan")), _int(attrs.get("rowspan"))]
+            self._row["all_th"] = self._row["all_th"] and tag == "th"
+        elif tag == "br" and self._cell is not None:
+            self._cell[0].append(" ")
+        elif tag == "div":
+            self._div_text = []
+        elif tag == "a":
+            self._link = [attrs.get("href") or "", []]
+            if self._row is not None and not self._row["link"]:
+                self._row["link"] = row_link(attrs)
+
+    def handle_endtag(self, tag):
+        if tag == "form":
+            self._form = None
+        elif tag in ("option", "select") and self._select is not None:
+            self._end_option()
+            if tag == "select":
+                if self._form["fields"][self._select] is None:
+                    self._form["fields"][self._select] = ""
+                self._select = None
+        elif tag == "font" and self._in_captcha:
+            self._in_captcha = False
+            self.captcha = "".join(self._captcha_text).strip()
+        elif tag == "table" and self._table_depth:
+            self._table_depth -= 1
+        elif self._table_depth == 1 and tag == "thead":
+            self._in_thead = False
+        elif self._table_depth == 1 and tag in ("td", "th") and self._cell is not None:
+            text = re.sub(r"\s+", " ", "".join(self._cell[0])).strip()
+            self._row["cells"].append([text, self._cell[1], self._cell[2]])
+            self._cell = None
+        elif self._table_depth == 1 and tag == "tr" and self._row is not None:
+            row = self._row
+            if row["cells"]:
+                self.table_rows.append({
+                    "header": row["header"] or row["all_th"],
+                    "cells": row["cells"],
+                    "link": row["link"],
+                })
+            self._row = None
+        elif tag == "div" and self._div_text is not None:
+            text = "".join(self._div_text)
+            if self.pagination is None and "หน้าที่" in text:
+                self.pagination = text
+            self._div_text = None
+        elif tag == "a" and self._link is not None:
+            self.links.append(("".join(self._link[1]).strip(), self._link[0]))
+            self._link = None
+
+    def _end_option(self):
+        # </option> ละไว้ได้ใน HTML จึงปิดตัวเลือกก่อนหน้าเมื่อเริ่มตัวเลือกใหม่ด้วย
+        if self._option is not None:
+            value, text = self._option
+            self._form["options"][self._select].append((value, "".join(text).strip()))
+            self._option = None
+
+    def handle_data(self, data):
+        if self._option is not None:
+            self._option[1].append(data)
+        if self._in_captcha:
+            self._captcha_text.append(data)
+        if self._cell is not None:
+            self._cell[0].append(data)
+        if self._div_text is not None:
+            self._div_text.append(data)
+        if self._link is not None:
+            self._link[1].append(data)
+
+    def total_pages(self):
+        if not self.table_rows:
+            return 0
+        match = re.search(r"(\d+)/(\d+)", self.pagination or "")
+        return int(match.group(2)) if match else 1
+
+    def form_with(self, field):
+        return next((form for form in self.forms if field in form["fields"]), None)
+
+
+def row_link(attrs):
+    # ลิงก์หน้ารายละเอียดของแถว: href จริง หรือ URL ที่อยู่ใน onclick (เช่น window.open('...asp?...'))
+    href = attrs.get("href") or ""
+    if href and not href.lower().startswith("javascript:") and href != "#":
+        return href
+    match = re.search(r"""['"]([^'"]+\.asp\?[^'"]*)['"]""", (attrs.get("onclick") or "") + " " + href)
+    return match.group(1) if match else ""
+
+
+class DetailPageParser(HTMLParser):
+    """อ่านหน้ารายละเอียดทรัพย์: คู่ หัวข้อ/ค่า จากแถวตาราง และรูปภาพทั้งหมด"""
+
+    def __init__(self):
+        super().__init__(convert_charrefs=True)
+        self.fields = {}
+        self.images = []
+        self._cells = None
+        self._cell = None
+
+    def handle_starttag(self, tag, attrs):
+        attrs = dict(attrs)
+        if tag == "tr":
+            self._cells = []
+        elif tag in ("td", "th") and self._cells is not None:
+            self._cell = []
+        elif tag == "img" and attrs.get("src"):
+            self.images.append(attrs["src"])
+
+    def handle_endtag(self, tag):
+        if tag in ("td", "th") and self._cell is not None:
+            self._cells.append(re.sub(r"\s+", " ", "".join(self._cell)).strip())
+            self._cell = None
+        elif tag == "tr" and self._cells is not None:
+            cells = [cell for cell in self._cells if cell]
+            if len(cells) >= 2:
+                self.fields.setdefault(cells[0].rstrip(" :"), " ".join(cells[1:]))
+            self._cells = None
+
+    def handle_data(self, data):
+        if self._cell is not None:
+            self._cell.append(data)
+
+
+def parse_detail_page(html, base_url=""):
+    parser = DetailPageParser()
+    parser.feed(html)
+    parser.close()
+    return {"fields": parser.fields, "images": [urljoin(base_url, src) for src in parser.images]}
+
+
+def _int(value):
+    try:
+        return int(value)
+    except (TypeError, ValueError):
+        return 1
+
+
+def parse_page(html):
+    parser = LedPageParser()
+    parser.feed(html)
+    parser.close()
+    return parser
+
+
+def detect_encoding(content_type, content, guess=None):
+    # เว็บไซต์ LED ใช้ภาษาไทยแบบ windows-874 หาก header ไม่ระบุ charset ให้อ่านจาก <meta>
+    # guess: ฟังก์ชันเดาชนิดการเข้ารหัส (เช่น response.apparent_encoding ซึ่งช้า) เรียกเฉพาะเมื่อหาไม่พบทั้งสองแห่ง
+    match = re.search(r'charset=["\']?([\w-]+)', content_type or "", re.I)
+    if match:
+        return python_encoding(match.group(1))
+    match = re.search(rb'charset=["\']?([\w-]+)', content[:2048], re.I)
+    if match:
+        return python_encoding(match.group(1).decode("ascii"))
+    return python_encoding(guess() if callable(guess) else guess)
+
+
+def python_encoding(name):
+    # Python ไม่รู้จักชื่อ windows-874 โดยตรง
+    try:
+        return codecs.lookup(name).name
+    except (LookupError, TypeError):
+        return "cp874"
+
+
+def search_request(form_page, search_url, province, district, subdistrict, filters=None):
+    # สร้างคำขอส่งฟอร์มค้นหาจากหน้า default.asp คืน (method, url, fields)
+    # filters: กรอกเฉพาะช่องที่มีในฟอร์ม ช่องแบบ select เลือกเฉพาะตัวเลือกที่ข้อความตรงกับเงื่อนไขพอดี
+    form = form_page.form_with("seckey")
+    if form is None:
+        raise RuntimeError("ไม่พบฟอร์มค้นหาบนหน้าเว็บไซต์")
+    if not form_page.captcha:
+        raise RuntimeError("ไม่พบรหัสยืนยัน (captcha) บนหน้าเว็บไซต์")
+
+    fields = dict(form["fields"])
+    fields.update({
+        "province": province,
+        "ampur": district,
+        "tumbol": subdistrict,
+        "seckey": form_page.captcha,
+        "search": fields.get("search") or "ค้นหา",
+    })
+    for field, value in form_filter_values(filters).items():
+        if field not in fields:
+            continue
+        options = form["options"].get(field)
+        if options is None:
+            fields[field] = value
+        else:
+            match = match_select_option(options, value)
+            if match is not None:
+                fields[field] = match
+    action = urljoin(search_url, form["action"]) if form["action"] else search_url
+    return form["method"], action, fields
+
+
+def current_page(parsed):
+    match = re.search(r"(\d+)/(\d+)", parsed.pagination or "")
+    return int(match.group(1)) if match else 1
+
+
+def pagination_targets(parsed, url, targets=None):
+    # วิธีเปลี่ยนหน้า: ลิงก์เลขหน้าที่เป็น URL จริง หรือฟอร์มที่มีช่องเลขหน้า (ที่ goToPage() ใช้)
+    targets = targets or {"links": {}, "form": None, "field": None, "url": url}
+    for text, href in parsed.links:
+        if text.isdigit() and href and not href.lower().startswith("javascript:"):
+            targets["links"][int(text)] = urljoin(url, href)
+    for form in parsed.forms:
+        field = next((name for name in form["fields"] if "page" in name.lower()), None)
+        if field:
+            targets["form"], targets["field"] = form, field
+            targets["url"] = urljoin(url, form["action"]) if form["action"] else url
+            break
+    return targets
+
+
+def page_request(targets, page):
+    # คืน (method, url, fields) สำหรับหน้าที่ระบุ หรือ None หากไม่มีวิธีไปยังหน้านั้น
+    if page in targets["links"]:
+        return "get", targets["links"][page], None
+    if targets["form"] is not None:
+        fields = dict(targets["form"]["fields"])
+        fields[targets["field"]] = str(page)
+        return targets["form"]["method"], targets["url"], fields
+    return None
+
+
+class HttpBackend(LedBackend):
+    name = "http"
+
+    def __init__(self, session=None, search_url=None):
+        self.session = session or create_session()
+        self.search_url = search_url or LED_SEARCH_URL
+        self.encoding = "utf-8"
+        self.targets = None        # วิธีเปลี่ยนหน้าที่รู้จักแล้ว
+        self.pages = {}            # เลขหน้า → แถวที่อ่านแล้ว
+        self.last_html = None      # HTML ล่าสุด สำหรับข้อมูลวินิจฉัย
+
+    def _request(self, method, url, fields=None):
+        if method == "post":
+            response = self.session.post(url, data=self._encode(fields), timeout=HTTP_TIMEOUT)
+        else:
+            response = self.session.get(url, params=self._encode(fields), timeout=HTTP_TIMEOUT)
+        response.raise_for_status()
+        self.encoding = detect_encoding(
+            response.headers.get("Content-Type"), response.content, lambda: response.apparent_encoding
+        )
+        self.last_html = response.content.decode(self.encoding, errors="replace")
+        return parse_page(self.last_html)
+
+    def _encode(self, fields):
+        if not fields:
+            return None
+        return {name: value.encode(self.encoding, errors="replace") for name, value in fields.items()}
+
+    def search(self, province, district, subdistrict):
+        form_page = self._request("get", self.search_url)
+        method, action, fields = search_request(form_page, self.search_url, province, district, subdistrict,
+                                                self.filters)
+        results = self._request(method, action, fields)
+        total_pages = results.total_pages()
+        self.capture("after_search", failure=not total_pages)
+        if total_pages:
+            self._remember(results, action)
+        return total_pages
+
+    def confirmed_empty(self):
+        return self.last_html is not None and NO_RESULTS_MARKER in self.last_html
+
+    def _remember(self, parsed, url):
+        self.pages[current_page(parsed)] = table_rows_to_records(parsed.table_rows, url)
+        self.targets = pagination_targets(parsed, url, self.targets)
+
+    def fetch_page(self, page):
+        if page in self.pages:
+            return self.pages.pop(page)
+        request = page_request(self.targets, page) if self.targets else None
+        if request is None:
+            raise PageNavigationError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+        method, url, fields = request
+        parsed = self._request(method, url, fields)
+        if current_page(parsed) != page or not parsed.table_rows:
+            raise PageNavigationError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+        self._remember(parsed, url)
+        return self.pages.pop(page)
+
+    def snapshot(self):
+        return None, self.last_html
+
+    def close(self):
+        # ไม่เรียก session.close() เพราะจะปิด connection pool ที่ใช้ร่วมกัน
+        self.session.cookies.clear()
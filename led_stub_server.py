@@ -0,0 +1,276 @@
+import argparse
+import gzip
+import html
+import random
+import secrets
+import threading
+import time
+from http.cookies import SimpleCookie
+from http.server import BaseHTTPRequestHandler, ThreadingHTTPServer
+from urllib.parse import parse_qs, urlencode, urlparse
+
+# ✅ เซิร์ฟเวอร์จำลองหน้าค้นหา asset.led.go.th/newbidreg/default.asp สำหรับทดสอบและวัดความเร็วแบบออฟไลน์
+# ใช้ได้ทั้ง HttpBackend และ SeleniumBackend โดยตั้งค่า LED_SEARCH_URL=http://127.0.0.1:<port>/newbidreg/default.asp
+
+ENCODING = "cp874"
+ROWS_PER_PAGE = 50
+FILTER_FIELDS = ["asset_type", "price_begin", "price_end", "law_suit_no"]
+PROPERTY_TYPES = ["ที่ดินว่างเปล่า", "ที่ดินพร้อมสิ่งปลูกสร้าง", "ห้องชุด", "บ้าน", "อาคารพาณิชย์"]
+
+FORM_PAGE = """<html><head><meta charset="windows-874"><title>LED</title></head><body>
+<form name="frm" method="post" action="default.asp">
+จังหวัด <input type="text" name="province" value="">
+อำเภอ <input type="text" name="ampur" value="">
+ตำบล <input type="text" name="tumbol" value="">
+ประเภททรัพย์ <select name="asset_type"><option value="">ทั้งหมด</option>{asset_types}</select>
+ราคาประเมิน <input type="text" name="price_begin" value=""> ถึง <input type="text" name="price_end" value="">
+หมายเลขคดี <input type="text" name="law_suit_no" value="">
+รหัสยืนยัน <font color="blue">{captcha}</font> <input type="text" name="seckey" value="">
+<input type="hidden" name="page" value="1">
+<input type="submit" name="search" value="ค้นหา">
+</form></body></html>"""
+
+RESULTS_PAGE = """<html><head><meta charset="windows-874"><title>LED</title>
+<script>function goToPage(n) {{ document.pageform.page.value = n; document.pageform.submit(); }}</script>
+</head><body>
+<form name="pageform" method="post" action="default.asp">
+<input type="hidden" name="province" value="{province}">
+<input type="hidden" name="ampur" value="{ampur}">
+<input type="hidden" name="tumbol" value="{tumbol}">
+{filters}
+<input type="hidden" name="page" value="{page}">
+</form>
+<div>หน้าที่ {page}/{total_pages}</div>
+<table class="table linkevent">
+<thead>
+<tr><th rowspan="2">ลำดับ</th><th rowspan="2">ล็อตที่-ชุดที่</th><th rowspan="2">หมายเลขคดี</th>
+<th rowspan="2">ประเภททรัพย์</th><th colspan="3">เนื้อที่</th><th rowspan="2">ราคาประเมิน</th>
+<th rowspan="2">ตำบล</th><th rowspan="2">อำเภอ</th><th rowspan="2">จังหวัด</th></tr>
+<tr><th>ไร่</th><th>งาน</th><th>ตร.วา</th></tr>
+</thead>
+<tbody>
+{rows}
+</tbody></table>
+<div>{links}</div>
+</body></html>"""
+
+DETAIL_PAGE = """<html><head><meta charset="windows-874"></head><body>
+<table class="table">
+<tr><td>หมายเลขคดี</td><td>{case_number}</td></tr>
+<tr><td>ประเภททรัพย์</td><td>{property_type}</td></tr>
+<tr><td>หน่วยงานที่ขาย</td><td>{department}</td></tr>
+<tr><td>ผู้ถือกรรมสิทธิ์</td><td>{owner}</td></tr>
+<tr><td>สถานะ</td><td>{status}</td></tr>
+{auctions}
+</table>
+{images}
+</body></html>"""
+
+NO_RESULTS_PAGE = """<html><head><meta charset="windows-874"></head><body>
+<div>ไม่พบข้อมูล</div></body></html>"""
+
+
+def generate_rows(province, ampur, tumbol, total_rows):
+    # ข้อมูลสุ่มแบบคงที่ตามเงื่อนไขค้นหา เพื่อให้ผลลัพธ์ซ้ำได้ทุกครั้ง
+    rng = random.Random(f"{province}|{ampur}|{tumbol}")
+    rows = []
+    for index in range(1, total_rows + 1):
+        rows.append([
+            str(index),
+            f"{rng.randint(1, 40)}-{rng.randint(1, 20)}",
+            f"ผบ.{rng.randint(1, 9999)}/25{rng.randint(55, 67)}",
+            rng.choice(PROPERTY_TYPES),
+            str(rng.randint(0, 5)) if rng.random() < 0.7 else "",
+            str(rng.randint(0, 3)),
+            f"{rng.randint(0, 99)}",
+            f"{rng.randint(300, 50000) * 1000:,}",
+            tumbol or f"ตำบล{rng.randint(1, 9)}",
+            ampur or f"อำเภอ{rng.randint(1, 9)}",
+            province or "กรุงเทพมหานคร",
+        ])
+    return rows
+
+
+def filter_rows(rows, form):
+    # กรองตามช่องเงื่อนไขในฟอร์ม (ประเภททรัพย์ ช่วงราคา หมายเลขคดี) เหมือนเว็บไซต์จริง
+    asset_type = form.get("asset_type", "")
+    if asset_type.isdigit() and 1 <= int(asset_type) <= len(PROPERTY_TYPES):
+        rows = [row for row in rows if row[3] == PROPERTY_TYPES[int(asset_type) - 1]]
+    price_begin, price_end = form.get("price_begin", ""), form.get("price_end", "")
+    if price_begin.isdigit():
+        rows = [row for row in rows if int(row[7].replace(",", "")) >= int(price_begin)]
+    if price_end.isdigit():
+        rows = [row for row in rows if int(row[7].replace(",", "")) <= int(price_end)]
+    if form.get("law_suit_no"):
+        rows = [row for row in rows if form["law_suit_no"] in row[2]]
+    return rows
+
+
+def detail_query(row):
+    return urlencode({"case": row[2], "lot": row[1], "type": row[3]}, encoding=ENCODING)
+
+
+def detail_page(query):
+    # หน้ารายละเอียดแปลงจากข้อมูลในลิงก์ พร้อมวันขายนัดต่าง ๆ แบบคงที่ตามหมายเลขคดี
+    case_number = query.get("case", "")
+    rng = random.Random(case_number + query.get("lot", ""))
+    first_day = rng.randint(1, 20)
+    month = rng.randint(1, 12)
+    auctions = "\n".join(
+        f"<tr><td>วันที่ขายนัดที่ {round_no}</td><td>{first_day + (round_no - 1) * 7:02d}/{month:02d}/2568</td></tr>"
+        for round_no in range(1, rng.randint(2, 6) + 1)
+    )
+    image_id = rng.randint(1000, 9999)
+    images = "".join(f'<img src="/images/{image_id}_{n}.jpg">' for n in range(rng.randint(0, 3)))
+    return DETAIL_PAGE.format(
+        case_number=html.escape(case_number),
+        property_type=html.escape(query.get("type", "")),
+        department=f"สำนักงานบังคับคดีจังหวัด{rng.choice(['กรุงเทพมหานคร', 'เชียงใหม่', 'ขอนแก่น', 'ชลบุรี'])}",
+        owner=f"{rng.choice(['นาย', 'นาง', 'นางสาว'])}{rng.choice(['สมชาย', 'สมหญิง', 'ประเสริฐ', 'วิไล'])} "
+              f"{rng.choice(['ใจดี', 'ศรีสุข', 'มั่นคง'])}",
+        status=rng.choice(["ยังไม่ขาย", "งดขาย", "ขายได้"]),
+        auctions=auctions,
+        images=images,
+    )
+
+
+class StubState:
+    def __init__(self, total_rows=1000, delay=0.0, fail_rate=0.0):
+        self.total_rows = total_rows
+        self.delay = delay
+        self.fail_rate = fail_rate  # สัดส่วนคำขอที่ตอบกลับ 503 (จำลองเว็บไซต์ที่ไม่เสถียร)
+        self.captchas = {}         # session id → captcha
+        self.lock = threading.Lock()
+        self.requests = 0
+
+
+class StubHandler(BaseHTTPRequestHandler):
+    protocol_version = "HTTP/1.1"  # รองรับ keep-alive
+
+    def log_message(self, format, *args):
+        pass
+
+    @property
+    def state(self):
+        return self.server.state
+
+    def _session_id(self):
+        cookie = SimpleCookie(self.headers.get("Cookie", ""))
+        return cookie["ASPSESSIONID"].value if "ASPSESSIONID" in cookie else None
+
+    def _send(self, body, session_id=None):
+        data = body.encode(ENCODING, errors="replace")
+        self.send_response(200)
+        self.send_header("Content-Type", "text/html")
+        if "gzip" in self.headers.get("Accept-Encoding", ""):
+            data = gzip.compress(data)
+            self.send_header("Content-Encoding", "gzip")
+        if session_id:
+            self.send_header("Set-Cookie", f"ASPSESSIONID={session_id}; Path=/")
+        self.send_header("Content-Length", str(len(data)))
+        self.end_headers()
+        self.wfile.write(data)
+
+    def _flaky(self):
+        if self.state.fail_rate and random.random() < self.state.fail_rate:
+            self.send_error(503)
+            return True
+        return False
+
+    def do_GET(self):
+        if self._flaky():
+            return
+        url = urlparse(self.path)
+        if url.path.endswith("asset_open.asp"):
+            with self.state.lock:
+                self.state.requests += 1
+            time.sleep(self.state.delay)
+            query = {key: values[0] for key, values in parse_qs(url.query, encoding=ENCODING).items()}
+            self._send(detail_page(query))
+            return
+        if not url.path.endswith("default.asp"):
+            self.send_error(404)
+            return
+        with self.state.lock:
+            self.state.requests += 1
+        time.sleep(self.state.delay)
+        session_id = self._session_id() or secrets.token_hex(8)
+        captcha = str(random.randint(1000, 9999))
+        with self.state.lock:
+            self.state.captchas[session_id] = captcha
+        asset_types = "".join(
+            f'<option value="{index}">{name}</option>' for index, name in enumerate(PROPERTY_TYPES, start=1)
+        )
+        self._send(FORM_PAGE.format(captcha=captcha, asset_types=asset_types), session_id)
+
+    def do_POST(self):
+        length = int(self.headers.get("Content-Length", 0))
+        form = {
+            key: values[0]
+            for key, values in parse_qs(self.rfile.read(length).decode("ascii"), encoding=ENCODING).items()
+        }
+        if self._flaky():
+            return
+        with self.state.lock:
+            self.state.requests += 1
+            captcha = self.state.captchas.get(self._session_id())
+        time.sleep(self.state.delay)
+
+        # ส่งฟอร์มค้นหาต้องมีรหัสยืนยันตรงกับที่ออกให้ session นี้
+        if "search" in form and form.get("seckey") != captcha:
+            self._send(NO_RESULTS_PAGE)
+            return
+
+        province, ampur, tumbol = form.get("province", ""), form.get("ampur", ""), form.get("tumbol", "")
+        rows = filter_rows(generate_rows(province, ampur, tumbol, self.state.total_rows), form)
+        if not rows:
+            self._send(NO_RESULTS_PAGE)
+            return
+        total_pages = (len(rows) + ROWS_PER_PAGE - 1) // ROWS_PER_PAGE
+        page = min(max(int(form.get("page") or 1), 1), total_pages)
+        page_rows = rows[(page - 1) * ROWS_PER_PAGE:page * ROWS_PER_PAGE]
+
+        self._send(RESULTS_PAGE.format(
+            province=html.escape(province),
+            ampur=html.escape(ampur),
+            tumbol=html.escape(tumbol),
+            filters="\n".join(
+                f'<input type="hidden" name="{name}" value="{html.escape(form[name])}">'
+                for name in FILTER_FIELDS if form.get(name)
+            ),
+            page=page,
+            total_pages=total_pages,
+            rows="\n".join(
+                f"<tr onclick=\"window.open('asset_open.asp?{detail_query(row)}')\">"
+                + "".join(f"<td>{html.escape(cell)}</td>" for cell in row) + "</tr>"
+                for row in page_rows
+            ),
+            links=" ".join(
+                f'<a href="javascript:goToPage({n})">{n}</a>' for n in range(1, total_pages + 1)
+            ) + f' <a href="javascript:goToPage({min(page + 1, total_pages)})">»</a>',
+        ))
+
+
+def start_stub_server(port=0, total_rows=1000, delay=0.0, fail_rate=0.0):
+    # เปิดเซิร์ฟเวอร์ใน thread เบื้องหลัง คืน (server, URL หน้าค้นหา)
+    server = ThreadingHTTPServer(("127.0.0.1", port), StubHandler)
+    server.daemon_threads = True
+    server.state = StubState(total_rows=total_rows, delay=delay, fail_rate=fail_rate)
+    threading.Thread(target=server.serve_forever, daemon=True).start()
+    return server, f"http://127.0.0.1:{server.server_port}/newbidreg/default.asp"
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="เซิร์ฟเวอร์จำลองเว็บไซต์ค้นหาทรัพย์กรมบังคับคดี")
+    parser.add_argument("--port", type=int, default=8765)
+    parser.add_argument("--rows", type=int, default=1000, help="จำนวนแถวผลลัพธ์ต่อการค้นหา")
+    parser.add_argument("--delay", type=float, default=0.0, help="หน่วงเวลาตอบกลับต่อคำขอ (วินาที)")
+    parser.add_argument("--fail-rate", type=float, default=0.0, help="สัดส่วนคำขอที่ตอบกลับ 503 (0-1)")
+    args = parser.parse_args()
+
+    server, url = start_stub_server(args.port, args.rows, args.delay, args.fail_rate)
+    print(f"✅ เซิร์ฟเวอร์จำลองพร้อมใช้งานที่ {url}")
+    try:
+        threading.Event().wait()
+    except KeyboardInterrupt:
+        server.shutdown()
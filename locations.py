@@ -0,0 +1,168 @@
+import hashlib
+import json
+import os
+import pickle
+import sys
+
+# ✅ ข้อมูลจังหวัด-อำเภอ-ตำบล สำหรับตัวเลือกพื้นที่ค้นหา
+# สร้างดัชนีครั้งเดียวตอนโหลด ตัวเลือกของแต่ละระดับเรียงไว้แล้วเป็น tuple อ่านได้ทันทีด้วย dict
+LOCATION_DATA_PATH = os.environ.get("LED_LOCATION_DATA", "thai_provinces.json")
+# ไฟล์ข้อมูลพื้นที่แบบย่อ: เก็บเฉพาะชื่อ id และลำดับชั้น (ไม่มีวันที่สร้าง/แก้ไข) โหลดเร็วกว่า JSON มาก
+LOCATION_COMPACT_PATH = os.environ.get("LED_LOCATION_COMPACT", "thai_provinces.bin")
+LOCATION_FORMAT_VERSION = 1
+
+# ใช้เมื่อไม่มีไฟล์ข้อมูลพื้นที่
+SAMPLE_LOCATION_DATA = [
+    {
+        "name_th": "กรุงเทพมหานคร",
+        "name_en": "Bangkok",
+        "amphure": [
+            {
+                "name_th": "พระนคร",
+                "name_en": "Phra Nakhon",
+                "tambon": [
+                    {"name_th": "พระบรมมหาราชวัง", "name_en": "Phra Borom Maha Ratchawang"},
+                    {"name_th": "วังบูรพาภิรมย์", "name_en": "Wang Burapha Phirom"}
+                ]
+            }
+        ]
+    },
+    {
+        "name_th": "เชียงใหม่",
+        "name_en": "Chiang Mai",
+        "amphure": [
+            {
+                "name_th": "เมืองเชียงใหม่",
+                "name_en": "Mueang Chiang Mai",
+                "tambon": [
+                    {"name_th": "ศรีภูมิ", "name_en": "Si Phum"},
+                    {"name_th": "พระสิงห์", "name_en": "Phra Sing"}
+                ]
+            }
+        ]
+    }
+]
+
+NO_OPTIONS = ("",)  # ตัวเลือกว่าง = ไม่ระบุพื้นที่ระดับนั้น
+
+
+def _sorted_by_name(entries):
+    return tuple(sorted(entries, key=lambda entry: entry[0]))
+
+
+def compact_locations(data):
+    # JSON จังหวัด → ((จังหวัด, id, ((อำเภอ, id, ((ตำบล, id), ...)), ...)), ...) เรียงตามชื่อทุกระดับ
+    # ชื่อถูก intern ชื่อที่ซ้ำกัน (เช่นตำบลชื่อเดียวกันในหลายอำเภอ) จึงใช้สตริงเดียวกันทั้งในไฟล์และในหน่วยความจำ
+    return _sorted_by_name(
+        (sys.intern(province["name_th"]), province.get("id"), _sorted_by_name(
+            (sys.intern(amphure["name_th"]), amphure.get("id"), _sorted_by_name(
+                (sys.intern(tambon["name_th"]), tambon.get("id")) for tambon in amphure.get("tambon", [])
+            ))
+            for amphure in province.get("amphure", [])
+        ))
+        for province in data
+    )
+
+
+def save_compact_locations(hierarchy, path=LOCATION_COMPACT_PATH):
+    # ไฟล์ = pickle ของ (header, payload) header มีรุ่นของรูปแบบและ checksum ของ payload
+    payload = pickle.dumps(hierarchy, protocol=pickle.HIGHEST_PROTOCOL)
+    header = {
+        "version": LOCATION_FORMAT_VERSION,
+        "checksum": hashlib.sha1(payload).hexdigest()[:16],
+        "provinces": len(hierarchy),
+        "tambons": sum(len(tambons) for _, _, amphures in hierarchy for _, _, tambons in amphures),
+    }
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    with open(temp_path, "wb") as f:
+        pickle.dump((header, payload), f, protocol=pickle.HIGHEST_PROTOCOL)
+    os.replace(temp_path, path)  # เขียนทับแบบ atomic
+    return header
+
+
+def load_compact_locations(path=LOCATION_COMPACT_PATH):
+    # คืน None เมื่อไม่มีไฟล์ รุ่นไม่ตรง หรือ checksum ไม่ตรง (ไฟล์เสีย)
+    try:
+        with open(path, "rb") as f:
+            header, payload = pickle.load(f)
+    except FileNotFoundError:
+        return None
+    except Exception as load_error:
+        print(f"DEBUG: อ่านไฟล์ข้อมูลพื้นที่ {path} ไม่สำเร็จ: {load_error}")
+        return None
+    if header.get("version") != LOCATION_FORMAT_VERSION or \
+            header.get("checksum") != hashlib.sha1(payload).hexdigest()[:16]:
+        print(f"DEBUG: ไฟล์ข้อมูลพื้นที่ {path} ไม่ตรงรุ่นหรือ checksum ไม่ตรง ใช้ JSON แทน")
+        return None
+    return pickle.loads(payload)
+
+
+def load_location_data(path=LOCATION_DATA_PATH, compact_path=LOCATION_COMPACT_PATH):
+    # ใช้ไฟล์แบบย่อถ้ามีและไม่เก่ากว่า JSON มิฉะนั้นอ่าน JSON แล้วบันทึกไฟล์แบบย่อไว้ให้โปรเซสถัดไป
+    json_mtime = os.path.getmtime(path) if os.path.exists(path) else None
+    if os.path.exists(compact_path) and (json_mtime is None or os.path.getmtime(compact_path) >= json_mtime):
+        hierarchy = load_compact_locations(compact_path)
+        if hierarchy is not None:
+            return hierarchy
+    if json_mtime is None:
+        return compact_locations(SAMPLE_LOCATION_DATA)
+
+    with open(path, "r", encoding="utf-8") as f:
+        hierarchy = compact_locations(json.load(f))
+    try:
+        save_compact_locations(hierarchy, compact_path)
+    except OSError as save_error:
+        print(f"DEBUG: บันทึกไฟล์ข้อมูลพื้นที่ {compact_path} ไม่สำเร็จ: {save_error}")
+    return hierarchy
+
+
+class LocationIndex:
+    """ดัชนีจังหวัด → อำเภอ → ตำบล ค้นด้วยชื่อหรือ id ได้ในเวลาคงที่"""
+
+    def __init__(self, hierarchy):
+        # hierarchy จาก compact_locations() เรียงตามชื่อไว้แล้ว
+        self.province_options = NO_OPTIONS + tuple(name for name, _, _ in hierarchy)
+        self._amphure_options = {}
+        self._tambon_options = {}
+        self._paths = {}  # id → (จังหวัด, อำเภอ, ตำบล) ชื่อของระดับที่ไม่ถึงเป็น ""
+        for province, province_id, amphures in hierarchy:
+            self._amphure_options[province] = NO_OPTIONS + tuple(name for name, _, _ in amphures)
+            self._add_id(province_id, (province, "", ""))
+            for amphure, amphure_id, tambons in amphures:
+                self._tambon_options[(province, amphure)] = NO_OPTIONS + tuple(name for name, _ in tambons)
+                self._add_id(amphure_id, (province, amphure, ""))
+                for tambon, tambon_id in tambons:
+                    self._add_id(tambon_id, (province, amphure, tambon))
+
+    def _add_id(self, location_id, path):
+        # ข้อมูลบางชุด (เช่นตัวอย่างสำรอง) ไม่มี id
+        if location_id is not None:
+            self._paths[location_id] = path
+
+    def amphure_options(self, province):
+        return self._amphure_options.get(province, NO_OPTIONS)
+
+    def tambon_options(self, province, amphure):
+        return self._tambon_options.get((province, amphure), NO_OPTIONS)
+
+    def path(self, location_id):
+        # id ของจังหวัด อำเภอ หรือตำบล → (จังหวัด, อำเภอ, ตำบล) หรือ None
+        return self._paths.get(location_id)
+
+
+_index = None
+
+
+def get_location_index():
+    global _index
+    if _index is None:
+        _index = LocationIndex(load_location_data())
+    return _index
+
+
+if __name__ == "__main__":
+    # สร้างไฟล์แบบย่อจาก JSON ที่มีอยู่ (เช่นตอน build image) โดยไม่ต้องดาวน์โหลดใหม่
+    with open(LOCATION_DATA_PATH, "r", encoding="utf-8") as f:
+        saved = save_compact_locations(compact_locations(json.load(f)))
+    print(f"✅ บันทึก {LOCATION_COMPACT_PATH} แล้ว ({saved['provinces']} จังหวัด {saved['tambons']:,} ตำบล, "
+          f"{os.path.getsize(LOCATION_COMPACT_PATH) / 1024:.0f} KB, checksum {saved['checksum']})")
@@ -0,0 +1,214 @@
+import argparse
+import json
+import os
+import re
+import sqlite3
+import sys
+import threading
+import time
+from concurrent.futures import ThreadPoolExecutor, as_completed
+from datetime import date, datetime
+
+import pandas as pd
+
+from asset_filters import OWNER_COLUMNS
+from led_http import HTTP_TIMEOUT, create_session, detect_encoding, parse_detail_page
+from web_scraping import DETAIL_LINK_COLUMN, call_with_retry, frame_lot_keys, is_upstream_failure
+
+# ✅ ดึงหน้ารายละเอียดของแต่ละล็อต (วันขายนัด หน่วยงานที่ขาย ผู้ถือกรรมสิทธิ์ สถานะ รูปภาพ) พร้อมกันหลายคำขอ
+# ผลที่ดึงแล้วเก็บในแคชตามกุญแจล็อต การค้นหาครั้งถัดไปดึงเฉพาะล็อตที่ยังไม่มีในแคช
+DETAIL_CONCURRENCY = int(os.environ.get("LED_DETAIL_CONCURRENCY", "8"))
+DETAIL_CACHE_PATH = os.environ.get("LED_DETAIL_CACHE_PATH", "led_details.sqlite3")
+DETAIL_TTL_SECONDS = int(os.environ.get("LED_DETAIL_TTL", str(24 * 3600)))
+
+OWNER_COLUMN = OWNER_COLUMNS[0]
+DETAIL_COLUMNS = ['หน่วยงานที่ขาย', OWNER_COLUMN, 'สถานะ', 'จำนวนนัด', 'วันขายนัดแรก', 'วันขายนัดถัดไป',
+                  'วันขายนัดทั้งหมด', 'จำนวนรูปภาพ', 'รูปภาพ']
+
+
+def thai_date(text):
+    # "05/03/2568" (พ.ศ.) → date(2025, 3, 5)
+    match = re.search(r"(\d{1,2})/(\d{1,2})/(\d{4})", text or "")
+    if not match:
+        return None
+    day, month, year = map(int, match.groups())
+    try:
+        return date(year - 543 if year > 2400 else year, month, day)
+    except ValueError:
+        return None
+
+
+def detail_fields(detail, today=None):
+    # แปลงผลจาก parse_detail_page เป็นฟิลด์ที่มีชนิดข้อมูล (วันที่เก็บเป็น ISO เพื่อบันทึกเป็น JSON ได้)
+    fields = detail["fields"]
+    rounds = sorted(
+        (int(match.group(1)), parsed)
+        for name, value in fields.items()
+        if (match := re.search(r"ขายนัดที่\s*(\d+)", name)) and (parsed := thai_date(value))
+    )
+    dates = [parsed for _, parsed in rounds]
+    today = today or date.today()
+    upcoming = [parsed for parsed in dates if parsed >= today]
+    return {
+        'หน่วยงานที่ขาย': fields.get('หน่วยงานที่ขาย', ''),
+        # หน้ารายละเอียดใช้หัวข้อชื่อเจ้าของได้หลายแบบ
+        OWNER_COLUMN: next((fields[label] for label in OWNER_COLUMNS if fields.get(label)), ''),
+        'สถานะ': fields.get('สถานะ', ''),
+        'จำนวนนัด': len(dates),
+        'วันขายนัดแรก': dates[0].isoformat() if dates else None,
+        'วันขายนัดถัดไป': upcoming[0].isoformat() if upcoming else None,
+        'วันขายนัดทั้งหมด': [parsed.isoformat() for parsed in dates],
+        'จำนวนรูปภาพ': len(detail["images"]),
+        'รูปภาพ': detail["images"],
+    }
+
+
+class DetailCache:
+    """แคชรายละเอียดล็อตตามกุญแจล็อต (หมายเลขคดี|ล็อตที่) บนดิสก์"""
+
+    def __init__(self, path=DETAIL_CACHE_PATH, ttl=DETAIL_TTL_SECONDS):
+        self.path = path
+        self.ttl = ttl
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS details (
+                    lot_key TEXT PRIMARY KEY,
+                    fetched_at REAL NOT NULL,
+                    payload TEXT NOT NULL
+                )
+            """)
+
+    def _connect(self):
+        return sqlite3.connect(self.path, timeout=30)
+
+    def get_many(self, keys):
+        found = {}
+        keys = list(keys)
+        expired = time.time() - self.ttl
+        with self._connect() as conn:
+            # SQLite จำกัดจำนวนพารามิเตอร์ต่อคำสั่ง จึงอ่านเป็นชุด
+            for start in range(0, len(keys), 500):
+                chunk = keys[start:start + 500]
+                rows = conn.execute(
+                    f"SELECT lot_key, payload FROM details WHERE fetched_at >= ? AND lot_key IN "
+                    f"({','.join('?' * len(chunk))})",
+                    [expired] + chunk,
+                ).fetchall()
+                found.update((key, json.loads(payload)) for key, payload in rows)
+        return found
+
+    def put_many(self, details):
+        now = time.time()
+        with self._connect() as conn:
+            conn.executemany(
+                "INSERT OR REPLACE INTO details (lot_key, fetched_at, payload) VALUES (?, ?, ?)",
+                [(key, now, json.dumps(fields, ensure_ascii=False)) for key, fields in details.items()],
+            )
+
+
+_cache = None
+
+
+def get_detail_cache():
+    global _cache
+    if _cache is None:
+        _cache = DetailCache()
+    return _cache
+
+
+_local = threading.local()
+
+
+def fetch_detail(url):
+    # session แยกต่อ thread (cookie ไม่ปนกัน) แต่ใช้ connection pool ร่วมกัน
+    session = getattr(_local, "session", None)
+    if session is None:
+        session = _local.session = create_session()
+    response = session.get(url, timeout=HTTP_TIMEOUT)
+    response.raise_for_status()
+    encoding = detect_encoding(response.headers.get("Content-Type"), response.content,
+                               lambda: response.apparent_encoding)
+    return parse_detail_page(response.content.decode(encoding, errors="replace"), url)
+
+
+def merge_detail_fields(df, details):
+    # เพิ่มคอลัมน์รายละเอียดตามกุญแจล็อต ล็อตที่ไม่มีรายละเอียดเป็นค่าว่าง
+    keys = frame_lot_keys(df)
+    extra = pd.DataFrame.from_dict(details, orient="index", columns=DETAIL_COLUMNS) if details else \
+        pd.DataFrame(columns=DETAIL_COLUMNS)
+    extra = extra.reindex(keys).reset_index(drop=True)
+    extra.index = df.index
+    for column in ('วันขายนัดแรก', 'วันขายนัดถัดไป'):
+        extra[column] = pd.to_datetime(extra[column], errors='coerce')
+    for column in ('จำนวนนัด', 'จำนวนรูปภาพ'):
+        extra[column] = extra[column].astype("Int64")
+    for column in ('หน่วยงานที่ขาย', OWNER_COLUMN, 'สถานะ'):
+        extra[column] = extra[column].fillna('').astype('category')
+    for column in ('วันขายนัดทั้งหมด', 'รูปภาพ'):
+        extra[column] = extra[column].apply(lambda value: value if isinstance(value, list) else [])
+    return pd.concat([df.drop(columns=[c for c in DETAIL_COLUMNS if c in df.columns]), extra], axis=1)
+
+
+def enrich_lots(df, concurrency=DETAIL_CONCURRENCY, on_event=None, cache=None, force_refresh=False):
+    # คืน DataFrame ที่มีคอลัมน์ DETAIL_COLUMNS เพิ่ม on_event ได้รับ
+    # {"type": "details", done, total, cached, failed} ทุกครั้งที่ดึงหน้ารายละเอียดเสร็จหนึ่งหน้า
+    emit = on_event or (lambda event: None)
+    if df.empty:
+        return merge_detail_fields(df, {})
+    cache = cache or get_detail_cache()
+    keys = frame_lot_keys(df)
+    links = dict(zip(keys, df[DETAIL_LINK_COLUMN]))
+    details = {} if force_refresh else cache.get_many(links)
+    # รายละเอียดที่แคชไว้ก่อนเพิ่มคอลัมน์ใหม่ (เช่นผู้ถือกรรมสิทธิ์) ดึงใหม่
+    details = {key: fields for key, fields in details.items() if all(column in fields for column in DETAIL_COLUMNS)}
+    missing = {key: link for key, link in links.items() if key not in details and link}
+
+    progress = {"type": "details", "done": 0, "total": len(missing), "cached": len(details), "failed": 0}
+    emit(dict(progress))
+    fetched = {}
+    if missing:
+        with ThreadPoolExecutor(max_workers=max(1, min(concurrency, len(missing)))) as executor:
+            futures = {
+                executor.submit(call_with_retry, lambda url=link: fetch_detail(url),
+                                retry_if=is_upstream_failure): key
+                for key, link in missing.items()
+            }
+            try:
+                for future in as_completed(futures):
+                    try:
+                        fetched[futures[future]] = detail_fields(future.result())
+                    except Exception as detail_error:
+                        progress["failed"] += 1
+                        print(f"DEBUG: ดึงหน้ารายละเอียด {futures[future]} ไม่สำเร็จ: {detail_error}")
+                    progress["done"] += 1
+                    emit(dict(progress))
+            except BaseException:
+                # ผู้เรียกยกเลิกกลางคัน: ไม่เริ่มคำขอที่ยังค้างในคิว
+                for future in futures:
+                    future.cancel()
+                raise
+            finally:
+                if fetched:
+                    cache.put_many(fetched)
+    details.update(fetched)
+    return merge_detail_fields(df, details)
+
+
+if __name__ == "__main__":
+    parser = argparse.ArgumentParser(description="ดึงรายละเอียดล็อตจากไฟล์ผลการค้นหา (CSV ที่มีคอลัมน์ลิงก์รายละเอียด)")
+    parser.add_argument("input")
+    parser.add_argument("output")
+    parser.add_argument("--concurrency", type=int, default=DETAIL_CONCURRENCY)
+    parser.add_argument("--force-refresh", action="store_true")
+    args = parser.parse_args()
+
+    def report(event):
+        print(f"\rรายละเอียด {event['done']}/{event['total']} (จากแคช {event['cached']}, "
+              f"ไม่สำเร็จ {event['failed']})", end="", file=sys.stderr)
+
+    started = datetime.now()
+    result = enrich_lots(pd.read_csv(args.input, dtype=str, keep_default_na=False), args.concurrency, report,
+                         force_refresh=args.force_refresh)
+    result.to_csv(args.output, index=False)
+    print(f"\nเสร็จใน {(datetime.now() - started).total_seconds():.1f} วินาที", file=sys.stderr)
@@ -0,0 +1,152 @@
+import os
+import threading
+import time
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+
+import pandas as pd
+
+from asset_store import search_assets
+from lot_details import enrich_lots
+from web_scraping import concat_frames
+
+# ✅ คิวงานดึงข้อมูลเบื้องหลัง: การค้นหาไม่ผูกกับ thread ของสคริปต์ Streamlit
+# งานอยู่ใน process ของเซิร์ฟเวอร์ จึงยังอยู่แม้หน้าเว็บ rerun หรือโหลดใหม่ (อ้างอิงด้วย job id ใน URL)
+JOB_WORKERS = int(os.environ.get("LED_JOB_WORKERS", "2"))
+JOB_RETENTION_SECONDS = int(os.environ.get("LED_JOB_RETENTION", "3600"))
+
+
+class JobCancelled(Exception):
+    pass
+
+
+class ScrapeJob:
+    """งานค้นหาหนึ่งงาน พร้อมสถานะ ความคืบหน้า และผลลัพธ์บางส่วนระหว่างดึงข้อมูล"""
+
+    def __init__(self, params):
+        self.id = uuid.uuid4().hex[:12]
+        self.params = params
+        self.status = "queued"  # queued → running → done / failed / cancelled
+        self.pages_done = 0
+        self.pages_total = None
+        self.failed_pages = []
+        self.details_done = 0
+        self.details_total = None  # จำนวนหน้ารายละเอียดที่ต้องดึง (None = ยังไม่ถึงขั้นนี้)
+        self.result = None
+        self.error = None
+        self.source = None
+        self.created_at = time.time()
+        self.finished_at = None
+        self.events = []  # ข้อความแจ้งความคืบหน้า (ยกเว้นผลรายหน้า) สำหรับแสดงใน UI
+        self._batches = {}
+        self._cancel = threading.Event()
+        self._lock = threading.Lock()
+
+    @property
+    def active(self):
+        return self.status in ("queued", "running")
+
+    def _on_event(self, event):
+        with self._lock:
+            if event["type"] == "details":
+                self.details_done, self.details_total = event["done"], event["total"]
+            elif event["type"] == "page":
+                self.pages_total = event["pages"]
+                self.pages_done = event["done"]
+                if event["error"] is None:
+                    self._batches[event["page"]] = event["rows"]
+                else:
+                    self.failed_pages.append(event["page"])
+            else:
+                self.events.append(event)
+        if self._cancel.is_set():
+            raise JobCancelled()
+
+    def cancel(self):
+        self._cancel.set()
+
+    def partial_frame(self):
+        # ผลลัพธ์ที่ดึงได้แล้ว เรียงตามลำดับหน้า
+        with self._lock:
+            batches = [self._batches[page] for page in sorted(self._batches)]
+        return concat_frames(batches) if batches else pd.DataFrame()
+
+    def progress(self):
+        return self.pages_done / self.pages_total if self.pages_total else 0.0
+
+
+class JobManager:
+    def __init__(self, workers=JOB_WORKERS):
+        self._executor = ThreadPoolExecutor(max_workers=workers, thread_name_prefix="scrape-job")
+        self._jobs = {}
+        self._lock = threading.Lock()
+
+    def submit(self, province='', district='', subdistrict='', max_pages=None, force_refresh=False,
+               with_details=False, filters=None):
+        params = {
+            "province": province, "district": district, "subdistrict": subdistrict,
+            "max_pages": max_pages, "force_refresh": force_refresh, "with_details": with_details,
+            "filters": filters or {},
+        }
+        with self._lock:
+            self._prune()
+            # กดค้นหาซ้ำด้วยเงื่อนไขเดิมขณะที่งานเดิมยังไม่เสร็จ ใช้งานเดิมต่อ
+            for job in self._jobs.values():
+                if job.active and job.params == params:
+                    return job
+            job = ScrapeJob(params)
+            self._jobs[job.id] = job
+        self._executor.submit(self._run, job)
+        return job
+
+    def get(self, job_id):
+        with self._lock:
+            return self._jobs.get(job_id)
+
+    def _run(self, job):
+        if job._cancel.is_set():
+            job.status = "cancelled"
+            job.finished_at = time.time()
+            return
+        job.status = "running"
+        try:
+            params = dict(job.params)
+            with_details = params.pop("with_details")
+            df, error, source = search_assets(on_event=job._on_event, run_id=job.id, **params)
+            if error is None and with_details:
+                # ขั้นที่สอง: ดึงหน้ารายละเอียดของทุกล็อต (วันขายนัด หน่วยงาน รูปภาพ)
+                df = enrich_lots(df, on_event=job._on_event, force_refresh=params["force_refresh"])
+            job.result, job.error, job.source = df, error, source
+            job.status = "failed" if error else "done"
+        except JobCancelled:
+            job.status = "cancelled"
+        except Exception as e:
+            job.error = f"เกิดข้อผิดพลาด: {e}"
+            job.status = "failed"
+        finally:
+            job.finished_at = time.time()
+
+    def _prune(self):
+        # ลบงานที่เสร็จแล้วนานเกินกำหนด
+        expired = time.time() - JOB_RETENTION_SECONDS
+        for job_id in [job_id for job_id, job in self._jobs.items()
+                       if job.finished_at is not None and job.finished_at < expired]:
+            del self._jobs[job_id]
+
+    def stats(self):
+        with self._lock:
+            statuses = [job.status for job in self._jobs.values()]
+        return {status: statuses.count(status) for status in ("queued", "running", "done", "failed", "cancelled")}
+
+
+_manager = None
+_manager_lock = threading.Lock()
+
+
+def get_job_manager():
+    # singleton ระดับ process ใช้ร่วมกันทุก session ของ Streamlit
+    global _manager
+    with _manager_lock:
+        if _manager is None:
+            _manager = JobManager()
+        return _manager
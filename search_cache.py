@@ -0,0 +1,143 @@
+import os
+import pickle
+import sqlite3
+import time
+
+from web_scraping import clean_district_name, clean_subdistrict_name, filters_key, scrape_led_data
+
+# ✅ แคชผลการค้นหาบนดิสก์ (SQLite) ใช้ร่วมกันได้หลาย process ของ Streamlit
+CACHE_PATH = os.environ.get("LED_CACHE_PATH", "led_cache.sqlite3")
+CACHE_TTL_SECONDS = int(os.environ.get("LED_CACHE_TTL", "3600"))
+CACHE_MAX_MB = int(os.environ.get("LED_CACHE_MAX_MB", "200"))
+
+
+class SearchCache:
+    """แคชแบบ TTL + LRU จำกัดขนาด เก็บ DataFrame ตามเงื่อนไขค้นหาที่ normalize แล้ว"""
+
+    def __init__(self, path=CACHE_PATH, ttl=CACHE_TTL_SECONDS, max_mb=CACHE_MAX_MB):
+        self.path = path
+        self.ttl = ttl
+        self.max_bytes = max_mb * 1024 * 1024
+        with self._connect() as conn:
+            conn.execute("PRAGMA journal_mode=WAL")  # ผู้อ่านไม่ถูกบล็อกระหว่างที่อีก process เขียน
+            conn.execute("""
+                CREATE TABLE IF NOT EXISTS searches (
+                    key TEXT PRIMARY KEY,
+                    created_at REAL NOT NULL,
+                    accessed_at REAL NOT NULL,
+                    size INTEGER NOT NULL,
+                    payload BLOB NOT NULL
+                )
+            """)
+            conn.execute("CREATE INDEX IF NOT EXISTS searches_accessed ON searches (accessed_at)")
+            conn.execute("CREATE TABLE IF NOT EXISTS counters (name TEXT PRIMARY KEY, value INTEGER NOT NULL)")
+
+    def _connect(self):
+        # เปิด connection ใหม่ทุกครั้ง ปลอดภัยทั้งข้าม thread และข้าม process
+        return sqlite3.connect(self.path, timeout=30)
+
+    @staticmethod
+    def _count(conn, name):
+        conn.execute(
+            "INSERT INTO counters (name, value) VALUES (?, 1) ON CONFLICT(name) DO UPDATE SET value = value + 1",
+            (name,),
+        )
+
+    def get(self, key):
+        now = time.time()
+        with self._connect() as conn:
+            row = conn.execute("SELECT created_at, payload FROM searches WHERE key = ?", (key,)).fetchone()
+            if row is None or now - row[0] > self.ttl:
+                if row is not None:
+                    conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+                self._count(conn, "misses")
+                return None
+            conn.execute("UPDATE searches SET accessed_at = ? WHERE key = ?", (now, key))
+            self._count(conn, "hits")
+        return pickle.loads(row[1])
+
+    def put(self, key, df):
+        payload = pickle.dumps(df, protocol=pickle.HIGHEST_PROTOCOL)
+        now = time.time()
+        with self._connect() as conn:
+            conn.execute(
+                "INSERT OR REPLACE INTO searches (key, created_at, accessed_at, size, payload) VALUES (?, ?, ?, ?, ?)",
+                (key, now, now, len(payload), payload),
+            )
+            self._evict(conn, now)
+
+    def _evict(self, conn, now):
+        conn.execute("DELETE FROM searches WHERE created_at < ?", (now - self.ttl,))
+        total = conn.execute("SELECT COALESCE(SUM(size), 0) FROM searches").fetchone()[0]
+        if total <= self.max_bytes:
+            return
+        # ลบรายการที่ไม่ได้ใช้นานที่สุดจนกว่าขนาดรวมจะไม่เกินที่กำหนด
+        for key, size in conn.execute("SELECT key, size FROM searches ORDER BY accessed_at").fetchall():
+            if total <= self.max_bytes:
+                break
+            conn.execute("DELETE FROM searches WHERE key = ?", (key,))
+            self._count(conn, "evictions")
+            total -= size
+
+    def stats(self):
+        with self._connect() as conn:
+            counters = dict(conn.execute("SELECT name, value FROM counters").fetchall())
+            entries, size = conn.execute("SELECT COUNT(*), COALESCE(SUM(size), 0) FROM searches").fetchone()
+        hits, misses = counters.get("hits", 0), counters.get("misses", 0)
+        return {
+            "entries": entries,
+            "size_mb": round(size / (1024 * 1024), 2),
+            "hits": hits,
+            "misses": misses,
+            "evictions": counters.get("evictions", 0),
+            "hit_rate": round(hits / (hits + misses), 3) if hits + misses else 0.0,
+        }
+
+
+def search_key(province, district, subdistrict, max_pages, filters=None):
+    # ค้นหาที่ต่างกันแค่คำนำหน้า (อำเภอ/เขต/ตำบล/แขวง) หรือช่องว่าง ถือเป็นการค้นหาเดียวกัน
+    parts = [
+        (province or "").strip(),
+        clean_district_name(district),
+        clean_subdistrict_name(subdistrict),
+        str(max_pages or 0),
+    ]
+    if filters:
+        parts.append(filters_key(filters))
+    return "|".join(parts)
+
+
+_cache = None
+
+
+def get_search_cache():
+    global _cache
+    if _cache is None:
+        _cache = SearchCache()
+    return _cache
+
+
+def cached_scrape_led_data(province='', district='', subdistrict='', max_pages=None, force_refresh=False,
+                           on_event=None, run_id=None, filters=None):
+    # คืน (df, error, มาจากแคชหรือไม่, หน้าที่ดึงไม่สำเร็จ) on_event ได้รับความคืบหน้าเฉพาะเมื่อดึงจากเว็บไซต์
+    # ผลที่ขาดบางหน้าไม่ถูกเก็บในแคช การค้นหาครั้งถัดไปจะดึงใหม่
+    cache = get_search_cache()
+    key = search_key(province, district, subdistrict, max_pages, filters)
+    if not force_refresh:
+        df = cache.get(key)
+        if df is not None:
+            return df, None, True, []
+
+    failed_pages = []
+
+    def track(event):
+        if event["type"] == "done":
+            failed_pages.extend(event["failed_pages"])
+        if on_event:
+            on_event(event)
+
+    df, error = scrape_led_data(province, district, subdistrict, max_pages, on_event=track, run_id=run_id,
+                                filters=filters, force_refresh=force_refresh)
+    if error is None and not df.empty and not failed_pages:
+        cache.put(key, df)
+    return df, error, False, failed_pages
@@ -0,0 +1,76 @@
+from datetime import date
+
+import pytest
+
+from asset_filters import filter_mask, query_results
+from lot_details import merge_detail_fields
+from web_scraping import LotRecord, compact_frame, frame_lot_keys, records_to_frame
+
+# ✅ ทดสอบ filter_mask กับ DataFrame แบบเดียวกับผลการค้นหา (records_to_frame + compact_frame)
+LOTS = [
+    # (ล็อต, ประเภท, ไร่, งาน, ตร.วา, ราคาประเมิน)
+    ("1-1", "ที่ดินว่างเปล่า", "1", "0", "0", "2,000,000"),     # 400 ตร.วา
+    ("1-2", "ห้องชุด", "0", "0", "30", "1,200,000"),            # 30 ตร.วา
+    ("2-1", "บ้าน", "0", "2", "50", "3,500,000"),               # 250 ตร.วา
+    ("2-2", "ที่ดินพร้อมสิ่งปลูกสร้าง", "0", "1", "0", ""),       # 100 ตร.วา ไม่มีราคา
+]
+AUCTION_DATES = {
+    "1-1": [date(2025, 3, 5), date(2025, 3, 19)],
+    "2-1": [date(2025, 3, 19)],
+    "2-2": [],
+}
+
+
+@pytest.fixture
+def lots():
+    records = [
+        LotRecord(str(index), lot, f"ผบ.{index}/2567", kind, rai, ngan, wa, price, "ศรีภูมิ", "เมืองเชียงใหม่",
+                  "เชียงใหม่", "")
+        for index, (lot, kind, rai, ngan, wa, price) in enumerate(LOTS, start=1)
+    ]
+    return compact_frame(records_to_frame(records))
+
+
+def selected(df, criteria):
+    return list(df.loc[filter_mask(df, criteria), 'ล็อตที่-ชุดที่'])
+
+
+def test_no_criteria_keeps_every_row(lots):
+    assert filter_mask(lots, None).all()
+    assert filter_mask(lots, {}).all()
+
+
+def test_price_range(lots):
+    assert selected(lots, {"min_price": 2_000_000}) == ["1-1", "2-1"]
+    assert selected(lots, {"max_price": 2_000_000}) == ["1-1", "1-2"]
+    assert selected(lots, {"min_price": 1_500_000, "max_price": 3_000_000}) == ["1-1"]
+
+
+def test_min_area(lots):
+    assert selected(lots, {"min_area_wa": 100}) == ["1-1", "2-1", "2-2"]
+    assert selected(lots, {"min_area_wa": 300}) == ["1-1"]
+
+
+def test_min_area_without_normalized_column(lots):
+    raw = lots.drop(columns=['เนื้อที่ (ตร.วา)'])
+    assert selected(raw, {"min_area_wa": 250}) == ["1-1", "2-1"]
+
+
+def test_auction_date_matches_any_round(lots):
+    keys = dict(zip(lots['ล็อตที่-ชุดที่'], frame_lot_keys(lots)))
+    details = {
+        keys[lot]: {'วันขายนัดทั้งหมด': [day.isoformat() for day in days]} for lot, days in AUCTION_DATES.items()
+    }
+    enriched = merge_detail_fields(lots, details)
+    assert selected(enriched, {"auction_date": date(2025, 3, 19)}) == ["1-1", "2-1"]
+    assert selected(enriched, {"auction_date": date(2025, 3, 5)}) == ["1-1"]
+    assert selected(enriched, {"auction_date": date(2025, 4, 1)}) == []
+
+
+def test_auction_date_ignored_without_details(lots):
+    assert filter_mask(lots, {"auction_date": date(2025, 3, 19)}).all()
+
+
+def test_criteria_combine(lots):
+    result = query_results(lots, {"asset_type": "ที่ดิน", "min_area_wa": 200}, "ราคาประเมิน (สูง-ต่ำ)")
+    assert list(result['ล็อตที่-ชุดที่']) == ["1-1"]
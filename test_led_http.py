@@ -0,0 +1,84 @@
+from urllib.parse import urljoin
+
+import pytest
+import requests
+
+from led_http import HttpBackend, parse_page
+from led_stub_server import PROPERTY_TYPES, ROWS_PER_PAGE, detail_query, generate_rows, start_stub_server
+from web_scraping import PageNavigationError, TABLE_COLUMNS, search_filters
+
+# ✅ ทดสอบ HttpBackend และ LedPageParser กับเซิร์ฟเวอร์จำลอง (led_stub_server) โดยไม่ต้องต่อเว็บไซต์จริง
+TOTAL_ROWS = 120  # 3 หน้า (50 + 50 + 20 แถว)
+PROVINCE = "เชียงใหม่"
+
+
+@pytest.fixture(scope="module")
+def stub_url():
+    server, url = start_stub_server(port=0, total_rows=TOTAL_ROWS)
+    yield url
+    server.shutdown()
+    server.server_close()
+
+
+@pytest.fixture
+def backend(stub_url):
+    backend = HttpBackend(session=requests.Session(), search_url=stub_url)
+    yield backend
+    backend.close()
+
+
+def expected_rows(url, rows):
+    # แถวจาก generate_rows → ค่าตามลำดับ COLUMNS (ช่องเนื้อที่ที่ว่างเป็น "0" และมีลิงก์รายละเอียดต่อท้าย)
+    return [
+        [(value or "0") if index in (4, 5, 6) else value for index, value in enumerate(row)]
+        + [urljoin(url, f"asset_open.asp?{detail_query(row)}")]
+        for row in rows
+    ]
+
+
+def test_parser_reads_search_form(stub_url):
+    parsed = parse_page(requests.get(stub_url, timeout=10).content.decode("cp874"))
+    form = parsed.form_with("province")
+    assert form["method"] == "post"
+    assert {"province", "ampur", "tumbol", "seckey"} <= set(form["fields"])
+    assert [text for _, text in form["options"]["asset_type"]] == ["ทั้งหมด"] + PROPERTY_TYPES
+    assert parsed.captcha.isdigit()
+    assert parsed.total_pages() == 0
+
+
+def test_parser_reads_results_table(backend):
+    assert backend.search(PROVINCE, "", "") == 3
+    parsed = parse_page(backend.last_html)
+    assert parsed.total_pages() == 3
+    assert "หน้าที่ 1/3" in parsed.pagination
+    header_rows = [row for row in parsed.table_rows if row["header"]]
+    body_rows = [row for row in parsed.table_rows if not row["header"]]
+    assert len(header_rows) == 2
+    assert len(body_rows) == ROWS_PER_PAGE
+    assert all(len(row["cells"]) == len(TABLE_COLUMNS) for row in body_rows)
+    assert all(row["link"].startswith("asset_open.asp?") for row in body_rows)
+
+
+def test_search_and_pagination(backend, stub_url):
+    assert backend.search(PROVINCE, "", "") == 3
+    pages = [backend.fetch_page(page) for page in (1, 3, 2)]
+    assert [len(rows) for rows in pages] == [50, 20, 50]
+
+    records = pages[0] + pages[2] + pages[1]
+    assert [list(record) for record in records] == \
+        expected_rows(stub_url, generate_rows(PROVINCE, "", "", TOTAL_ROWS))
+
+
+def test_fetch_page_outside_results(backend):
+    assert backend.search(PROVINCE, "", "") == 3
+    with pytest.raises(PageNavigationError):
+        backend.fetch_page(4)
+
+
+def test_search_with_filters(backend):
+    backend.filters = search_filters(asset_type="คอนโด")
+    pages = backend.search(PROVINCE, "", "")
+    records = [record for page in range(1, pages + 1) for record in backend.fetch_page(page)]
+    expected = [row for row in generate_rows(PROVINCE, "", "", TOTAL_ROWS) if row[3] == "ห้องชุด"]
+    assert records and len(records) == len(expected)
+    assert {record.property_type for record in records} == {"ห้องชุด"}
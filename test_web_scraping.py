@@ -0,0 +1,161 @@
+import asyncio
+import os
+import time
+
+import pytest
+import requests
+
+import web_scraping
+from web_scraping import CheckpointInUse, CircuitBreaker, CrawlCheckpoint, LotRecord, call_with_retry, \
+    call_with_retry_async
+
+# ✅ ทดสอบนโยบายลองใหม่ / circuit breaker และจุดบันทึกการดึงต่อ โดยไม่ต้องต่อเว็บไซต์
+UPSTREAM_ERROR = requests.exceptions.ConnectionError("เว็บไซต์ไม่ตอบสนอง")
+SEARCH_ARGS = ("เชียงใหม่", "เมืองเชียงใหม่", "")
+
+
+@pytest.fixture(autouse=True)
+def fast_retries(monkeypatch):
+    # breaker แยกของแต่ละการทดสอบ และไม่รอระหว่างลองใหม่
+    monkeypatch.setattr(web_scraping, "_breaker", CircuitBreaker(threshold=100))
+    monkeypatch.setattr(web_scraping, "backoff_delay", lambda attempt: 0)
+
+
+def lot(page, index):
+    return LotRecord(str(index), f"{page}-{index}", f"ผบ.{page}{index}/2567", "ห้องชุด", "0", "0", "30",
+                     "1,500,000", "ศรีภูมิ", "เมืองเชียงใหม่", "เชียงใหม่", "")
+
+
+class Flaky:
+    """action ที่ผิดพลาดตามจำนวนครั้งที่กำหนดก่อนสำเร็จ"""
+
+    def __init__(self, failures, error=UPSTREAM_ERROR):
+        self.failures = failures
+        self.error = error
+        self.calls = 0
+
+    def __call__(self):
+        self.calls += 1
+        if self.calls <= self.failures:
+            raise self.error
+        return "ok"
+
+
+def test_breaker_opens_after_threshold_and_closes_after_trial():
+    breaker = CircuitBreaker(threshold=2, cooldown=0.05)
+    breaker.record(UPSTREAM_ERROR)
+    assert breaker.state == "closed"
+    breaker.record(UPSTREAM_ERROR)
+    assert breaker.state == "open"
+    assert breaker.delay() > 0
+
+    time.sleep(0.06)
+    assert breaker.delay() == 0            # คำขอทดลองผ่านได้หนึ่งคำขอ
+    assert breaker.state == "half_open"
+    assert breaker.delay() > 0             # คำขออื่นรอผลของคำขอทดลอง
+
+    breaker.record()
+    assert breaker.state == "closed"
+    assert breaker.delay() == 0
+    assert breaker.counters["opened"] == 1
+
+
+def test_breaker_reopens_with_longer_cooldown_when_trial_fails():
+    breaker = CircuitBreaker(threshold=1, cooldown=0.05)
+    breaker.record(UPSTREAM_ERROR)
+    time.sleep(0.06)
+    assert breaker.delay() == 0
+    breaker.record(UPSTREAM_ERROR)
+    assert breaker.state == "open"
+    assert breaker.cooldown == pytest.approx(0.1)
+
+
+def test_breaker_ignores_errors_that_are_not_upstream_failures():
+    breaker = CircuitBreaker(threshold=1, cooldown=60)
+    breaker.record(ValueError("หน้าผลลัพธ์ผิดรูปแบบ"))
+    assert breaker.state == "closed"
+
+
+def test_retry_gives_up_after_attempts():
+    action = Flaky(failures=10)
+    with pytest.raises(requests.exceptions.ConnectionError):
+        call_with_retry(action, attempts=2)
+    assert action.calls == 3
+    assert web_scraping.get_retry_stats()["gave_up"] >= 1
+
+
+def test_retry_recovers_and_calls_recover_between_attempts():
+    action = Flaky(failures=2)
+    recovered = []
+    assert call_with_retry(action, attempts=3, recover=recovered.append) == "ok"
+    assert action.calls == 3
+    assert recovered == [UPSTREAM_ERROR, UPSTREAM_ERROR]
+
+
+def test_retry_if_stops_on_other_errors():
+    action = Flaky(failures=10, error=ValueError("ไม่ใช่ปัญหาของเว็บไซต์"))
+    with pytest.raises(ValueError):
+        call_with_retry(action, attempts=3, retry_if=web_scraping.is_upstream_failure)
+    assert action.calls == 1
+
+
+def test_async_retry_gives_up_after_attempts():
+    action = Flaky(failures=10)
+
+    async def attempt():
+        return action()
+
+    with pytest.raises(requests.exceptions.ConnectionError):
+        asyncio.run(call_with_retry_async(attempt, attempts=2))
+    assert action.calls == 3
+
+    action = Flaky(failures=1)
+    assert asyncio.run(call_with_retry_async(attempt, attempts=2)) == "ok"
+    assert action.calls == 2
+
+
+def test_checkpoint_replays_saved_pages(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=3)
+    assert checkpoint.pending(3) == [1, 2, 3]
+    checkpoint.record(1, [lot(1, 1), lot(1, 2)])
+    checkpoint.record(3, [lot(3, 1)])
+    checkpoint.close()
+
+    resumed = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=3)
+    try:
+        assert resumed.pending(3) == [2]
+        assert resumed.pages[1] == [lot(1, 1), lot(1, 2)]
+        assert resumed.pages[3] == [lot(3, 1)]
+    finally:
+        resumed.close()
+
+
+def test_checkpoint_starts_over_when_results_change_or_fresh(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=3)
+    checkpoint.record(1, [lot(1, 1)])
+    checkpoint.close()
+
+    changed = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=4)
+    changed.close()
+    assert changed.pages == {}
+
+    checkpoint = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=4)
+    checkpoint.record(1, [lot(1, 1)])
+    checkpoint.close()
+    fresh = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=4, fresh=True)
+    fresh.close()
+    assert fresh.pages == {}
+
+
+def test_checkpoint_in_use_and_deleted_on_finish(tmp_path):
+    checkpoint = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=2)
+    with pytest.raises(CheckpointInUse):
+        CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=2)
+    checkpoint.record(1, [lot(1, 1)])
+    checkpoint.record(2, [lot(2, 1)])
+    checkpoint.finish()
+    assert not os.path.exists(checkpoint.path)
+
+    again = CrawlCheckpoint(str(tmp_path), SEARCH_ARGS, found_pages=2)
+    again.close()
+    assert again.pending(2) == [1, 2]
@@ -1,268 +1,1243 @@
+import asyncio
+import hashlib
 import requests
 import json
+import os
+import numpy as np
 import pandas as pd
 import re
-import streamlit as st
+import queue
+import random
+import threading
 import time
-from selenium import webdriver
+from concurrent.futures import ThreadPoolExecutor
+from operator import attrgetter
+from urllib.parse import urlencode, urljoin
+
+from asset_filters import filter_mask, subset
+from diagnostics import create_diagnostics
 from selenium.webdriver.common.by import By
-from selenium.webdriver.chrome.service import Service
-from selenium.webdriver.support.ui import WebDriverWait
+from selenium.webdriver.support.ui import Select, WebDriverWait
 from selenium.webdriver.support import expected_conditions as EC
 from selenium.webdriver.common.action_chains import ActionChains
-from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException
-from webdriver_manager.chrome import ChromeDriverManager
+from selenium.common.exceptions import TimeoutException, NoSuchElementException, StaleElementReferenceException, \
+    WebDriverException
+
+# ✅ ตัวรอแบบ event-driven: เดินหน้าทันทีเมื่อหน้าเว็บพร้อมจริง แทนการ time.sleep แบบตายตัว
+# (ขั้นต่ำ, สูงสุด) ของ timeout แต่ละขั้นตอน หน่วยวินาที
+PHASE_TIMEOUTS = {
+    "field": (3, 10),      # กรอกช่องจังหวัด/อำเภอ/ตำบล
+    "search": (10, 45),    # คลิกปุ่มค้นหาจนหน้าผลลัพธ์โหลด
+    "results": (5, 30),    # รอตารางผลลัพธ์ปรากฏ
+    "paginate": (8, 30),   # คลิกเปลี่ยนหน้าจนตารางใหม่แทนที่ตารางเดิม
+}
+
+RESULTS_TABLE_XPATH = '//table[@class="table linkevent"]'
+PAGINATION_XPATH = '//div[contains(text(), "หน้าที่")]'
+
+
+class PhaseLatency:
+    """เรียนรู้เวลาตอบสนองของขั้นตอนหนึ่งด้วยค่าเฉลี่ยเคลื่อนที่ (แบบเดียวกับ RTO ของ TCP)"""
+
+    def __init__(self, floor, cap):
+        self.floor = floor
+        self.cap = cap
+        self.srtt = None     # ค่าเฉลี่ยเวลาที่ใช้
+        self.rttvar = 0.0    # ความแปรปรวนของเวลาที่ใช้
+        self.samples = 0
+        self.timeouts = 0
+
+    def timeout(self):
+        if self.srtt is None:
+            return self.cap
+        return min(self.cap, max(self.floor, self.srtt + 4 * self.rttvar))
+
+    def poll_interval(self):
+        # ถามสถานะถี่ขึ้นเมื่อเว็บตอบเร็ว เพื่อลดเวลารอหลังหน้าเว็บพร้อมแล้ว
+        if self.srtt is None:
+            return 0.1
+        return min(0.5, max(0.05, self.srtt / 10))
+
+    def record(self, elapsed):
+        self.samples += 1
+        if self.srtt is None:
+            self.srtt = elapsed
+            self.rttvar = elapsed / 2
+        else:
+            self.rttvar = 0.75 * self.rttvar + 0.25 * abs(self.srtt - elapsed)
+            self.srtt = 0.875 * self.srtt + 0.125 * elapsed
+
+    def record_timeout(self):
+        # หมดเวลา: ขยาย timeout ครั้งถัดไปเผื่อเว็บช้าลงชั่วคราว
+        self.timeouts += 1
+        if self.srtt is not None:
+            self.rttvar = min(self.cap, max(self.rttvar * 2, self.floor / 4))
+
+
+# สถิติใช้ร่วมกันทั้ง process เพื่อให้การค้นหาครั้งถัดไปได้ประโยชน์จากสิ่งที่เรียนรู้แล้ว
+_phase_latency = {phase: PhaseLatency(*limits) for phase, limits in PHASE_TIMEOUTS.items()}
+_phase_latency_lock = threading.Lock()
+
+
+def get_wait_stats():
+    with _phase_latency_lock:
+        return {
+            phase: {
+                "mean_seconds": round(stat.srtt, 3) if stat.srtt is not None else None,
+                "timeout_seconds": round(stat.timeout(), 3),
+                "samples": stat.samples,
+                "timeouts": stat.timeouts,
+            }
+            for phase, stat in _phase_latency.items()
+        }
+
 
-# ✅ ฟังก์ชันดึงข้อมูลจังหวัด-อำเภอ-ตำบล โดยตัดคำว่า "เขต" หรือ "อำเภอ" ออก
-def download_province_data():
-    url = "https://raw.githubusercontent.com/kongvut/thai-province-data/master/api_province_with_amphure_tambon.json"
+class PageWaiter:
+    """รอเงื่อนไขของหน้าเว็บตามขั้นตอน พร้อมบันทึกเวลาที่ใช้จริงไว้เรียนรู้"""
+
+    def __init__(self, driver):
+        self.driver = driver
+
+    def until(self, phase, condition):
+        with _phase_latency_lock:
+            stat = _phase_latency[phase]
+            timeout, interval = stat.timeout(), stat.poll_interval()
+        started = time.monotonic()
+        try:
+            result = WebDriverWait(
+                self.driver, timeout, poll_frequency=interval,
+                ignored_exceptions=(StaleElementReferenceException,)
+            ).until(condition)
+        except TimeoutException:
+            with _phase_latency_lock:
+                stat.record_timeout()
+            raise
+        with _phase_latency_lock:
+            stat.record(time.monotonic() - started)
+        return result
+
+    def field_value(self, element, value):
+        # ช่องกรอกรับค่าแล้ว และไม่มี AJAX ค้างอยู่ (ถ้าหน้าเว็บใช้ jQuery)
+        def ready(driver):
+            return element.get_attribute("value") == value and page_idle(driver)
+        return self.until("field", ready)
+
+    def search_results(self, old_page):
+        # หน้าเดิมถูกแทนที่แล้ว และหน้าใหม่โหลดเสร็จ
+        self.until("search", lambda d: is_stale(old_page) and page_idle(d))
+        return self.until("results", EC.presence_of_element_located((By.XPATH, RESULTS_TABLE_XPATH)))
+
+    def page_change(self, old_table, old_marker, next_page):
+        # ตารางเดิมหายไป หรือเลขหน้าในตัวบอกหน้าเปลี่ยนเป็นหน้าถัดไป
+        def changed(driver):
+            if is_stale(old_table):
+                return page_idle(driver)
+            marker = pagination_marker(driver)
+            return marker is not None and marker != old_marker and marker.startswith(f"{next_page}/")
+        self.until("paginate", changed)
+        return self.until("results", EC.presence_of_element_located((By.XPATH, RESULTS_TABLE_XPATH)))
+
+
+def is_stale(element):
     try:
-        response = requests.get(url, timeout=15)
-        response.raise_for_status()
-        data = response.json()
-
-        clean_data = []
-        for province in data:
-            province_name = province["name_th"].strip()
-            amphures = []
-            for amphure in province.get("amphure", []):
-                amphure_name = amphure["name_th"].replace("เขต", "").replace("อำเภอ", "").strip()
-                tambons = [
-                    {
-                        "name_th": tambon["name_th"].replace("ตำบล", "").replace("แขวง", "").strip(),
-                        "name_en": tambon["name_en"]
-                    }
-                    for tambon in amphure.get("tambon", [])
-                ]
-                amphures.append({
-                    "name_th": amphure_name,
-                    "name_en": amphure["name_en"],
-                    "tambon": tambons
-                })
-            clean_data.append({
-                "name_th": province_name,
-                "name_en": province["name_en"],
-                "amphure": amphures
-            })
-
-        with open("thai_provinces.json", "w", encoding="utf-8") as f:
-            json.dump(clean_data, f, ensure_ascii=False, indent=2)
-
-        print("✅ ดาวน์โหลดและบันทึกไฟล์ thai_provinces.json สำเร็จแล้ว (ตัดเขต/อำเภอ/ตำบล ออก)")
-
-    except requests.exceptions.RequestException as e:
-        print("❌ ไม่สามารถดาวน์โหลดข้อมูลได้:", e)
+        element.is_enabled()
+        return False
+    except StaleElementReferenceException:
+        return True
 
-# ✅ ฟังก์ชันดึงข้อมูลทรัพย์จากเว็บไซต์กรมบังคับคดี
-def scrape_led_data(province='', district='', subdistrict='', max_pages=None):
-    options = webdriver.ChromeOptions()
-    options.add_argument('--headless')
-    options.add_argument('--no-sandbox')
-    options.add_argument('--disable-dev-shm-usage')
-    options.add_argument('--disable-gpu')
-    options.add_argument('--window-size=1920,1080')
-    options.add_argument('--user-agent=Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36')
-
-    # ตัดคำนำหน้าออกก่อนส่งไปยังเว็บไซต์
-    cleaned_district = district.replace("เขต", "").replace("อำเภอ", "").strip() if district else ""
-    cleaned_subdistrict = subdistrict.replace("ตำบล", "").replace("แขวง", "").strip() if subdistrict else ""
-    
-    driver = None
+
+def page_idle(driver):
+    return driver.execute_script(
+        "return document.readyState === 'complete' && "
+        "(typeof window.jQuery === 'undefined' || window.jQuery.active === 0);"
+    )
+
+
+def pagination_marker(driver):
     try:
-        driver = webdriver.Chrome(service=Service(ChromeDriverManager().install()), options=options)
+        match = re.search(r'(\d+)/(\d+)', driver.find_element(By.XPATH, PAGINATION_XPATH).text)
+    except NoSuchElementException:
+        return None
+    return match.group(0) if match else None
+
+
+# ✅ ดึงตารางผลลัพธ์ทั้งหน้าในการเรียก WebDriver ครั้งเดียว แทนการอ่านทีละเซลล์
+# กำหนดชื่อคอลัมน์ให้ตรงกับเว็บไซต์
+TABLE_COLUMNS = [
+    'ลำดับ', 'ล็อตที่-ชุดที่', 'หมายเลขคดี', 'ประเภททรัพย์',
+    'ไร่', 'งาน', 'ตร.วา', 'ราคาประเมิน', 'ตำบล', 'อำเภอ', 'จังหวัด'
+]
+DETAIL_LINK_COLUMN = 'ลิงก์รายละเอียด'
+COLUMNS = TABLE_COLUMNS + [DETAIL_LINK_COLUMN]
+
+
+class LotRecord:
+    """ทรัพย์หนึ่งแถวจากตารางผลการค้นหา ฟิลด์เรียงตาม COLUMNS (ชื่อฟิลด์ตรงกับคอลัมน์ในคลังข้อมูลทรัพย์)"""
+
+    __slots__ = ("seq", "lot", "case_number", "property_type", "rai", "ngan", "wa", "price",
+                 "tambon", "amphoe", "province", "detail_url")
+
+    def __init__(self, seq, lot, case_number, property_type, rai, ngan, wa, price, tambon, amphoe, province,
+                 detail_url=""):
+        self.seq = seq
+        self.lot = lot
+        self.case_number = case_number
+        self.property_type = property_type
+        self.rai = rai
+        self.ngan = ngan
+        self.wa = wa
+        self.price = price
+        self.tambon = tambon
+        self.amphoe = amphoe
+        self.province = province
+        self.detail_url = detail_url
+
+    @property
+    def key(self):
+        # กุญแจประจำล็อต (หมายเลขคดี + ล็อตที่-ชุดที่) ใช้ตัดแถวซ้ำและเป็น hash ของแถว
+        return f"{self.case_number.strip()}|{self.lot.strip()}"
+
+    # ใช้แทน list เดิมได้: วนค่า / record[i] / len() / list(record) สำหรับบันทึกเป็น JSON
+    def __iter__(self):
+        return iter(_lot_values(self))
+
+    def __getitem__(self, index):
+        return _lot_values(self)[index]
+
+    def __len__(self):
+        return len(self.__slots__)
+
+    def __eq__(self, other):
+        return isinstance(other, LotRecord) and _lot_values(self) == _lot_values(other)
+
+    def __hash__(self):
+        return hash(self.key)
+
+    def __repr__(self):
+        return f"LotRecord({', '.join(map(repr, self))})"
+
+    @classmethod
+    def coerce(cls, row):
+        # แถวจากจุดบันทึก / snapshot (JSON list) → LotRecord
+        return row if isinstance(row, cls) else cls(*row)
+
+    @classmethod
+    def columns(cls, records):
+        # แปลงเป็นข้อมูลแบบคอลัมน์ทั้งชุดในครั้งเดียว {ชื่อคอลัมน์: [ค่า, ...]}
+        return {column: list(map(attrgetter(field), records)) for column, field in zip(COLUMNS, cls.__slots__)}
+
+
+_lot_values = attrgetter(*LotRecord.__slots__)
+
+# หัวตารางบนเว็บไซต์ (ตัดช่องว่างออกแล้ว) → ชื่อคอลัมน์
+HEADER_ALIASES = {
+    'ลำดับ': 'ลำดับ',
+    'ลำดับที่': 'ลำดับ',
+    'ล็อตที่-ชุดที่': 'ล็อตที่-ชุดที่',
+    'ล็อตที่ชุดที่': 'ล็อตที่-ชุดที่',
+    'หมายเลขคดี': 'หมายเลขคดี',
+    'ประเภททรัพย์': 'ประเภททรัพย์',
+    'ไร่': 'ไร่',
+    'งาน': 'งาน',
+    'ตร.วา': 'ตร.วา',
+    'ตารางวา': 'ตร.วา',
+    'ราคาประเมิน': 'ราคาประเมิน',
+    'ตำบล': 'ตำบล',
+    'แขวง': 'ตำบล',
+    'อำเภอ': 'อำเภอ',
+    'เขต': 'อำเภอ',
+    'จังหวัด': 'จังหวัด',
+}
+
+# คืนค่าแต่ละแถวเป็น {header, cells: [[ข้อความ, colspan, rowspan], ...], link}
+EXTRACT_TABLE_JS = """
+const table = document.evaluate(arguments[0], document, null,
+    XPathResult.FIRST_ORDERED_NODE_TYPE, null).singleNodeValue;
+if (!table) return null;
+const linkOf = row => {
+    const anchor = row.querySelector('a[href]:not([href^="javascript"]):not([href="#"])');
+    if (anchor) return anchor.href;
+    const clickable = [row, ...row.querySelectorAll('[onclick]')]
+        .map(node => node.getAttribute('onclick') || '').join(' ');
+    const match = clickable.match(/['"]([^'"]+\\.asp\\?[^'"]*)['"]/);
+    return match ? match[1] : '';
+};
+return Array.from(table.rows, row => ({
+    header: row.parentNode.tagName === 'THEAD' ||
+        Array.from(row.cells).every(cell => cell.tagName === 'TH'),
+    cells: Array.from(row.cells, cell => [cell.innerText.trim(), cell.colSpan, cell.rowSpan]),
+    link: linkOf(row)
+}));
+"""
+
+
+def extract_table(driver):
+    return driver.execute_script(EXTRACT_TABLE_JS, RESULTS_TABLE_XPATH)
+
+
+def header_labels(header_rows):
+    # วางหัวตารางหลายชั้น (colspan/rowspan) ลงตาราง แล้วใช้ป้ายชั้นล่างสุดของแต่ละคอลัมน์
+    grid = {}
+    for r, row in enumerate(header_rows):
+        c = 0
+        for text, colspan, rowspan in row["cells"]:
+            while (r, c) in grid:
+                c += 1
+            for dr in range(max(rowspan, 1)):
+                for dc in range(max(colspan, 1)):
+                    grid[(r + dr, c + dc)] = text
+            c += max(colspan, 1)
+    width = max((c for _, c in grid), default=-1) + 1
+    labels = []
+    for c in range(width):
+        column = [grid[(r, c)] for r in range(len(header_rows)) if (r, c) in grid]
+        labels.append(column[-1] if column else "")
+    return labels
+
+
+def column_positions(labels):
+    positions = {}
+    for index, label in enumerate(labels):
+        key = re.sub(r'\s+', '', label)
+        for alias, column in HEADER_ALIASES.items():
+            if key.startswith(alias) and column not in positions:
+                positions[column] = index
+                break
+    return positions
+
+
+def table_rows_to_records(table_rows, base_url=""):
+    # แยกส่วนหัวตาราง (หากไม่มีแถวที่ระบุเป็นหัวตาราง ให้ถือว่าแถวแรกเป็นหัวตาราง)
+    header_rows = [row for row in table_rows if row["header"]]
+    body_rows = [row for row in table_rows if not row["header"]]
+    if not header_rows and body_rows:
+        header_rows, body_rows = body_rows[:1], body_rows[1:]
+
+    positions = column_positions(header_labels(header_rows))
+    if len(positions) < len(TABLE_COLUMNS) - 1:
+        # หัวตารางไม่ตรงกับที่รู้จัก ใช้ลำดับคอลัมน์ตามโครงสร้างเดิมของเว็บไซต์
+        positions = {column: index for index, column in enumerate(TABLE_COLUMNS)}
+
+    records = []
+    for row in body_rows:
+        cells = [cell[0] for cell in row["cells"]]
+        if len(cells) < 10:  # ตรวจสอบว่ามีคอลัมน์เพียงพอหรือไม่
+            continue
+        values = [
+            cells[positions[column]] if column in positions and positions[column] < len(cells) else ""
+            for column in TABLE_COLUMNS
+        ]
+        # ขนาดที่ดินที่ว่างให้เป็น 0
+        for index in (4, 5, 6):
+            values[index] = values[index] or "0"
+        records.append(LotRecord(*values, urljoin(base_url, row["link"]) if row.get("link") else ""))
+    return records
+
+
+# ✅ กุญแจประจำล็อต (หมายเลขคดี + ล็อตที่-ชุดที่) และลายนิ้วมือสำหรับตรวจว่าข้อมูลเปลี่ยนหรือไม่
+def lot_key(record):
+    return LotRecord.coerce(record).key
+
+
+def frame_lot_keys(df):
+    # LotRecord.key ของทุกแถวใน DataFrame แบบ vectorized (ใช้ร่วมกันทั้งคลังข้อมูลทรัพย์และแคชรายละเอียด)
+    return df['หมายเลขคดี'].astype("string").fillna("").str.strip() + "|" + \
+        df['ล็อตที่-ชุดที่'].astype("string").fillna("").str.strip()
+
+
+def lot_fingerprint(record):
+    price = re.sub(r'[^\d.]', '', str(record[7]))
+    return hashlib.sha1(f"{lot_key(record)}|{price}".encode("utf-8")).hexdigest()[:16]
+
+
+# ✅ คอลัมน์ที่มีชนิดข้อมูลแน่นอน คำนวณครั้งเดียวตอนสร้าง DataFrame
+# ตัวกรอง กราฟ และการส่งออกใช้คอลัมน์เหล่านี้ซ้ำ โดยไม่ต้องแปลงข้อความอีก
+AREA_WA_COLUMN = 'เนื้อที่ (ตร.วา)'
+AREA_SQM_COLUMN = 'เนื้อที่ (ตร.ม.)'
+PRICE_PER_WA_COLUMN = 'ราคาต่อตร.วา'
+NORMALIZED_COLUMNS = [AREA_WA_COLUMN, AREA_SQM_COLUMN, PRICE_PER_WA_COLUMN]
+# ข้อความที่ซ้ำกันมาก (ประเภท ที่ตั้ง คดีที่มีหลายล็อต) เก็บแบบ categorical: รหัสต่อแถว + พจนานุกรมค่าไม่ซ้ำ
+CATEGORY_COLUMNS = ['ประเภททรัพย์', 'ตำบล', 'อำเภอ', 'จังหวัด', 'หมายเลขคดี', 'ล็อตที่-ชุดที่']
+SQM_PER_WA = 4  # 1 ตารางวา = 4 ตารางเมตร
+
+
+def downcast_integral(series):
+    # ตัวเลขที่เป็นจำนวนเต็มทั้งหมด (เช่น ไร่/งาน) เก็บเป็น int ขนาดเล็กที่สุดที่พอ
+    # คอลัมน์ที่มีทศนิยมคงเป็น float64 เพื่อไม่ให้ค่าคลาดเคลื่อน
+    values = series.to_numpy()
+    if len(values) and np.isfinite(values).all() and (values == np.trunc(values)).all():
+        return pd.to_numeric(series.astype('int64'), downcast='integer')
+    return series
+
+
+def frame_memory_mb(df):
+    # หน่วยความจำจริงของ DataFrame (รวมสตริงใน object column)
+    return round(df.memory_usage(deep=True).sum() / 1024 ** 2, 2)
+
+
+def normalize_frame(df):
+    # แปลงคอลัมน์ตัวเลขให้เป็นตัวเลข
+    for col in ['ไร่', 'งาน', 'ตร.วา']:
+        df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+
+    # ราคาประเมินเป็นจำนวนเต็ม (Int64 รองรับค่าว่าง) ตัด "," และ "บาท" ออกในครั้งเดียว
+    price = df['ราคาประเมิน']
+    if not pd.api.types.is_numeric_dtype(price):
+        price = pd.to_numeric(price.astype(str).str.replace(r'[^\d.]', '', regex=True), errors='coerce')
+    df['ราคาประเมิน'] = price.round().astype('Int64')
+
+    area = df['ไร่'] * 400 + df['งาน'] * 100 + df['ตร.วา']
+    df[AREA_WA_COLUMN] = area
+    df[AREA_SQM_COLUMN] = area * SQM_PER_WA
+    prices = df['ราคาประเมิน'].to_numpy(dtype='float64', na_value=np.nan)
+    df[PRICE_PER_WA_COLUMN] = (prices / area.where(area > 0)).round(2)
+    return df
+
+
+def records_to_frame(records):
+    records = [LotRecord.coerce(record) for record in records]
+    return normalize_frame(pd.DataFrame(LotRecord.columns(records), columns=COLUMNS))
+
+
+def compact_frame(df):
+    # รูปแบบประหยัดหน่วยความจำสำหรับผลลัพธ์ชุดใหญ่: ข้อความที่ซ้ำกันเป็น categorical และตัวเลขจำนวนเต็มเป็น int ขนาดเล็ก
+    # ทำครั้งเดียวกับ DataFrame ที่รวมแล้ว (ทีละหน้า pandas มีค่าใช้จ่ายต่อคำสั่งสูงกว่าตัวข้อมูล)
+    for col in ['ไร่', 'งาน', 'ตร.วา', AREA_WA_COLUMN, AREA_SQM_COLUMN]:
+        if col in df.columns:
+            df[col] = downcast_integral(df[col])
+    for col in CATEGORY_COLUMNS:
+        if col in df.columns:
+            df[col] = df[col].astype('category')
+    return df
+
+
+def concat_frames(frames):
+    # ต่อ DataFrame หลายชุด (เช่น ทีละหน้า) แล้วแปลงเป็นรูปแบบประหยัดครั้งเดียว
+    return compact_frame(pd.concat(frames, ignore_index=True))
+
+
+# ✅ ส่วนติดต่อ backend สำหรับดึงข้อมูล: HTTP (ค่าเริ่มต้น) หรือ Selenium (สำรอง)
+LED_SEARCH_URL = os.environ.get("LED_SEARCH_URL", "https://asset.led.go.th/newbidreg/default.asp")
+USER_AGENT = 'Mozilla/5.0 (Windows NT 10.0; Win64; x64) AppleWebKit/537.36 (KHTML, like Gecko) Chrome/120.0.0.0 Safari/537.36'
+
+
+class PageNavigationError(Exception):
+    """ไม่สามารถไปยังหน้าผลลัพธ์ที่ต้องการได้"""
+
+
+class LedBackend:
+    """ส่วนติดต่อร่วมของ backend: ค้นหาหนึ่งครั้ง แล้วอ่านผลลัพธ์ทีละหน้า"""
+
+    name = ""
+    diagnostics = None  # Diagnostics ของงานค้นหา (None = ไม่บันทึกข้อมูลวินิจฉัย)
+    filters = None      # เงื่อนไขค้นหาเพิ่มเติมจาก search_filters() ที่กรอกลงฟอร์มด้วย
+
+    def search(self, province, district, subdistrict):
+        # ส่งฟอร์มค้นหา คืนจำนวนหน้าผลลัพธ์ทั้งหมด (0 = ไม่พบตารางผลลัพธ์)
+        raise NotImplementedError
+
+    def fetch_page(self, page):
+        # คืนรายการแถว (ลิสต์ตามลำดับ COLUMNS) ของหน้าที่ระบุ
+        raise NotImplementedError
+
+    def snapshot(self):
+        # คืน (ภาพหน้าจอ PNG, HTML) ของหน้าปัจจุบัน ส่วนที่ไม่มีคืน None
+        return None, None
+
+    def confirmed_empty(self):
+        # ค้นหาได้ 0 หน้า: True เมื่อแน่ใจว่าเว็บไซต์ตอบว่าไม่พบข้อมูลจริง (ไม่ใช่ฟอร์มไม่ผ่าน)
+        return True
+
+    def reserve(self, timeout):
+        # จองทรัพยากรก่อนค้นหา (เช่นเบราว์เซอร์จาก pool) คืน False เมื่อไม่ว่างภายในเวลาที่กำหนด
+        return True
+
+    def capture(self, label, failure=False):
+        if self.diagnostics is None:
+            return None
+        return self.diagnostics.capture(label, self.snapshot, failure)
+
+    def capture_error(self):
+        # บันทึกสถานะหน้าเว็บเมื่อเกิดข้อผิดพลาด คืน path ของภาพหน้าจอ (ถ้ามี)
+        return self.capture("error", failure=True)
+
+    def close(self):
+        pass
+
+
+class SeleniumBackend(LedBackend):
+    name = "selenium"
+
+    def __init__(self, pool=None):
+        self.pool = pool
+        self.driver = None
+        self._reserved = None  # เบราว์เซอร์ที่จองไว้ด้วย reserve() ยังไม่ได้ใช้ค้นหา
+        self.current_page = 0
+        self.pages_read = 0
+        self.broken = False
+
+    def _pool(self):
+        if self.pool is None:
+            from driver_pool import get_driver_pool
+            self.pool = get_driver_pool()
+        return self.pool
+
+    def reserve(self, timeout):
+        if self.driver is not None or self._reserved is not None:
+            return True
+        try:
+            self._reserved = self._pool().checkout(timeout)
+        except TimeoutError:
+            return False
+        return True
+
+    def search(self, province, district, subdistrict):
+        # ยืมเบราว์เซอร์ที่เปิดรอไว้จาก pool แทนการเปิด Chrome ใหม่ทุกครั้ง
+        self._pool()
+        # ค้นหาซ้ำ (เช่น หลังเปลี่ยนหน้าไม่สำเร็จ) ใช้เบราว์เซอร์เดิมและโหลดหน้าค้นหาใหม่
+        repeat = self.driver is not None
+        if not repeat:
+            self.driver, self._reserved = self._reserved or self.pool.checkout(), None
+        driver = self.driver
         wait = WebDriverWait(driver, 30)  # เพิ่มเวลารอเป็น 30 วินาที
-        driver.get('https://asset.led.go.th/newbidreg/default.asp')
-        
-        # Debug: แสดงค่าที่จะส่งไปยังเว็บไซต์
-        print(f"DEBUG: จังหวัด={province}, อำเภอ={cleaned_district}, ตำบล={cleaned_subdistrict}")
+        self.waiter = waiter = PageWaiter(driver)
+        if repeat or not self.pool.is_fresh(driver):
+            driver.get(LED_SEARCH_URL)
 
         if province:
             province_input = wait.until(EC.presence_of_element_located((By.NAME, 'province')))
             province_input.clear()
             province_input.send_keys(province)
-            time.sleep(3)  # เพิ่มเวลารอเป็น 3 วินาที
+            waiter.field_value(province_input, province)
 
-        if cleaned_district:
+        if district:
             district_input = wait.until(EC.presence_of_element_located((By.NAME, 'ampur')))
             district_input.clear()
-            district_input.send_keys(cleaned_district)  # ส่งค่าที่ตัดคำนำหน้าออกแล้ว
-            time.sleep(3)  # เพิ่มเวลารอเป็น 3 วินาที
+            district_input.send_keys(district)  # ส่งค่าที่ตัดคำนำหน้าออกแล้ว
             
             # ลองใช้ JavaScript Executor หากวิธีปกติไม่ทำงาน
             try:
-                driver.execute_script(f"document.getElementsByName('ampur')[0].value = '{cleaned_district}';")
-                time.sleep(1)
-            except Exception as js_error:
-                print(f"DEBUG: JS Error for district: {js_error}")
+                waiter.field_value(district_input, district)
+            except TimeoutException:
+                try:
+                    driver.execute_script("document.getElementsByName('ampur')[0].value = arguments[0];", district)
+                    waiter.field_value(district_input, district)
+                except Exception as js_error:
+                    print(f"DEBUG: JS Error for district: {js_error}")
 
-        if cleaned_subdistrict:
+        if subdistrict:
             subdistrict_input = wait.until(EC.presence_of_element_located((By.NAME, 'tumbol')))
             subdistrict_input.clear()
-            subdistrict_input.send_keys(cleaned_subdistrict)  # ส่งค่าที่ตัดคำนำหน้าออกแล้ว
-            time.sleep(3)  # เพิ่มเวลารอเป็น 3 วินาที
+            subdistrict_input.send_keys(subdistrict)  # ส่งค่าที่ตัดคำนำหน้าออกแล้ว
             
             # ลองใช้ JavaScript Executor หากวิธีปกติไม่ทำงาน
             try:
-                driver.execute_script(f"document.getElementsByName('tumbol')[0].value = '{cleaned_subdistrict}';")
-                time.sleep(1)
-            except Exception as js_error:
-                print(f"DEBUG: JS Error for subdistrict: {js_error}")
+                waiter.field_value(subdistrict_input, subdistrict)
+            except TimeoutException:
+                try:
+                    driver.execute_script("document.getElementsByName('tumbol')[0].value = arguments[0];", subdistrict)
+                    waiter.field_value(subdistrict_input, subdistrict)
+                except Exception as js_error:
+                    print(f"DEBUG: JS Error for subdistrict: {js_error}")
+
+        # เงื่อนไขเพิ่มเติม: กรอกเฉพาะช่องที่มีในฟอร์ม ส่วนที่เหลือกรองหลังดึงข้อมูล
+        for field, value in form_filter_values(self.filters).items():
+            elements = driver.find_elements(By.NAME, field)
+            if not elements:
+                continue
+            if elements[0].tag_name.lower() == "select":
+                select = Select(elements[0])
+                options = [(index, option.text) for index, option in enumerate(select.options)]
+                index = match_select_option(options, value)
+                if index is not None:
+                    select.select_by_index(index)
+            else:
+                elements[0].clear()
+                elements[0].send_keys(value)
 
         captcha_text = wait.until(EC.presence_of_element_located((By.XPATH, '//font[@color="blue"]'))).text.strip()
         driver.find_element(By.NAME, 'seckey').send_keys(captcha_text)
         
-        # บันทึกภาพหน้าจอก่อนคลิกปุ่มค้นหา
-        driver.save_screenshot("before_search.png")
+        # บันทึกภาพหน้าจอก่อนคลิกปุ่มค้นหา (เฉพาะเมื่อเปิดโหมดวินิจฉัย)
+        self.capture("before_search")
         
         # คลิกปุ่มค้นหาและรอให้ผลลัพธ์แสดง
         search_button = wait.until(EC.element_to_be_clickable((By.NAME, 'search')))
+        old_page = driver.find_element(By.TAG_NAME, 'html')
         search_button.click()
-        time.sleep(7)  # เพิ่มเวลารอเป็น 7 วินาที
-        
-        # บันทึกภาพหน้าจอหลังคลิกปุ่มค้นหา
-        driver.save_screenshot("after_search.png")
 
         try:
-            # รอให้ตารางผลลัพธ์ปรากฏ
-            wait.until(EC.presence_of_element_located((By.XPATH, '//table[@class="table linkevent"]')))
+            # รอจนหน้าเดิมถูกแทนที่และตารางผลลัพธ์ปรากฏ
+            waiter.search_results(old_page)
         except TimeoutException:
-            return pd.DataFrame(), "ไม่พบข้อมูลทรัพย์ตามเงื่อนไขที่ระบุ หรือเว็บไซต์ไม่ตอบสนอง"
+            self.capture("after_search", failure=True)
+            return 0
+
+        # บันทึกภาพหน้าจอหลังคลิกปุ่มค้นหา
+        self.capture("after_search")
+        self.current_page = 1
+
+        marker = pagination_marker(driver)
+        return int(marker.split("/")[1]) if marker else 1
 
+    def fetch_page(self, page):
+        if page != self.current_page:
+            self._go_to_page(page)
+        table_rows = extract_table(self.driver) or []
+        self.pages_read += 1
+        return table_rows_to_records(table_rows, self.driver.current_url)
+
+    def _go_to_page(self, page):
+        driver = self.driver
+        table = driver.find_element(By.XPATH, RESULTS_TABLE_XPATH)
+        old_marker = pagination_marker(driver)
+        next_page_found = False
+
+        # วิธีที่ 1: คลิกที่หมายเลขหน้าที่ต้องการ
         try:
-            pagination_text = driver.find_element(By.XPATH, '//div[contains(text(), "หน้าที่")]').text
-            total_pages = int(re.search(r'(\d+)/(\d+)', pagination_text).group(2))
-            st.info(f"พบข้อมูลทั้งหมด {total_pages} หน้า")
-        except (NoSuchElementException, AttributeError):
-            total_pages = 1
-            st.info("พบข้อมูล 1 หน้า")
+            driver.find_element(By.XPATH, f'//a[text()="{page}"]').click()
+            next_page_found = True
+        except NoSuchElementException:
+            pass
 
-        if max_pages is not None and max_pages < total_pages:
-            total_pages = max_pages
-            st.info(f"จะดึงข้อมูลเพียง {max_pages} หน้าตามที่กำหนด")
+        # วิธีที่ 2: คลิกที่ปุ่ม "»" (หน้าถัดไป)
+        if not next_page_found and page == self.current_page + 1:
+            try:
+                driver.find_element(By.XPATH, '//a[contains(text(), "»")]').click()
+                next_page_found = True
+            except NoSuchElementException:
+                pass
+
+        # วิธีที่ 3: ใช้ JavaScript เพื่อเปลี่ยนหน้า
+        if not next_page_found:
+            try:
+                driver.execute_script("goToPage(arguments[0]);", page)
+                next_page_found = True
+            except Exception:
+                pass
+
+        if not next_page_found:
+            raise PageNavigationError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+
+        # รอจนตารางหน้าใหม่แทนที่ตารางเดิม
+        self.waiter.page_change(table, old_marker, page)
+        self.current_page = page
+
+    def snapshot(self):
+        if not self.driver:
+            return None, None
+        return self.driver.get_screenshot_as_png(), self.driver.page_source
+
+    def capture_error(self):
+        if not self.driver:
+            return None
+        self.broken = True  # ไม่นำเบราว์เซอร์ที่อยู่ในสถานะผิดพลาดกลับไปใช้ซ้ำ
+        return super().capture_error()
+
+    def close(self):
+        if self.driver:
+            self.pool.checkin(self.driver, pages=self.pages_read, broken=self.broken)
+            self.driver = None
+        if self._reserved:
+            self.pool.checkin(self._reserved)
+            self._reserved = None
+
+
+def create_backend(name):
+    if name == "selenium":
+        return SeleniumBackend()
+    if name == "http":
+        from led_http import HttpBackend
+        return HttpBackend()
+    raise ValueError(f"ไม่รู้จัก backend: {name}")
+
+
+class SearchError(Exception):
+    """ทุก backend ค้นหาไม่สำเร็จ (เก็บ backend ตัวสุดท้ายไว้สำหรับบันทึกสถานะหน้าเว็บ)"""
+
+    def __init__(self, backend):
+        super().__init__(f"backend {backend.name} ค้นหาไม่สำเร็จ")
+        self.backend = backend
+
+
+def open_search(search_args, backend="auto", diagnostics=None, filters=None):
+    # ค้นหาด้วย backend ที่ระบุ (auto = HTTP ก่อน แล้วจึง Selenium) คืน (backend, จำนวนหน้า)
+    candidates = ["http", "selenium"] if backend == "auto" else [backend]
+    for index, name in enumerate(candidates):
+        active = create_backend(name)
+        active.diagnostics = diagnostics
+        active.filters = filters
+        try:
+            # ลองใหม่เมื่อเว็บไซต์ไม่ตอบสนอง ข้อผิดพลาดอื่นสลับไปใช้ backend ถัดไปทันที
+            found_pages = call_with_retry(lambda: active.search(*search_args), retry_if=is_upstream_failure)
+        except Exception as search_error:
+            if index == len(candidates) - 1:
+                raise SearchError(active) from search_error
+            print(f"DEBUG: backend {name} ค้นหาไม่สำเร็จ ({search_error}) สลับไปใช้ {candidates[index + 1]}")
+            active.close()
+            continue
+        if found_pages == 0 and index < len(candidates) - 1 and not active.confirmed_empty():
+            # ไม่พบตารางผลลัพธ์และไม่ใช่หน้าแจ้งว่าไม่พบข้อมูล (เช่นฟอร์มหรือรหัสยืนยันไม่ผ่าน) ลอง backend ถัดไป
+            print(f"DEBUG: backend {name} ไม่พบผลลัพธ์โดยไม่มีหน้าแจ้งไม่พบข้อมูล สลับไปใช้ {candidates[index + 1]}")
+            active.close()
+            continue
+        return active, found_pages
+
+
+# ✅ ตัดคำนำหน้า เขต/อำเภอ/ตำบล/แขวง ออกจากชื่อพื้นที่ก่อนส่งไปยังเว็บไซต์
+def clean_district_name(name):
+    return name.replace("เขต", "").replace("อำเภอ", "").strip() if name else ""
+
+
+def clean_subdistrict_name(name):
+    return name.replace("ตำบล", "").replace("แขวง", "").strip() if name else ""
+
+
+# ✅ เงื่อนไขค้นหาเพิ่มเติม (ประเภททรัพย์ ราคา หน่วยงาน หมายเลขคดี) ส่งไปกับฟอร์มค้นหาของเว็บไซต์
+# ให้เว็บไซต์กรองก่อน จึงดึงเพียงไม่กี่หน้าแทนทุกหน้าของทุกประเภท
+# เงื่อนไขที่ฟอร์มไม่มีช่องรองรับ ถูกกรองซ้ำฝั่งเราหลังดึงข้อมูล (apply_search_filters) ผลลัพธ์จึงถูกต้องเสมอ
+SEARCH_FILTER_FIELDS = {      # เงื่อนไข → ชื่อช่องในฟอร์มค้นหาของเว็บไซต์
+    "asset_type": "asset_type",
+    "min_price": "price_begin",
+    "max_price": "price_end",
+    "department": "dep_name",
+    "case_number": "law_suit_no",
+}
+ASSET_TYPE_ALIASES = {"คอนโด": "ห้องชุด"}
+ANY_ASSET_TYPE = ("", "ทุกประเภท", "อื่นๆ")
+
+
+def _price(value):
+    digits = re.sub(r'[^\d.]', '', str(value or ''))
+    try:
+        return int(float(digits)) if digits else None
+    except ValueError:
+        return None
+
+
+def search_filters(asset_type=None, min_price=None, max_price=None, department=None, case_number=None):
+    # คืน dict เฉพาะเงื่อนไขที่มีผลจริง (ค่าว่าง / "ทุกประเภท" / ราคา 0 ถูกตัดออก)
+    filters = {}
+    asset_type = (asset_type or "").strip()
+    if asset_type not in ANY_ASSET_TYPE:
+        filters["asset_type"] = ASSET_TYPE_ALIASES.get(asset_type, asset_type)
+    if _price(min_price):
+        filters["min_price"] = _price(min_price)
+    if _price(max_price):
+        filters["max_price"] = _price(max_price)
+    for name, value in (("department", department), ("case_number", case_number)):
+        if value and value.strip():
+            filters[name] = value.strip()
+    return filters
+
+
+def filters_key(filters):
+    # ข้อความคงที่ของเงื่อนไข สำหรับใช้เป็นส่วนหนึ่งของกุญแจแคช / จุดบันทึก
+    return urlencode(sorted((filters or {}).items()))
+
+
+def form_filter_values(filters):
+    # ชื่อช่องในฟอร์ม → ค่าที่จะกรอก
+    return {SEARCH_FILTER_FIELDS[name]: str(value) for name, value in (filters or {}).items()}
 
-        all_data = []
-        current_page = 1
-        progress_bar = st.progress(0)
-        status_text = st.empty()
 
-        while current_page <= total_pages:
-            status_text.text(f"กำลังดึงข้อมูลหน้า {current_page}/{total_pages}")
-            progress_bar.progress(current_page / total_pages)
+def match_select_option(options, value):
+    # options: [(ค่า, ข้อความ), ...] คืนค่าของตัวเลือกเมื่อข้อความตรงกับเงื่อนไข (หรือชื่อแทน) ทุกตัวอักษรเพียงตัวเลือกเดียว
+    # เช่น "ที่ดิน" ตรงกับทั้ง "ที่ดินว่างเปล่า" และ "ที่ดินพร้อมสิ่งปลูกสร้าง" บางส่วน จึงไม่ส่งไปกับฟอร์ม
+    # คืน None = เว้นช่องนี้ว่าง แล้วให้ apply_search_filters กรองหลังดึงข้อมูลแทน
+    value = ASSET_TYPE_ALIASES.get(value, value).strip()
+    matches = [option_value for option_value, text in options if text.strip() == value]
+    return matches[0] if len(matches) == 1 else None
+
+
+def apply_search_filters(df, filters):
+    # กรองซ้ำฝั่งเราด้วย mask เดียวกับที่ใช้กรองผลในหน้าเว็บ (asset_filters.filter_mask)
+    if not filters or df.empty:
+        return df
+    mask = filter_mask(df, filters)
+    return df if mask.all() else subset(df, mask).reset_index(drop=True)
+
+
+# ✅ แบ่งหน้าผลลัพธ์ให้หลาย session ดึงพร้อมกัน แต่ละ session กระโดดไปยังหน้าที่ได้รับโดยตรง
+MAX_CONCURRENCY = int(os.environ.get("LED_MAX_CONCURRENCY", "4"))
+# session เพิ่มเติมรอทรัพยากร (เช่นเบราว์เซอร์ใน pool) ได้ไม่เกินเวลานี้ ไม่ว่างก็ดึงด้วย session ที่มีอยู่แทน
+SIBLING_RESERVE_TIMEOUT = float(os.environ.get("LED_SIBLING_RESERVE_TIMEOUT", "2"))
+
+
+# ✅ ลองใหม่แบบ exponential backoff + jitter และ circuit breaker ที่หยุดทุก worker เมื่อเว็บไซต์ไม่ตอบสนอง
+RETRY_ATTEMPTS = int(os.environ.get("LED_RETRY_ATTEMPTS", "3"))
+RETRY_BASE_DELAY = float(os.environ.get("LED_RETRY_BASE_DELAY", "0.5"))
+RETRY_MAX_DELAY = 8.0
+BREAKER_THRESHOLD = int(os.environ.get("LED_BREAKER_THRESHOLD", "5"))     # จำนวนครั้งที่ล้มเหลวติดกันก่อนหยุดพัก
+BREAKER_COOLDOWN = float(os.environ.get("LED_BREAKER_COOLDOWN", "30"))    # วินาทีที่หยุดพัก (เพิ่มเป็นเท่าตัวหากยังล้มเหลว)
+BREAKER_MAX_COOLDOWN = 300.0
+
+
+def backoff_delay(attempt):
+    # full jitter: สุ่มระหว่าง 0 ถึงเพดานที่เพิ่มเป็นเท่าตัวทุกครั้ง เพื่อไม่ให้ทุก worker ลองใหม่พร้อมกัน
+    return random.uniform(0, min(RETRY_MAX_DELAY, RETRY_BASE_DELAY * (2 ** attempt)))
+
+
+def is_upstream_failure(error):
+    # ข้อผิดพลาดที่แสดงว่าเว็บไซต์ไม่ตอบสนอง (ไม่ใช่ปัญหาของหน้าใดหน้าหนึ่ง)
+    if isinstance(error, (requests.exceptions.Timeout, requests.exceptions.ConnectionError, TimeoutException)):
+        return True
+    if isinstance(error, WebDriverException) and "net::ERR_" in str(error):
+        return True
+    response = getattr(error, "response", None)
+    return getattr(response, "status_code", 0) >= 500
+
+
+class CircuitBreaker:
+    """ใช้ร่วมกันทุก worker ใน process: เมื่อเว็บไซต์ล้มเหลวติดกันหลายครั้ง ทุก worker หยุดรอ แล้วส่งคำขอทดลองทีละหนึ่ง"""
+
+    def __init__(self, threshold=BREAKER_THRESHOLD, cooldown=BREAKER_COOLDOWN, max_cooldown=BREAKER_MAX_COOLDOWN):
+        self.threshold = threshold
+        self.base_cooldown = cooldown
+        self.max_cooldown = max_cooldown
+        self.cooldown = cooldown
+        self.state = "closed"  # closed → open → half_open → closed
+        self._failures = 0
+        self._open_until = 0.0
+        self._trial = False
+        self._lock = threading.Lock()
+        self.counters = {"opened": 0, "paused_seconds": 0.0}
+
+    def wait(self):
+        # เรียกก่อนส่งคำขอทุกครั้ง รอจนกว่าจะส่งได้
+        while True:
+            delay = self.delay()
+            if not delay:
+                return
+            time.sleep(delay)
+
+    def delay(self):
+        # คืน 0 เมื่อส่งคำขอได้ทันที มิฉะนั้นคืนจำนวนวินาทีที่ควรรอก่อนถามใหม่ (ใช้กับ asyncio ได้โดยไม่บล็อก)
+        with self._lock:
+            now = time.monotonic()
+            if self.state == "open" and now >= self._open_until:
+                self.state = "half_open"
+                self._trial = False
+            if self.state == "closed":
+                return 0.0
+            if self.state == "half_open" and not self._trial:
+                self._trial = True  # คำขอนี้เป็นคำขอทดลอง
+                return 0.0
+            delay = min(max(self._open_until - now, 0.1), 1.0)
+            self.counters["paused_seconds"] += delay
+            return delay
+
+    def record(self, error=None, upstream=is_upstream_failure):
+        # upstream(error): ตัดสินว่าข้อผิดพลาดแสดงว่าเว็บไซต์ไม่ตอบสนอง
+        with self._lock:
+            if error is None or not upstream(error):
+                # เว็บไซต์ตอบสนองแล้ว (แม้หน้านั้นจะมีปัญหาอื่น)
+                self._failures = 0
+                if self.state == "half_open":
+                    self.state = "closed"
+                    self.cooldown = self.base_cooldown
+                return
+            self._failures += 1
+            if self.state == "half_open" or (self.state == "closed" and self._failures >= self.threshold):
+                if self.state == "half_open":
+                    self.cooldown = min(self.cooldown * 2, self.max_cooldown)
+                self.state = "open"
+                self._open_until = time.monotonic() + self.cooldown
+                self._failures = 0
+                self.counters["opened"] += 1
+                print(f"DEBUG: เว็บไซต์ไม่ตอบสนอง หยุดส่งคำขอ {self.cooldown:.0f} วินาที")
+
+
+_breaker = CircuitBreaker()
+_retry_counters = {"attempts": 0, "retries": 0, "recovered": 0, "gave_up": 0}
+_retry_lock = threading.Lock()
+
+
+def _count_retry(name):
+    with _retry_lock:
+        _retry_counters[name] += 1
+
+
+def get_retry_stats():
+    # สถิติการลองใหม่และสถานะ circuit breaker สำหรับแสดงผล
+    with _retry_lock:
+        stats = dict(_retry_counters)
+    stats.update({
+        "breaker_state": _breaker.state,
+        "breaker_opened": _breaker.counters["opened"],
+        "breaker_paused_seconds": round(_breaker.counters["paused_seconds"], 1),
+    })
+    return stats
+
+
+def call_with_retry(action, attempts=RETRY_ATTEMPTS, recover=None, retry_if=None):
+    # เรียก action() ซ้ำได้สูงสุด attempts ครั้งเมื่อผิดพลาด recover(error) ใช้แก้สถานะก่อนลองใหม่
+    # retry_if(error): ลองใหม่เฉพาะข้อผิดพลาดที่ตรงเงื่อนไข (ค่าเริ่มต้นคือทุกข้อผิดพลาด)
+    for attempt in range(attempts + 1):
+        _breaker.wait()
+        _count_retry("attempts")
+        try:
+            result = action()
+        except Exception as error:
+            _breaker.record(error)
+            if attempt == attempts or (retry_if is not None and not retry_if(error)):
+                _count_retry("gave_up")
+                raise
+            _count_retry("retries")
+            time.sleep(backoff_delay(attempt))
+            if recover is not None:
+                try:
+                    recover(error)
+                except Exception as recover_error:
+                    _breaker.record(recover_error)
+            continue
+        _breaker.record()
+        if attempt:
+            _count_retry("recovered")
+        return result
+
+
+async def call_with_retry_async(action, attempts=RETRY_ATTEMPTS, retry_if=None, upstream=is_upstream_failure):
+    # call_with_retry สำหรับ asyncio: action() คืน coroutine ใหม่ทุกครั้ง ใช้ circuit breaker และสถิติชุดเดียวกัน
+    # upstream(error): ข้อผิดพลาดที่นับเป็นเว็บไซต์ไม่ตอบสนอง (เช่นรวมข้อผิดพลาดของ aiohttp)
+    for attempt in range(attempts + 1):
+        delay = _breaker.delay()
+        while delay:
+            await asyncio.sleep(delay)
+            delay = _breaker.delay()
+        _count_retry("attempts")
+        try:
+            result = await action()
+        except Exception as error:
+            _breaker.record(error, upstream)
+            if attempt == attempts or (retry_if is not None and not retry_if(error)):
+                _count_retry("gave_up")
+                raise
+            _count_retry("retries")
+            await asyncio.sleep(backoff_delay(attempt))
+            continue
+        _breaker.record()
+        if attempt:
+            _count_retry("recovered")
+        return result
+
+
+def _page_worker(backend, search_args, page_queue, results, owns_backend):
+    try:
+        if owns_backend:
+            if not backend.reserve(SIBLING_RESERVE_TIMEOUT):
+                # ทรัพยากรไม่ว่าง: ไม่เพิ่ม session นี้ หน้าในคิวจะถูกดึงโดย session อื่น
+                return
+            # session เพิ่มเติมต้องค้นหาเองก่อน เพราะผลการค้นหาผูกกับ session
+            if call_with_retry(lambda: backend.search(*search_args)) == 0:
+                return
+
+        def recover(error):
+            # เปลี่ยนหน้าไม่สำเร็จ: ค้นหาใหม่เพื่อเริ่ม session ใหม่ก่อนลองอีกครั้ง
+            if isinstance(error, PageNavigationError):
+                backend.search(*search_args)
+
+        while True:
             try:
-                # รอให้ตารางปรากฏในหน้าปัจจุบัน
-                table = wait.until(EC.presence_of_element_located((By.XPATH, '//table[@class="table linkevent"]')))
-                rows = table.find_elements(By.TAG_NAME, 'tr')
-                
-                # ข้ามแถวแรกซึ่งเป็นส่วนหัวตาราง
-                for row in rows[1:]:
-                    try:
-                        cols = row.find_elements(By.TAG_NAME, 'td')
-                        if len(cols) >= 10:  # ตรวจสอบว่ามีคอลัมน์เพียงพอหรือไม่
-                            # ดึงข้อมูลตามคอลัมน์ในตาราง (ตามโครงสร้างจริงของเว็บไซต์)
-                            order_number = cols[0].text.strip()  # ลำดับ
-                            lot_set = cols[1].text.strip()  # ล็อตที่-ชุดที่
-                            case_number = cols[2].text.strip()  # หมายเลขคดี
-                            property_type = cols[3].text.strip()  # ประเภททรัพย์
-                            
-                            # ขนาดที่ดิน (แยกเป็น 3 คอลัมน์)
-                            rai = cols[4].text.strip() or "0"  # ไร่
-                            ngan = cols[5].text.strip() or "0"  # งาน
-                            sq_wa = cols[6].text.strip() or "0"  # ตร.วา
-                            
-                            # ราคาประเมิน
-                            price = cols[7].text.strip()
-                            
-                            # ที่ตั้ง
-                            subdistrict = cols[8].text.strip()  # ตำบล
-                            district = cols[9].text.strip()  # อำเภอ
-                            province = cols[10].text.strip() if len(cols) > 10 else ""  # จังหวัด
-                            
-                            # เก็บข้อมูลในรูปแบบลิสต์
-                            row_data = [
-                                order_number, lot_set, case_number, property_type,
-                                rai, ngan, sq_wa, price, subdistrict, district, province
-                            ]
-                            all_data.append(row_data)
-                    except Exception as row_error:
-                        st.warning(f"ข้อผิดพลาดในการดึงข้อมูลแถว: {row_error}")
-                        continue
-
-                if current_page < total_pages:
-                    next_page_found = False
-                    
-                    # วิธีที่ 1: คลิกที่หมายเลขหน้าถัดไป
-                    try:
-                        next_page_number = current_page + 1
-                        next_page_link = driver.find_element(By.XPATH, f'//a[text()="{next_page_number}"]')
-                        next_page_link.click()
-                        next_page_found = True
-                        time.sleep(5)  # รอให้หน้าโหลด
-                    except NoSuchElementException:
-                        pass
-                    
-                    # วิธีที่ 2: คลิกที่ปุ่ม "»" (หน้าถัดไป)
-                    if not next_page_found:
-                        try:
-                            next_button = driver.find_element(By.XPATH, '//a[contains(text(), "»")]')
-                            next_button.click()
-                            next_page_found = True
-                            time.sleep(5)  # รอให้หน้าโหลด
-                        except NoSuchElementException:
-                            pass
-                    
-                    # วิธีที่ 3: ใช้ JavaScript เพื่อเปลี่ยนหน้า
-                    if not next_page_found:
-                        try:
-                            driver.execute_script(f"goToPage({next_page_number});")
-                            next_page_found = True
-                            time.sleep(5)  # รอให้หน้าโหลด
-                        except Exception:
-                            pass
-                    
-                    if not next_page_found:
-                        st.warning(f"ไม่สามารถไปยังหน้าถัดไปได้ หยุดที่หน้า {current_page}")
-                        break
-                
-                current_page += 1
+                page = page_queue.get_nowait()
+            except queue.Empty:
+                return
+            try:
+                results.put((page, call_with_retry(lambda: backend.fetch_page(page), recover=recover), None))
+            except PageNavigationError as nav_error:
+                # session นี้เปลี่ยนหน้าไม่ได้แล้ว ปล่อยหน้าที่เหลือให้ session อื่น
+                results.put((page, None, nav_error))
+                return
             except Exception as page_error:
-                st.error(f"เกิดข้อผิดพลาดในการดึงข้อมูลหน้า {current_page}: {page_error}")
-                break
+                results.put((page, None, page_error))
+    except Exception as search_error:
+        print(f"DEBUG: session เพิ่มเติมค้นหาไม่สำเร็จ: {search_error}")
+    finally:
+        if owns_backend:
+            backend.close()
 
-        progress_bar.empty()
-        status_text.empty()
 
-        # กำหนดชื่อคอลัมน์ให้ตรงกับเว็บไซต์
-        columns = [
-            'ลำดับ', 'ล็อตที่-ชุดที่', 'หมายเลขคดี', 'ประเภททรัพย์',
-            'ไร่', 'งาน', 'ตร.วา', 'ราคาประเมิน', 'ตำบล', 'อำเภอ', 'จังหวัด'
+def _sibling_backend(active):
+    # session เพิ่มเติมชนิดเดียวกัน ค้นหาด้วยเงื่อนไขเดียวกัน เบราว์เซอร์ยืมจาก pool เดียวกับ session หลัก
+    backend = SeleniumBackend(active.pool) if isinstance(active, SeleniumBackend) else create_backend(active.name)
+    backend.filters = active.filters
+    return backend
+
+
+def fetch_pages(active, search_args, total_pages, concurrency=MAX_CONCURRENCY, pages=None):
+    # คืน (หน้า, แถว, ข้อผิดพลาด) ตามลำดับที่ดึงเสร็จ หน้าที่ไม่มี session ใดดึงได้จะคืนข้อผิดพลาด
+    # pages: ระบุเฉพาะหน้าที่ต้องการ (ค่าเริ่มต้นคือทุกหน้า)
+    pages = list(range(1, total_pages + 1)) if pages is None else list(pages)
+    if not pages:
+        return
+    workers = max(1, min(concurrency, len(pages)))
+    if isinstance(active, SeleniumBackend):
+        workers = min(workers, active.pool.size)
+
+    page_queue = queue.Queue()
+    for page in pages:
+        page_queue.put(page)
+    results = queue.Queue()
+
+    with ThreadPoolExecutor(max_workers=workers) as executor:
+        futures = [executor.submit(_page_worker, active, search_args, page_queue, results, False)]
+        futures += [
+            executor.submit(_page_worker, _sibling_backend(active), search_args, page_queue, results, True)
+            for _ in range(workers - 1)
         ]
-        df = pd.DataFrame(all_data, columns=columns)
+        received = 0
+        try:
+            while received < len(pages):
+                try:
+                    yield results.get(timeout=0.5)
+                    received += 1
+                except queue.Empty:
+                    if all(future.done() for future in futures) and results.empty():
+                        break
+        except GeneratorExit:
+            # ผู้เรียกหยุดรับผลกลางคัน: ล้างคิวเพื่อให้ทุก session หยุดหลังหน้าปัจจุบัน
+            while not page_queue.empty():
+                page_queue.get_nowait()
+            raise
+
+    while True:
+        try:
+            page = page_queue.get_nowait()
+        except queue.Empty:
+            break
+        yield page, None, PageNavigationError(f"ไม่สามารถไปยังหน้าที่ {page} ได้")
+
+
+# ✅ จุดบันทึกความคืบหน้า: บันทึกทุกหน้าที่ดึงสำเร็จ หากการดึงข้อมูลหยุดกลางคัน ครั้งถัดไปดึงต่อจากหน้าที่ค้างไว้
+CHECKPOINT_DIR = os.environ.get("LED_CHECKPOINT_DIR", "led_checkpoints")
+CHECKPOINT_MAX_AGE = int(os.environ.get("LED_CHECKPOINT_MAX_AGE", str(24 * 3600)))
+
+_open_checkpoints = set()  # path ของจุดบันทึกที่กำลังใช้งานในโปรเซสนี้
+_open_checkpoints_lock = threading.Lock()
+
+
+def checkpoint_dir_for(caller):
+    # แยกโฟลเดอร์จุดบันทึกตามผู้เรียก (แอป/งานค้นหา, CLI, bulk_crawl) ไม่ให้ใช้หรือเขียนทับจุดบันทึกของกันและกัน
+    return os.path.join(CHECKPOINT_DIR, caller)
+
+
+class CheckpointInUse(RuntimeError):
+    """จุดบันทึกของการค้นหานี้กำลังถูกใช้โดยการดึงข้อมูลอื่นในโปรเซสเดียวกัน"""
+
+
+class CrawlCheckpoint:
+    """ไฟล์ JSON Lines ต่อหนึ่งการค้นหา: บรรทัดแรกคือเงื่อนไขค้นหา บรรทัดถัดไปคือแถวของแต่ละหน้าที่ดึงสำเร็จ"""
+
+    def __init__(self, directory, search_args, found_pages, fresh=False):
+        # fresh=True (ดึงข้อมูลใหม่): ไม่ใช้หน้าที่บันทึกไว้ เริ่มจุดบันทึกใหม่ทับของเดิม
+        digest = hashlib.sha1("|".join(search_args).encode("utf-8")).hexdigest()[:16]
+        self.path = os.path.join(directory, f"{digest}.jsonl")
+        with _open_checkpoints_lock:
+            if self.path in _open_checkpoints:
+                raise CheckpointInUse(self.path)
+            _open_checkpoints.add(self.path)
+        self.pages = {}  # หน้า → แถวที่บันทึกไว้แล้ว
+        header = {"search": list(search_args), "found_pages": found_pages}
+        if not fresh and self._load(header):
+            self._file = open(self.path, "a", encoding="utf-8")
+        else:
+            # ไม่มีจุดบันทึก หรือผลการค้นหาเปลี่ยนไปแล้ว (จำนวนหน้าไม่ตรง) เริ่มใหม่
+            os.makedirs(directory, exist_ok=True)
+            self._file = open(self.path, "w", encoding="utf-8")
+            self._write(dict(header, started_at=time.time()))
+
+    def _load(self, header):
+        try:
+            with open(self.path, "r", encoding="utf-8") as f:
+                lines = f.read().splitlines()
+        except FileNotFoundError:
+            return False
+        try:
+            saved = json.loads(lines[0])
+        except (IndexError, ValueError):
+            return False
+        if saved.get("search") != header["search"] or saved.get("found_pages") != header["found_pages"] \
+                or time.time() - saved.get("started_at", 0) > CHECKPOINT_MAX_AGE:
+            return False
+        for line in lines[1:]:
+            try:
+                entry = json.loads(line)
+            except ValueError:
+                continue  # บรรทัดสุดท้ายที่เขียนไม่ครบตอนโปรเซสหยุด
+            self.pages[entry["page"]] = [LotRecord.coerce(row) for row in entry["rows"]]
+        return True
+
+    def _write(self, entry):
+        self._file.write(json.dumps(entry, ensure_ascii=False) + "\n")
+        self._file.flush()
+
+    def pending(self, total_pages):
+        return [page for page in range(1, total_pages + 1) if page not in self.pages]
+
+    def record(self, page, rows):
+        self.pages[page] = rows
+        self._write({"page": page, "rows": [list(row) for row in rows]})
+
+    def close(self):
+        # เก็บไฟล์ไว้สำหรับดึงต่อครั้งถัดไป
+        if not self._file.closed:
+            self._file.close()
+        with _open_checkpoints_lock:
+            _open_checkpoints.discard(self.path)
+
+    def finish(self):
+        # ดึงครบทุกหน้าแล้ว ไม่ต้องเก็บจุดบันทึก
+        self.close()
+        try:
+            os.remove(self.path)
+        except FileNotFoundError:
+            pass
+
 
-        # แปลงคอลัมน์ตัวเลขให้เป็นตัวเลข
-        numeric_cols = ['ไร่', 'งาน', 'ตร.วา']
-        for col in numeric_cols:
-            df[col] = pd.to_numeric(df[col], errors='coerce').fillna(0)
+class ScrapeError(Exception):
+    """การค้นหาหรือดึงข้อมูลล้มเหลว พร้อมภาพหน้าจอ (ถ้ามี) ขณะเกิดข้อผิดพลาด"""
 
-        # แปลงคอลัมน์ราคาประเมินให้เป็นตัวเลข
-        df['ราคาประเมิน'] = df['ราคาประเมิน'].str.replace(',', '').str.replace(' บาท', '').str.replace('บาท', '')
-        df['ราคาประเมิน'] = pd.to_numeric(df['ราคาประเมิน'], errors='coerce')
+    def __init__(self, message, screenshot=None):
+        super().__init__(message)
+        self.screenshot = screenshot
 
-        return df, None
 
+# ✅ ดึงข้อมูลแบบทยอยส่งผลทีละหน้า: คืน dict ของแต่ละหน้าทันทีที่ดึงเสร็จ (ลำดับตามที่ดึงเสร็จ)
+def iter_led_data(province='', district='', subdistrict='', max_pages=None, backend="auto",
+                  concurrency=MAX_CONCURRENCY, checkpoint_dir=CHECKPOINT_DIR, run_id=None, filters=None,
+                  force_refresh=False):
+    # checkpoint_dir=None: ไม่บันทึกจุดดึงต่อ
+    # force_refresh=True: ไม่ใช้หน้าที่บันทึกไว้จากครั้งก่อน (ดึงใหม่ทุกหน้า)
+    # run_id: ชื่อโฟลเดอร์ข้อมูลวินิจฉัยของงานนี้ (ใช้เมื่อเปิด LED_DIAGNOSTICS=1)
+    # filters: เงื่อนไขจาก search_filters() ส่งไปกับฟอร์มค้นหา และกรองซ้ำทุกหน้าที่ได้
+    search_args = (province, clean_district_name(district), clean_subdistrict_name(subdistrict))
+    active = None
+    checkpoint = None
+    try:
+        try:
+            active, found_pages = open_search(search_args, backend, create_diagnostics(run_id), filters)
+        except SearchError as search_error:
+            active = search_error.backend
+            raise search_error.__cause__
+
+        total_pages = found_pages
+        if max_pages is not None and max_pages < total_pages:
+            total_pages = max_pages
+
+        pages = None
+        if checkpoint_dir:
+            try:
+                checkpoint = CrawlCheckpoint(
+                    checkpoint_dir, search_args + (filters_key(filters),) if filters else search_args, found_pages,
+                    fresh=force_refresh,
+                )
+            except CheckpointInUse:
+                # การค้นหาเดียวกันกำลังดึงอยู่ (เช่นอีกงานหนึ่ง) ดึงรอบนี้โดยไม่ใช้จุดบันทึก
+                print("DEBUG: จุดบันทึกของการค้นหานี้กำลังถูกใช้งาน ดึงข้อมูลโดยไม่บันทึกจุดดึงต่อ")
+        if checkpoint:
+            # หน้าที่ดึงสำเร็จในครั้งก่อน ส่งคืนจากจุดบันทึกโดยไม่ต้องดึงใหม่
+            for page in sorted(page for page in checkpoint.pages if page <= total_pages):
+                yield {
+                    "page": page,
+                    "pages": total_pages,
+                    "found_pages": found_pages,
+                    "rows": apply_search_filters(records_to_frame(checkpoint.pages[page]), filters),
+                    "error": None,
+                    "resumed": True,
+                }
+            pages = checkpoint.pending(total_pages)
+
+        failed = False
+        for page, rows, page_error in fetch_pages(active, search_args, total_pages, concurrency, pages):
+            if page_error is None:
+                if checkpoint:
+                    checkpoint.record(page, rows)
+            else:
+                failed = True
+            yield {
+                "page": page,
+                "pages": total_pages,
+                "found_pages": found_pages,
+                "rows": apply_search_filters(records_to_frame(rows), filters) if page_error is None else None,
+                "error": page_error,
+                "resumed": False,
+            }
+        if checkpoint and not failed:
+            checkpoint.finish()
     except Exception as e:
-        if driver:
+        screenshot_path = None
+        if active:
             try:
-                screenshot_path = "error_screenshot.png"
-                driver.save_screenshot(screenshot_path)
-                st.error(f"เกิดข้อผิดพลาด: {e}")
-                st.image(screenshot_path, caption="สถานะหน้าเว็บเมื่อเกิดข้อผิดพลาด")
-            except:
+                screenshot_path = active.capture_error()
+            except Exception:
                 pass
+        raise ScrapeError(str(e), screenshot_path) from e
+    finally:
+        if checkpoint:
+            checkpoint.close()
+        if active:
+            active.close()
+
+
+# ✅ ฟังก์ชันดึงข้อมูลทรัพย์จากเว็บไซต์กรมบังคับคดี
+# backend="auto" ใช้ HTTP ก่อน และสลับไปใช้ Selenium หากค้นหาผ่าน HTTP ไม่สำเร็จ
+# on_event(event) รับความคืบหน้าเป็น dict ตาม event["type"] (ไม่ผูกกับ UI ใด ๆ):
+#   "search"  ค้นหาสำเร็จ: found_pages, pages, message
+#   "page"    ดึงหน้าหนึ่งเสร็จ: page, pages, rows, error, resumed, done
+#   "warning" / "error"  ข้อความแจ้งเตือน: message (error มี screenshot ด้วย)
+#   "done"    เสร็จสิ้น: rows, failed_pages, resumed_pages
+def scrape_led_data(province='', district='', subdistrict='', max_pages=None, backend="auto",
+                    concurrency=MAX_CONCURRENCY, on_event=None, run_id=None, filters=None, force_refresh=False):
+    emit = on_event or (lambda event: None)
+
+    # Debug: แสดงค่าที่จะส่งไปยังเว็บไซต์
+    print(f"DEBUG: จังหวัด={province}, อำเภอ={clean_district_name(district)}, ตำบล={clean_subdistrict_name(subdistrict)}"
+          f"{f', เงื่อนไข={filters}' if filters else ''}")
+
+    pages = {}
+    failed_pages = []
+    resumed_pages = 0
+    try:
+        for batch in iter_led_data(province, district, subdistrict, max_pages, backend, concurrency,
+                                   checkpoint_dir_for("search"), run_id, filters, force_refresh):
+            total_pages = batch["pages"]
+            if not pages and not failed_pages:
+                message = f"พบข้อมูลทั้งหมด {batch['found_pages']} หน้า" if batch["found_pages"] > 1 else "พบข้อมูล 1 หน้า"
+                if total_pages < batch["found_pages"]:
+                    message += f" จะดึงข้อมูลเพียง {total_pages} หน้าตามที่กำหนด"
+                emit({"type": "search", "found_pages": batch["found_pages"], "pages": total_pages, "message": message})
+
+            if batch["error"] is None:
+                pages[batch["page"]] = batch["rows"]
+                resumed_pages += batch["resumed"]
+            else:
+                failed_pages.append(batch["page"])
+                print(f"DEBUG: ดึงข้อมูลหน้า {batch['page']} ไม่สำเร็จ: {batch['error']}")
+            emit(dict(batch, type="page", done=len(pages) + len(failed_pages)))
+
+    except ScrapeError as e:
+        emit({"type": "error", "message": f"เกิดข้อผิดพลาด: {e}", "screenshot": e.screenshot})
         return pd.DataFrame(), f"เกิดข้อผิดพลาด: {str(e)}"
 
-    finally:
-        if driver:
-            driver.quit()
+    if not pages and not failed_pages:
+        return pd.DataFrame(), "ไม่พบข้อมูลทรัพย์ตามเงื่อนไขที่ระบุ หรือเว็บไซต์ไม่ตอบสนอง"
+
+    if resumed_pages:
+        emit({"type": "warning", "message": f"ดึงข้อมูลต่อจากครั้งก่อน: ใช้ {resumed_pages} หน้าที่ดึงสำเร็จไว้แล้ว"})
+    if failed_pages:
+        emit({
+            "type": "warning",
+            "message": f"ไม่สามารถดึงข้อมูลได้ {len(failed_pages)} หน้า: {', '.join(map(str, sorted(failed_pages)))}",
+        })
+
+    # รวมผลทุก session ตามลำดับหน้า
+    df = concat_frames([pages[page] for page in sorted(pages)]) if pages else compact_frame(records_to_frame([]))
+    print(f"DEBUG: ผลการค้นหา {len(df):,} แถว ใช้หน่วยความจำ {frame_memory_mb(df)} MB")
+    emit({"type": "done", "rows": len(df), "failed_pages": sorted(failed_pages), "resumed_pages": resumed_pages})
+    return df, None
+
 
 if __name__ == "__main__":
+    # ดาวน์โหลดข้อมูลจังหวัด-อำเภอ-ตำบล (พร้อมไฟล์แบบย่อ) ด้วยตัวเดียวกับ download_province_data.py
+    from download_province_data import download_province_data
     download_province_data()